@@ -1,212 +1,193 @@
+import time
+
 import pygame.mouse
 
 from Piece import *
 from constants import *
-from utils import get_position
-from random import randint
-
-
-class Board:
-    def __init__(self, board: Union[None, List[List]] = None):
-        if board is None:
-            self.board = list()
-            self.initialize_board()
-        else:
-            self.board = board
-
-        self.pawn_to_promote = None
-        self.en_passant = None
-
-    def initialize_board(self):
-        self.board = [[None for _ in range(8)] for _ in range(8)]
-        self.board[0] = [Rook('black'), Knight('black'), Bishop('black'), Queen('black'), King('black'),
-                         Bishop('black'), Knight('black'), Rook('black')]
-        self.board[1] = [Pawn('black', 'down') for _ in range(8)]
-        self.board[6] = [Pawn('white', 'up') for _ in range(8)]
-        self.board[7] = [Rook('white'), Knight('white'), Bishop('white'), Queen('white'), King('white'),
-                         Bishop('white'), Knight('white'), Rook('white')]
-
-    def pop_piece(self, position) -> Piece:
-        if not isvalid(position):
-            raise ValueError('Position out of range')
-        if position is None:
-            return
-        piece = self.board[position[1]][position[0]]
-        self.board[position[1]][position[0]] = None
-        return piece
-
-    def put_piece(self, position, piece):
-        if not isvalid(position):
-            raise ValueError('Position out of range')
-        self.board[position[1]][position[0]] = piece
-
-    def is_check(self, color, position: Union[None, Tuple[int, int]] = None):
-        for i in range(8):
-            for j in range(8):
-                piece = self.board[i][j]
-                if piece is None or piece.color == color:
-                    continue
-                _, caps = piece.get_mvs_and_caps(self.board, (j, i))
-                for other in caps:
-                    if position is None and isinstance(self.board[other[1]][other[0]], King):
-                        return True
-                    if position is not None and other == position:
-                        return True
-        return False
-
-    def copy(self):
-        new_board = [[None if self.board[i][j] is None else self.board[i][j].copy() for j in range(8)] for i in
-                     range(8)]
-        return Board(new_board)
-
-    def move(self, original_coord, final_coord, color) -> tuple[str, str]:
-        piece = self.pop_piece(original_coord)
-        just_set_en_passant = False
-        mv_type = 'move'
-        flag = ''
-
-        if isinstance(piece, Pawn):
-            if self.en_passant is not None:
-                other = self.board[self.en_passant[1]][self.en_passant[0]]
-                if piece.color != other.color and final_coord == (self.en_passant[0], self.en_passant[1] - other.direction):
-                    self.pop_piece(self.en_passant)
-                    mv_type = 'capture'
-            if piece.two:
-                piece.two = False
-                if abs(final_coord[1] - original_coord[1]) == 2:
-                    just_set_en_passant = True
-                    self.en_passant = final_coord
-
-        if isinstance(piece, King) or isinstance(piece, Rook):
-            piece.moved = True
-            if isinstance(piece, King) and abs(final_coord[0] - original_coord[0]) == 2:
-                mv_type = 'castle'
-                if final_coord[0] > original_coord[0]:
-                    rook = self.pop_piece((7, original_coord[1]))
-                    rook.moved = True
-                    self.put_piece((final_coord[0] - 1, final_coord[1]), rook)
-                elif original_coord[0] > final_coord[0]:
-                    rook = self.pop_piece((0, original_coord[1]))
-                    rook.moved = True
-                    self.put_piece((final_coord[0] + 1, final_coord[1]), rook)
-        if self.board[final_coord[1]][final_coord[0]] is not None:
-            mv_type = 'capture'
-        self.put_piece(final_coord, piece)
-
-        if self.is_check(opposite_color(color)):
-            mv_type = 'check'
-
-        if isinstance(piece, Pawn) and ((piece.color == 'white' and final_coord[1] == 0) or
-                                        (piece.color == 'black' and final_coord[1] == 7)):
-            flag = 'promotion'
-
-        if not just_set_en_passant:
-            self.en_passant = None
-
-        return mv_type, flag
+from assets import Sounds, background
+from utils import get_position, square_rect, isvalid
+from core import profiler
+from core.board import Board
+from core.engine import Engine
+from core.ai_worker import AIWorker
+from core.movelog import MoveLog
 
 
 class Simulation:
-    def __init__(self):
+    def __init__(self, ai=None, worker_mode: str = 'process', fps: int = 60, overlay: bool = False):
         self.board = Board()
+        self.ai = Engine().choose_move if ai is None else ai
+        self.worker_mode = worker_mode
+        self.worker = None
         pygame.mixer.pre_init(44100, -16, 2, 1)
         pygame.init()
         pygame.display.set_caption("Chess")
         self.screen = pygame.display.set_mode((SIZE_W, SIZE_H))
-        self.background = scale(load('Images/board.png'), (SIZE_W, SIZE_H))
-
-        self.move_sound = pygame.mixer.Sound('Sounds/move_sound.wav')
-        self.capture_sound = pygame.mixer.Sound('Sounds/capture_sound.wav')
-        self.castle_sound = pygame.mixer.Sound('Sounds/castle_sound.wav')
-        self.start_sound = pygame.mixer.Sound('Sounds/start_sound.wav')
-        self.check_sound = pygame.mixer.Sound('Sounds/check_sound.wav')
-
-        self.start_sound.play()
+        self.background = background()
+        self.clock = pygame.time.Clock()
+        self.fps = fps
+
+        # The board without the dragged piece is kept in self.scene, and only the squares whose content changed
+        # since the last frame are redrawn and sent to the display
+        self.scene = pygame.Surface((SIZE_W, SIZE_H))
+        self.shown = None
+        self.drag_rect = None
+        self.dialog_open = False
+        self.dirty = []
+        self.options = None
+
+        # The overlay shows the profiler's counters, so it is only offered while the profiler is enabled
+        if profiler.enabled:
+            profiler.instrument(Simulation, 'draw_board')
+        self.overlay = overlay and profiler.enabled
+        self.overlay_rect = pygame.Rect(OVERLAY_BOX)
+        self.overlay_lines = []
+        self.overlay_time = 0.0
+        self.font = None
+
+        # Decoded once the first frame is shown; the start sound plays when they are ready
+        self.sounds = Sounds()
 
         self.down = False
         self.click_pos = None
         self.original_pos = None
 
-        self.memory = [self.board.copy()]
-        self.memory_max = 10
-        self.memory_index = 0
+        self.log = MoveLog(self.board)
+        self.promotion_from = None
+        self.outcome = None
 
         self.turn = 'white'
 
+    def cancel_ai(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
     def reset(self):
+        self.cancel_ai()
         self.board = Board()
         self.turn = 'white'
 
         self.down = None
         self.click_pos = None
         self.original_pos = None
-        self.memory = [self.board.copy()]
-        self.memory_index = 0
+        self.log = MoveLog(self.board)
+        self.shown = None
+        self.options = None
+        self.update_outcome()
 
     def get_move_options(self, position):
-        new_mvs = []
-        new_caps = []
-        piece = self.board.board[position[1]][position[0]]
-        mvs, caps = piece.get_mvs_and_caps(self.board.board, position)
-
-        if self.board.en_passant is not None and isinstance(piece, Pawn) and position[1] == self.board.en_passant[1] \
-                and abs(position[0] - self.board.en_passant[0]) == 1:
-            other = self.board.board[self.board.en_passant[1]][self.board.en_passant[0]]
-            if piece.color != other.color:
-                mvs.append((self.board.en_passant[0], self.board.en_passant[1] - other.direction))
-
-        for mv in mvs:
-            test = self.board.copy()
-            x, _ = test.move(position, mv, opposite_color(piece.color))
-            if isinstance(piece, King) and abs(mv[0] - position[0]) == 2 and not self.board.is_check(piece.color) and \
-                    test.is_check(piece.color, ((mv[0] + position[0]) / 2, position[1])):
-                continue
-            if x != 'check':
-                new_mvs.append(mv)
-        for mv in caps:
-            test = self.board.copy()
-            x, _ = test.move(position, mv, opposite_color(piece.color))
-            if x != 'check':
-                new_caps.append(mv)
-        return new_mvs, new_caps
+        # Computed once per pick-up; the hash keeps a move made by the AI meanwhile from reusing stale options
+        key = (position, self.board.hash)
+        if self.options is None or self.options[0] != key:
+            self.options = (key, self.board.get_move_options(position))
+        return self.options[1]
 
     def draw_board(self):
-        self.screen.blit(background, (0, 0))
-        click_coord, original_coord = get_position(self.click_pos), get_position(self.original_pos)
-        for i in range(8):
-            for j in range(8):
-                if self.board.board[i][j] is not None and (j, i) != original_coord:
-                    self.board.board[i][j].draw(self.screen, (j, i))
-
-        if self.down:
-            piece = self.board.board[original_coord[1]][original_coord[0]]
-            if piece is None:
-                return
+        original_coord = get_position(self.original_pos)
+        piece = EMPTY
+        if self.down and isvalid(original_coord):
+            piece = self.board.piece_at(original_coord)
+        dragging = piece and piece_color(piece) == self.turn
+
+        shown = {}
+        for sq, code in enumerate(self.board.squares):
+            coord = (sq & 7, sq >> 3)
+            shown[coord] = (EMPTY if dragging and coord == original_coord else code, None)
+        if piece:
             mvs, caps = self.get_move_options(original_coord)
-
-            for x, y in mvs:
-                pygame.draw.circle(self.screen, (0, 100, 0),
-                                   (OFFSET_X + (x + 0.5) * BLOCK_W, OFFSET_Y + (y + 0.5) * BLOCK_H), 10)
-            for x, y in caps:
-                pygame.draw.circle(self.screen, (100, 0, 0),
-                                   (OFFSET_X + (x + 0.5) * BLOCK_W, OFFSET_Y + (y + 0.5) * BLOCK_H), 10)
-
-            if piece.color == self.turn:
-                offset_x = self.original_pos[0] - original_coord[0] * BLOCK_W - OFFSET_X
-                offset_y = self.original_pos[1] - original_coord[1] * BLOCK_H - OFFSET_Y
-                piece.draw(self.screen, None, (self.click_pos[0] - offset_x, self.click_pos[1] - offset_y))
-            else:
-                piece.draw(self.screen, original_coord)
-
-    def update_memory(self):
-        if self.memory_index == len(self.memory) - 1:
-            self.memory.append(self.board.copy())
-            if len(self.memory) > self.memory_max:
-                self.memory.pop(0)
-            else:
-                self.memory_index += 1
+            for coord in mvs:
+                shown[coord] = (shown[coord][0], (0, 100, 0))
+            for coord in caps:
+                shown[coord] = (shown[coord][0], (100, 0, 0))
+
+        if self.shown is None:
+            self.scene.blit(self.background, (0, 0))
+            changed = list(shown)
+            self.dirty.append(self.screen.get_rect())
+        else:
+            changed = [coord for coord in shown if shown[coord] != self.shown[coord]]
+        self.shown = shown
+
+        for coord in changed:
+            rect = square_rect(coord)
+            self.scene.blit(self.background, rect, rect)
+            code, dot = shown[coord]
+            if code:
+                draw(code, self.scene, coord)
+            if dot is not None:
+                pygame.draw.circle(self.scene, dot, rect.center, 10)
+            self.screen.blit(self.scene, rect, rect)
+            self.dirty.append(rect)
+
+        if self.dialog_open and self.board.pawn_to_promote is None:
+            self.dialog_open = False
+            self.screen.blit(self.scene, PRO_DARK_BOX, PRO_DARK_BOX)
+            self.dirty.append(pygame.Rect(PRO_DARK_BOX))
+
+        drag_rect = None
+        if dragging:
+            offset_x = self.original_pos[0] - original_coord[0] * BLOCK_W - OFFSET_X
+            offset_y = self.original_pos[1] - original_coord[1] * BLOCK_H - OFFSET_Y
+            drag_rect = pygame.Rect(int(self.click_pos[0] - offset_x), int(self.click_pos[1] - offset_y),
+                                    int(PIECE_BOX_W) + 1, int(PIECE_BOX_H) + 1)
+        if drag_rect != self.drag_rect or (drag_rect is not None and changed):
+            if self.drag_rect is not None:
+                self.screen.blit(self.scene, self.drag_rect, self.drag_rect)
+                self.dirty.append(self.drag_rect)
+            if drag_rect is not None:
+                draw(piece, self.screen, None, drag_rect.topleft)
+                self.dirty.append(drag_rect)
+            self.drag_rect = drag_rect
+
+    def draw_overlay(self):
+        # Drawn on the screen after the board, and again whenever a square redrawn this frame covered part of it
+        now = time.perf_counter()
+        if now - self.overlay_time >= OVERLAY_REFRESH:
+            self.overlay_time = now
+            self.overlay_lines = self.profile_lines()
+        elif not any(self.overlay_rect.colliderect(rect) for rect in self.dirty):
+            return
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+        pygame.draw.rect(self.screen, OVERLAY_COLOR, self.overlay_rect)
+        for i, line in enumerate(self.overlay_lines):
+            self.screen.blit(self.font.render(line, True, OVERLAY_TEXT_COLOR),
+                             (self.overlay_rect.x + 6, self.overlay_rect.y + 6 + 16 * i))
+        self.dirty.append(self.overlay_rect)
+
+    def hide_overlay(self):
+        self.screen.blit(self.scene, self.overlay_rect, self.overlay_rect)
+        self.dirty.append(self.overlay_rect)
+
+    def profile_lines(self) -> list:
+        report = profiler.report()
+        frame = report.get('frame', {})
+        lines = ['fps {:.1f}  frame p50 {:.2f}ms  p99 {:.2f}ms'.format(
+            self.clock.get_fps(), frame.get('p50_us', 0) / 1e3, frame.get('p99_us', 0) / 1e3)]
+        for name in ('Simulation.draw_board', 'Board.get_move_options', 'Board.move'):
+            entry = report.get(name, {})
+            lines.append('{} {}x  p50 {:.0f}us  p99 {:.0f}us'.format(
+                name.split('.')[1], entry.get('calls', 0), entry.get('p50_us', 0), entry.get('p99_us', 0)))
+        search = report.get('Engine.search') or report.get('ParallelEngine.search') or {}
+        lines.append('search {}x  {:,} nodes  {:,} nps'.format(
+            search.get('calls', 0), search.get('nodes', 0), search.get('nps', 0)))
+        return lines
+
+    def go_to(self, ply: int):
+        if ply != self.log.ply and 0 <= ply <= len(self.log):
+            self.board = self.log.goto(self.board, ply)
+            self.turn = self.board.turn
+            self.update_outcome()
+
+    def undo(self):
+        self.go_to(self.log.ply - 1)
+
+    def redo_move(self):
+        self.go_to(self.log.ply + 1)
 
     def promote(self):
+        self.dialog_open = True
+        self.dirty.append(pygame.Rect(PRO_DARK_BOX))
         pygame.draw.rect(self.screen, PRO_DARK_COLOR, PRO_DARK_BOX)
         pygame.draw.rect(self.screen, PRO_LIGHT_COLOR, PRO_LIGHT_BOX)
 
@@ -224,28 +205,38 @@ class Simulation:
         if pos is not None and (pos[0] > PRO_LIGHT_BOX[0]) and (pos[0] < PRO_LIGHT_BOX[0] + PRO_LIGHT_BOX[2]) and \
                 (pos[1] > PRO_LIGHT_BOX[1]) and (pos[1] < PRO_LIGHT_BOX[1] + PRO_LIGHT_BOX[3]):
             num = int((pos[0] - PRO_LIGHT_BOX[0]) // PIECE_BOX_W)
-            self.board.pop_piece(self.board.pawn_to_promote)
             if num == 0:
-                piece = Queen(self.turn)
+                self.finish_promotion(Queen)
             elif num == 1:
-                piece = Rook(self.turn)
+                self.finish_promotion(Rook)
             elif num == 2:
-                piece = Bishop(self.turn)
+                self.finish_promotion(Bishop)
             elif num == 3:
-                piece = Knight(self.turn)
+                self.finish_promotion(Knight)
             else:
                 raise ValueError
 
-            self.board.put_piece(self.board.pawn_to_promote, piece)
-            self.board.pawn_to_promote = None
-            self.update_memory()
-            self.change_turn()
+    def finish_promotion(self, piece: type):
+        self.board.pop_piece(self.board.pawn_to_promote)
+        self.board.put_piece(self.board.pawn_to_promote, piece.code(self.turn))
+        self.log.push(self.board, (self.promotion_from, self.board.pawn_to_promote, piece))
+        self.board.pawn_to_promote = None
+        self.change_turn()
 
     def change_turn(self):
         if self.turn == 'white':
             self.turn = 'black'
         else:
             self.turn = 'white'
+        self.update_outcome()
+
+    def update_outcome(self):
+        # Checked after every ply; a finished game takes no more moves until it is stepped back or reset
+        self.outcome = self.board.outcome()
+        if self.outcome is None:
+            pygame.display.set_caption("Chess")
+        else:
+            pygame.display.set_caption("Chess - {} ({})".format(*self.outcome))
 
     def update_game(self, processed=False):
         if not processed:
@@ -253,12 +244,12 @@ class Simulation:
         else:
             click_coord, original_coord = self.click_pos, self.original_pos
 
-        if self.down or self.original_pos is None:
+        if self.down or self.original_pos is None or not isvalid(original_coord):
             return
-        piece = self.board.board[original_coord[1]][original_coord[0]]
-        if piece is None:
+        piece = self.board.piece_at(original_coord)
+        if not piece:
             return
-        if piece.color != self.turn:
+        if piece_color(piece) != self.turn:
             return
 
         mvs, caps = self.get_move_options(original_coord)
@@ -266,24 +257,28 @@ class Simulation:
             mv_type, flag = self.board.move(original_coord, click_coord, self.turn)
 
             if mv_type == 'move':
-                self.move_sound.play()
+                self.sounds.play('move')
             elif mv_type == 'capture':
-                self.capture_sound.play()
+                self.sounds.play('capture')
             elif mv_type == 'castle':
-                self.castle_sound.play()
+                self.sounds.play('castle')
             elif mv_type == 'check':
-                self.check_sound.play()
+                self.sounds.play('check')
 
             if flag == 'promotion':
                 self.board.pawn_to_promote = click_coord
+                self.promotion_from = original_coord
             else:
-                self.update_memory()
+                self.log.push(self.board, (original_coord, click_coord, None))
                 self.change_turn()
 
     def run(self, play_against_AI: bool = False):
         run = True
         self.down = False
+        if play_against_AI:
+            self.worker = AIWorker(self.ai, self.worker_mode)
         while run:
+            frame_start = time.perf_counter()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     run = False
@@ -298,36 +293,57 @@ class Simulation:
                     if event.key == K_r:
                         self.reset()
                         break
+                    if event.key == K_F3 and profiler.enabled:
+                        self.overlay = not self.overlay
+                        if not self.overlay:
+                            self.hide_overlay()
+                    if self.board.pawn_to_promote is not None:
+                        continue
                     if event.key == K_LEFT:
-                        self.memory_index = max(self.memory_index - 1, 0)
+                        self.cancel_ai()
+                        self.undo()
                     elif event.key == K_RIGHT:
-                        self.memory_index = min(self.memory_index + 1, len(self.memory) - 1)
-                    self.change_turn()
-                    self.board = self.memory[self.memory_index].copy()
+                        self.redo_move()
+                    elif event.key == K_HOME:
+                        self.cancel_ai()
+                        self.go_to(0)
+                    elif event.key == K_END:
+                        self.go_to(len(self.log))
 
             self.draw_board()
 
             if self.board.pawn_to_promote is not None:
                 self.promote()
+            elif self.outcome is not None:
+                pass
             elif self.turn == 'white' or not play_against_AI:
                 self.update_game()
-            elif self.turn == 'black' and self.memory_index == len(self.memory) - 1:
-                mvs = []
-                for i in range(8):
-                    for j in range(8):
-                        if self.board.board[i][j] is not None and self.board.board[i][j].color == 'black':
-                            moves, caps = self.get_move_options((j, i))
-                            moves = [((j, i), move) for move in moves]
-                            caps = [((j, i), cap) for cap in caps]
-                            mvs += moves
-                            mvs += caps
-                self.original_pos, self.click_pos = mvs[randint(0, len(mvs) - 1)]
-                self.update_game(processed=True)
+            elif self.turn == 'black' and self.log.ply == len(self.log):
+                # The AI thinks in the worker while this loop keeps drawing; its answer is picked up when ready
+                if self.worker.pending is None:
+                    self.worker.request(self.board, self.turn)
+                else:
+                    result = self.worker.poll()
+                    if result is not None and result[1] is not None:
+                        self.original_pos, self.click_pos, promotion = result[1]
+                        self.update_game(processed=True)
+                        if self.board.pawn_to_promote is not None:
+                            self.finish_promotion(promotion)
 
             if not self.down:
                 self.original_pos = None
                 self.click_pos = None
-
-            pygame.display.update()
-
+                self.options = None
+
+            if self.overlay:
+                self.draw_overlay()
+            pygame.display.update(self.dirty)
+            self.dirty = []
+            self.sounds.load()
+            if profiler.enabled:
+                profiler.record('frame', time.perf_counter() - frame_start)
+            self.clock.tick(self.fps)
+
+        if self.worker is not None:
+            self.worker.close()
         pygame.quit()
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import threading
+
+import pygame
+
+from constants import *
+from core.pieces import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK
+
+# The window's images, scaled once for the window size and converted to the display's pixel format so blits need no
+# conversion. Scaled images are also kept on disk, keyed by the source file and the size, so later starts skip both
+# the PNG decoding and the scaling.
+CACHE_DIR = '.asset_cache'
+BOARD_IMAGE = 'Images/board.png'
+PIECES_IMAGE = 'Images/800px-Chess_Pieces_Sprite.svg.png'
+SOUNDS = ('start', 'move', 'capture', 'castle', 'check')
+# Sprite sheet columns of each piece kind
+SPRITE_COLUMNS = {KING: KING_X, QUEEN: QUEEN_X, BISHOP: BISHOP_X, KNIGHT: KNIGHT_X, ROOK: ROOK_X, PAWN: PAWN_X}
+
+_surfaces = {}
+
+
+def cache_path(source: str, size: tuple, alpha: bool) -> str:
+    # A changed source file or window size gives another name, so stale files are never read
+    stat = os.stat(source)
+    key = '{}:{}:{}:{}x{}:{}'.format(source, stat.st_size, stat.st_mtime_ns, *size, alpha)
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode()).hexdigest()[:16] + '.raw')
+
+
+def scaled(source: str, size: tuple, alpha: bool) -> pygame.Surface:
+    size = (int(size[0]), int(size[1]))
+    form = 'RGBA' if alpha else 'RGB'
+    path = cache_path(source, size, alpha)
+    try:
+        with open(path, 'rb') as file:
+            return pygame.image.frombytes(file.read(), size, form)
+    except (OSError, ValueError):
+        pass
+    image = pygame.transform.scale(pygame.image.load(source), size)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Written under another name first, so a window starting meanwhile never reads half a file
+        with open(path + '.tmp', 'wb') as file:
+            file.write(pygame.image.tobytes(image, form))
+        os.replace(path + '.tmp', path)
+    except OSError:
+        pass
+    return image
+
+
+def background() -> pygame.Surface:
+    # Needs the display mode set, as convert() does
+    if 'background' not in _surfaces:
+        _surfaces['background'] = scaled(BOARD_IMAGE, (SIZE_W, SIZE_H), False).convert()
+    return _surfaces['background']
+
+
+def piece_surfaces() -> dict:
+    # One converted surface per piece code, cut out of the sprite sheet once instead of on every blit
+    if 'pieces' not in _surfaces:
+        sheet = scaled(PIECES_IMAGE, (PIECES_PIXEL_W * piece_factor, PIECES_PIXEL_H * piece_factor), True)
+        surfaces = {}
+        for kind, column in SPRITE_COLUMNS.items():
+            for side, top in ((0, 0), (BLACK, PIECE_BOX_H)):
+                area = pygame.Rect(column, top, PIECE_BOX_H, PIECE_BOX_W).clip(sheet.get_rect())
+                surfaces[kind | side] = sheet.subsurface(area).convert_alpha()
+        _surfaces['pieces'] = surfaces
+    return _surfaces['pieces']
+
+
+class Sounds:
+    # Decoded in a thread once the first frame is up, so the window opens without waiting for them. A sound asked
+    # for before then is just not played; the start sound plays as soon as it is ready
+    def __init__(self):
+        self.sounds = {}
+        self.thread = None
+
+    def load(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._load, daemon=True)
+            self.thread.start()
+
+    def _load(self):
+        for name in SOUNDS:
+            try:
+                sound = pygame.mixer.Sound('Sounds/{}_sound.wav'.format(name))
+            except pygame.error:
+                continue
+            self.sounds[name] = sound
+            if name == 'start':
+                sound.play()
+
+    def play(self, name: str):
+        sound = self.sounds.get(name)
+        if sound is not None:
+            sound.play()
@@ -0,0 +1,72 @@
+# Compares positions per second of the NumPy batch functions with looping over Board objects, on positions from
+# random games. Needs NumPy.
+# Run from the repository root: python -m benchmarks.batch [--positions N]
+import argparse
+import random
+import time
+
+from core import batch
+from core.board import Board
+from core.engine import random_move
+from core.evaluation import evaluate
+
+
+def random_positions(count: int) -> list:
+    boards = []
+    while len(boards) < count:
+        board = Board()
+        for _ in range(random.randrange(1, 120)):
+            move = random_move(board, board.turn)
+            if move is None:
+                break
+            board.make_move(*move)
+            boards.append(board.copy())
+    return boards[:count]
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--positions', type=int, default=50000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    boards = random_positions(args.positions)
+    packed = b''.join(board.pack() for board in boards)
+    codes, turns = batch.from_boards(boards)
+    planes = batch.planes(codes)
+    count = len(boards)
+
+    # Looping is_attacked over every square is slow enough that a twentieth of the positions will do
+    sample = boards[:max(count // 20, 1)]
+    rows = (
+        ('in check', boards, lambda: [board.is_check(board.turn) for board in boards],
+         lambda: batch.in_check(codes, turns)),
+        ('evaluation', boards, lambda: [evaluate(board, board.turn) for board in boards],
+         lambda: batch.evaluate(codes, turns)),
+        ('attacked squares', sample,
+         lambda: [[board.is_attacked((sq & 7, sq >> 3), 'white') for sq in range(64)] for board in sample],
+         lambda: batch.attack_masks(codes, 'white')),
+    )
+    print('{:<18} {:>14} {:>14} {:>8}'.format('positions/s', 'loop', 'batch', 'gain'))
+    for name, looped_boards, loop, vectorized in rows:
+        looped = len(looped_boards) / timed(loop)
+        batched = count / timed(vectorized)
+        print('{:<18} {:>14,.0f} {:>14,.0f} {:>7.1f}x'.format(name, looped, batched, batched / looped))
+
+    print('\nbatch only, positions per second')
+    for name, function in (('from Board objects', lambda: batch.from_boards(boards)),
+                           ('from packed bytes', lambda: batch.from_packed(packed)),
+                           ('to 12x64 planes', lambda: batch.planes(codes)),
+                           ('in check from planes', lambda: batch.in_check(planes, turns)),
+                           ('material', lambda: batch.material(codes))):
+        print('{:<22} {:>14,.0f}'.format(name, count / timed(function)))
+
+
+if __name__ == '__main__':
+    main()
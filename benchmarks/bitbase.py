@@ -0,0 +1,91 @@
+# Times bitbase probes on random positions of each table, generating the tables first when the directory lacks them,
+# then checks that the engine with the tables plays won endings through to mate instead of repeating moves.
+# Run from the repository root: python -m benchmarks.bitbase [--dir bitbases] [--probes N] [--jobs N] [--no-play]
+import argparse
+import os
+import random
+import time
+
+from core.bitbase import Bitbases, build_bitbases, slot_codes, table_path, DEFAULT_SIGNATURES, WIN, DRAW, LOSS
+from core.board import Board
+from core.engine import Engine
+from core.pieces import KING, BLACK, PAWN
+
+# Won endings with the seconds per move, which once ended in threefold repetition
+ENDINGS = (('7k/8/8/8/8/8/8/R3K3 w - - 0 1', 0.3), ('8/8/8/4k3/8/8/8/K6R w - - 0 1', 0.1),
+           ('8/8/8/4k3/8/8/8/K6Q w - - 0 1', 0.1))
+
+
+def random_positions(signature: str, count: int) -> list:
+    # Legal positions with the material of signature, with either side as the stronger one
+    positions = []
+    while len(positions) < count:
+        flipped = random.random() < 0.5
+        codes = (KING | (BLACK if flipped else 0), KING | (0 if flipped else BLACK)) + slot_codes(signature, flipped)
+        squares = bytearray(64)
+        for code, sq in zip(codes, random.sample(range(64), len(codes))):
+            squares[sq] = code
+        if any(code & 7 == PAWN for code in squares[:8] + squares[56:]):
+            continue
+        board = Board.from_squares(squares, random.choice(('white', 'black')))
+        if not board.is_check('black' if board.turn == 'white' else 'white'):
+            positions.append(board)
+    return positions
+
+
+def play_out(fen: str, movetime: float, bitbases: Bitbases) -> tuple:
+    # The engine plays both sides until the game ends, at most 200 plies
+    board = Board.from_fen(fen)
+    engine = Engine(movetime, bitbases=bitbases)
+    outcome = board.outcome()
+    while outcome is None and len(board.undo_stack) < 200:
+        board.make_move(*engine.choose_move(board, board.turn))
+        outcome = board.outcome()
+    return outcome, len(board.undo_stack)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default='bitbases')
+    parser.add_argument('--probes', type=int, default=20000)
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes for tables that must be generated')
+    parser.add_argument('--no-play', action='store_true', help='skip playing the won endings out')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if build_bitbases(DEFAULT_SIGNATURES, args.dir, args.jobs):
+        print('generated in {:.1f}s'.format(time.perf_counter() - start))
+    bitbases = Bitbases(args.dir)
+    random.seed(0)
+    print('{:<8} {:>10} {:>10} {:>8} {:>8} {:>8}'.format('table', 'bytes', 'probe', 'won', 'drawn', 'lost'))
+    for signature in DEFAULT_SIGNATURES:
+        positions = random_positions(signature, 1000)
+        results = [bitbases.probe(board) for board in positions]
+        start = time.perf_counter()
+        for i in range(args.probes):
+            bitbases.probe(positions[i % len(positions)])
+        elapsed = (time.perf_counter() - start) / args.probes
+        print('{:<8} {:>10} {:>8.2f}us {:>8} {:>8} {:>8}'.format(
+            signature, os.path.getsize(table_path(args.dir, signature)), elapsed * 1e6, results.count(WIN),
+            results.count(DRAW), results.count(LOSS)))
+    board = Board()
+    start = time.perf_counter()
+    for _ in range(args.probes):
+        bitbases.probe(board)
+    print('{:<8} {:>10} {:>8.2f}us  (no table, too many pieces)'.format(
+        'start', '', (time.perf_counter() - start) / args.probes * 1e6))
+
+    if args.no_play:
+        return
+    failed = 0
+    for fen, movetime in ENDINGS:
+        outcome, plies = play_out(fen, movetime, bitbases)
+        mated = outcome is not None and outcome[1] == 'checkmate'
+        failed += not mated
+        print('{:<34} {:>4} plies  {}'.format(fen, plies, outcome[1] if outcome else 'unfinished'))
+    if failed:
+        raise SystemExit('{} won ending(s) not converted to mate'.format(failed))
+
+
+if __name__ == '__main__':
+    main()
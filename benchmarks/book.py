@@ -0,0 +1,71 @@
+# Times opening book lookups through mmap: the binary search alone, the legal book moves of a position and a weighted
+# pick. Without --pgn the book is built from random games played here first.
+# Run from the repository root: python -m benchmarks.book [--pgn games.pgn] [--plies N] [--lookups N]
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from core.board import Board
+from core.book import OpeningBook, build_book
+from core.engine import random_move
+from core.notation import pgn
+from core.polyglot import polyglot_key
+from core.selfplay import play_game
+
+
+def random_games(path: str, games: int):
+    # Random games scored as draws, so every move they contain ends up in the book
+    chooser = {'white': random_move, 'black': random_move}
+    with open(path, 'w') as file:
+        for _ in range(games):
+            sans = play_game(chooser, 40)[0]
+            file.write(pgn({'Result': '1/2-1/2'}, sans, '1/2-1/2'))
+
+
+def timed(function, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pgn', help='build the book from these games instead of random ones')
+    parser.add_argument('--games', type=int, default=2000, help='random games to build the book from')
+    parser.add_argument('--plies', type=int, default=16)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    directory = tempfile.mkdtemp()
+    pgn_path = args.pgn
+    if pgn_path is None:
+        pgn_path = os.path.join(directory, 'games.pgn')
+        random_games(pgn_path, args.games)
+    book_path = os.path.join(directory, 'book.bin')
+    start = time.perf_counter()
+    entries = build_book(pgn_path, book_path, args.plies)
+    print('built {} entries ({} bytes) in {:.2f}s'.format(entries, os.path.getsize(book_path),
+                                                          time.perf_counter() - start))
+
+    start = time.perf_counter()
+    book = OpeningBook(book_path)
+    print('opened in {:.1f}us'.format((time.perf_counter() - start) * 1e6))
+    board = Board()
+    key = polyglot_key(board)
+    print('{:<22} {:>9.1f}us'.format('position key', timed(lambda: polyglot_key(board), args.lookups)))
+    print('{:<22} {:>9.1f}us'.format('binary search', timed(lambda: book.find(key), args.lookups)))
+    print('{:<22} {:>9.1f}us  ({} moves)'.format('legal book moves', timed(lambda: book.entries(board), args.lookups),
+                                                 len(book.entries(board))))
+    print('{:<22} {:>9.1f}us'.format('weighted pick', timed(lambda: book.choose(board), args.lookups)))
+    book.close()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# Compares evaluations per second from the running sums Board keeps with a full recount of the same terms, and the
+# cost the sums add to making and unmaking moves.
+# Run from the repository root: python -m benchmarks.evaluation [--depth N]
+import argparse
+import time
+
+from core import evaluation
+from core.board import Board
+from core.engine import Engine, generate_moves
+from core.evaluation import evaluate, score_squares, pawn_structure, TOTAL_PHASE
+
+POSITIONS = {
+    'start': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'kiwipete': 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'endgame': '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    'middlegame': 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+}
+
+
+def measure(function, min_time=0.5):
+    count = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return count / elapsed
+
+
+def recount(board, color):
+    # What evaluate costs without the running sums and the pawn cache
+    mg, eg, phase, _ = score_squares(board.squares)
+    pawn_mg, pawn_eg = pawn_structure(board.squares)
+    phase = min(phase, TOTAL_PHASE)
+    score = ((mg + pawn_mg) * phase + (eg + pawn_eg) * (TOTAL_PHASE - phase)) // TOTAL_PHASE
+    return score if color == 'white' else -score
+
+
+def make_unmake(board, moves):
+    for move in moves:
+        board.make_move(*move)
+        board.unmake_move()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=4, help='depth of the searches that check the running sums')
+    args = parser.parse_args()
+
+    print('{:<12} {:>14} {:>14} {:>8} {:>16}'.format('position', 'recount', 'incremental', 'gain', 'make+unmake'))
+    for name, fen in POSITIONS.items():
+        board = Board.from_fen(fen)
+        assert evaluate(board, board.turn) == recount(board, board.turn)
+        moves = generate_moves(board, board.turn)
+        full = measure(lambda: recount(board, board.turn))
+        incremental = measure(lambda: evaluate(board, board.turn))
+        moves_per_second = measure(lambda: make_unmake(board, moves)) * len(moves)
+        print('{:<12} {:>14,.0f} {:>14,.0f} {:>7.1f}x {:>16,.0f}'.format(
+            name, full, incremental, incremental / full, moves_per_second))
+
+    # Every evaluation in these searches compares the running sums with a recount
+    evaluation.DEBUG = True
+    for fen in POSITIONS.values():
+        board = Board.from_fen(fen)
+        Engine(60).search(board, board.turn, max_depth=args.depth)
+    evaluation.DEBUG = False
+    print('running sums matched a recount at every node to depth {}'.format(args.depth))
+
+
+if __name__ == '__main__':
+    main()
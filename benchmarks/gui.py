@@ -0,0 +1,135 @@
+# Measures how long the window takes to show its first frame, and the time per frame of redrawing the board, with
+# the images decoded and scaled on every start and pieces blitted out of the unconverted sprite sheet as before the
+# asset cache, and with the cached, converted per-piece surfaces, cold and warm. Runs without a window by default.
+# Run from the repository root: python -m benchmarks.gui [--frames N] [--runs N] [--window]
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+STARTUP = '''
+import os, sys, time
+start = time.perf_counter()
+import pygame
+import assets
+from constants import *
+from core.board import Board
+from Piece import SPRITE_X
+pygame.mixer.pre_init(44100, -16, 2, 1)
+pygame.init()
+screen = pygame.display.set_mode((SIZE_W, SIZE_H))
+board = Board()
+if sys.argv[1] == 'decode':
+    background = pygame.transform.scale(pygame.image.load(assets.BOARD_IMAGE), (SIZE_W, SIZE_H))
+    sheet = pygame.transform.scale(pygame.image.load(assets.PIECES_IMAGE),
+                                   (PIECES_PIXEL_W * piece_factor, PIECES_PIXEL_H * piece_factor))
+    for name in assets.SOUNDS:
+        pygame.mixer.Sound('Sounds/{}_sound.wav'.format(name))
+    screen.blit(background, (0, 0))
+    for sq, code in enumerate(board.squares):
+        if code:
+            top = PIECE_BOX_H if code & 8 else 0
+            screen.blit(sheet, ((sq & 7) * BLOCK_W + OFFSET_X, (sq >> 3) * BLOCK_H + OFFSET_Y),
+                        (SPRITE_X[code & 7], top, PIECE_BOX_H, PIECE_BOX_W))
+else:
+    from Piece import draw
+    screen.blit(assets.background(), (0, 0))
+    for sq, code in enumerate(board.squares):
+        if code:
+            draw(code, screen, (sq & 7, sq >> 3))
+    # Sounds are decoded after this frame, so they are not part of the startup
+pygame.display.update()
+print(time.perf_counter() - start)
+'''
+
+
+def startup(mode: str, runs: int, cache: str) -> float:
+    times = []
+    for _ in range(runs):
+        if mode == 'cold':
+            shutil.rmtree(cache, ignore_errors=True)
+        script = 'import assets; assets.CACHE_DIR = {!r}\n'.format(cache) + STARTUP
+        output = subprocess.run([sys.executable, '-c', script, mode], capture_output=True, text=True, check=True)
+        times.append(float(output.stdout.split()[-1]))
+    times.sort()
+    return times[len(times) // 2]
+
+
+def frames(count: int, cache: str) -> dict:
+    import time
+    import pygame
+    import assets
+    from constants import SIZE_W, SIZE_H, PIECES_PIXEL_W, PIECES_PIXEL_H, PIECE_BOX_W, PIECE_BOX_H, piece_factor
+    from core.board import Board
+    from Piece import SPRITE_X, draw
+    from utils import square_rect
+
+    assets.CACHE_DIR = cache
+    pygame.init()
+    screen = pygame.display.set_mode((SIZE_W, SIZE_H))
+    scene = pygame.Surface((SIZE_W, SIZE_H))
+    board = Board()
+    squares = [((sq & 7, sq >> 3), code) for sq, code in enumerate(board.squares)]
+    decoded = pygame.transform.scale(pygame.image.load(assets.BOARD_IMAGE), (SIZE_W, SIZE_H))
+    sheet = pygame.transform.scale(pygame.image.load(assets.PIECES_IMAGE),
+                                   (PIECES_PIXEL_W * piece_factor, PIECES_PIXEL_H * piece_factor))
+    background = assets.background()
+
+    def sheet_frame():
+        # Every square redrawn, as after a new game or a jump through the move list
+        scene.blit(decoded, (0, 0))
+        for coord, code in squares:
+            rect = square_rect(coord)
+            scene.blit(decoded, rect, rect)
+            if code:
+                scene.blit(sheet, rect.topleft, (SPRITE_X[code & 7], PIECE_BOX_H if code & 8 else 0, PIECE_BOX_H,
+                                                 PIECE_BOX_W))
+        screen.blit(scene, (0, 0))
+
+    def cached_frame():
+        scene.blit(background, (0, 0))
+        for coord, code in squares:
+            rect = square_rect(coord)
+            scene.blit(background, rect, rect)
+            if code:
+                draw(code, scene, coord)
+        screen.blit(scene, (0, 0))
+
+    results = {}
+    for name, frame in (('sprite sheet', sheet_frame), ('cached surfaces', cached_frame)):
+        frame()
+        start = time.perf_counter()
+        for _ in range(count):
+            frame()
+        results[name] = (time.perf_counter() - start) / count
+    pygame.quit()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per startup measurement')
+    parser.add_argument('--window', action='store_true', help='open a real window instead of the dummy driver')
+    args = parser.parse_args()
+
+    if not args.window:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    cache = tempfile.mkdtemp()
+    try:
+        print('first frame, median of {} starts'.format(args.runs))
+        for mode, label in (('decode', 'decoded every start'), ('cold', 'cache cold'), ('warm', 'cache warm')):
+            print('  {:<22} {:>8.1f}ms'.format(label, startup(mode, args.runs, cache) * 1e3))
+        print('full board redraw, per frame')
+        for name, seconds in frames(args.frames, cache).items():
+            print('  {:<22} {:>8.1f}us'.format(name, seconds * 1e6))
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# Measures how long importing each module takes in a fresh interpreter, and whether it pulls in pygame. Exits with
+# an error when a core module goes over its budget or imports pygame. The bytecode is compiled first, as an installed
+# package has it, so a PYTHONDONTWRITEBYTECODE environment does not measure the compiler instead.
+# Run from the repository root: python -m benchmarks.import_time [--runs N] [--budget MS]
+import argparse
+import compileall
+import subprocess
+import sys
+
+MODULES = ('core', 'core.bitboard', 'core.engine', 'core.perft', 'core.parallel', 'Board')
+# Milliseconds a core module may take to import; about 5 ms is measured, so noisy machines still pass
+BUDGET_MS = 10
+
+SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import {}
+print(time.perf_counter() - start, 'pygame' in sys.modules)
+'''
+
+
+def measure(module, runs):
+    times = []
+    pygame = False
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', SCRIPT.format(module)], capture_output=True, text=True,
+                                check=True).stdout.split()  # pygame may print a banner first
+        times.append(float(output[-2]))
+        pygame = output[-1] == 'True'
+    times.sort()
+    return times[len(times) // 2], pygame
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7, help='fresh interpreters started per module')
+    parser.add_argument('--budget', type=float, default=BUDGET_MS, help='milliseconds allowed per core module')
+    args = parser.parse_args()
+
+    compileall.compile_dir('core', quiet=1)
+    failures = []
+
+    baseline, _ = measure('Board', args.runs)
+    print('{:<16} {:>10} {:>10} {:>8}'.format('module', 'median', 'vs Board', 'pygame'))
+    for module in MODULES:
+        median, pygame = measure(module, args.runs)
+        print('{:<16} {:>8.1f}ms {:>9.1f}x {:>8}'.format(module, median * 1000, baseline / median,
+                                                         'yes' if pygame else 'no'))
+        if module.startswith('core') and (median * 1000 > args.budget or pygame):
+            failures.append(module)
+    if failures:
+        raise SystemExit('over the {:g}ms budget or importing pygame: {}'.format(args.budget, ', '.join(failures)))
+
+
+if __name__ == '__main__':
+    main()
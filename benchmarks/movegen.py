@@ -0,0 +1,293 @@
+# Compares moves generated per second by BitBoard with the Piece classes on the same positions, and with the original
+# generator the game shipped with: one Piece object per square of a List[List] board, and a full copy of the board
+# per candidate move to test it for check. That one is kept here as the baseline, reduced to what move generation uses.
+# Run from the repository root: python -m benchmarks.movegen
+import time
+
+from core.bitboard import BitBoard, COLORS
+from core.pieces import piece_color, piece_type, pawn_direction, opposite_color, PAWN, KNIGHT, BISHOP, ROOK, \
+    QUEEN, KING, WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE
+from core.utils import isvalid
+
+POSITIONS = {
+    'start': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'kiwipete': 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'endgame': '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    'promotions': 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+    'middlegame': 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+}
+
+
+def measure(function, min_time=0.5):
+    count = 0
+    start = time.perf_counter()
+    while True:
+        count += function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return count / elapsed
+
+
+def go_til_hit(board, position, direction):
+    moves = []
+    capture = None
+    px = position[0] + direction[0]
+    py = position[1] + direction[1]
+    while isvalid((px, py)) and board[py][px] is None:
+        moves.append((px, py))
+        px += direction[0]
+        py += direction[1]
+    if isvalid((px, py)) and (board[py][px].color != board[position[1]][position[0]].color):
+        capture = (px, py)
+    return moves, capture
+
+
+class OldPiece:
+    def __init__(self, color):
+        self.color = color
+
+    def steps(self, board, position, targets):
+        moves = []
+        captures = []
+        for x, y in targets:
+            move = (position[0] + x, position[1] + y)
+            if isvalid(move):
+                value = board[move[1]][move[0]]
+                if value is not None and value.color != self.color:
+                    captures.append(move)
+                elif value is None:
+                    moves.append(move)
+        return moves, captures
+
+    def rays(self, board, position, directions):
+        moves = []
+        captures = []
+        for direction in directions:
+            m, c = go_til_hit(board, position, direction)
+            moves += m
+            if c is not None:
+                captures.append(c)
+        return moves, captures
+
+
+class OldPawn(OldPiece):
+    def __init__(self, color, direction, two=True):
+        super().__init__(color)
+        self.direction = direction
+        self.two = two
+
+    def get_mvs_and_caps(self, board, position):
+        move = (position[0], position[1] + self.direction)
+        moves = []
+        if not isvalid(move):
+            return [], []
+        if board[move[1]][move[0]] is None:
+            moves = [move]
+        two_move = (move[0], move[1] + self.direction)
+        if self.two and isvalid(two_move) and board[two_move[1]][two_move[0]] is None and \
+                board[move[1]][move[0]] is None:
+            moves.append(two_move)
+        captures = []
+        for capture in ((move[0] - 1, move[1]), (move[0] + 1, move[1])):
+            if isvalid(capture):
+                other = board[capture[1]][capture[0]]
+                if other is not None and other.color != self.color:
+                    captures.append(capture)
+        return moves, captures
+
+    def copy(self):
+        return OldPawn(self.color, self.direction, self.two)
+
+
+class OldKnight(OldPiece):
+    def get_mvs_and_caps(self, board, position):
+        return self.steps(board, position, [(x, (3 - abs(x)) * y) for x in (-2, -1, 1, 2) for y in (-1, 1)])
+
+    def copy(self):
+        return OldKnight(self.color)
+
+
+class OldBishop(OldPiece):
+    def get_mvs_and_caps(self, board, position):
+        return self.rays(board, position, ((-1, -1), (-1, 1), (1, -1), (1, 1)))
+
+    def copy(self):
+        return OldBishop(self.color)
+
+
+class OldRook(OldPiece):
+    def __init__(self, color, moved=False):
+        super().__init__(color)
+        self.moved = moved
+
+    def get_mvs_and_caps(self, board, position):
+        return self.rays(board, position, ((-1, 0), (1, 0), (0, -1), (0, 1)))
+
+    def copy(self):
+        return OldRook(self.color, self.moved)
+
+
+class OldQueen(OldPiece):
+    def get_mvs_and_caps(self, board, position):
+        return self.rays(board, position, ((-1, -1), (-1, 0), (-1, 1), (1, -1), (1, 0), (1, 1), (0, -1), (0, 1)))
+
+    def copy(self):
+        return OldQueen(self.color)
+
+
+class OldKing(OldPiece):
+    def __init__(self, color, moved=False):
+        super().__init__(color)
+        self.moved = moved
+
+    def get_mvs_and_caps(self, board, position):
+        moves, captures = self.steps(board, position, [(x, y) for x in (-1, 0, 1) for y in (-1, 0, 1) if x or y])
+        if not self.moved:
+            row = board[position[1]]
+            if row[position[0] + 1] is None and row[position[0] + 2] is None and isinstance(row[7], OldRook) and \
+                    not row[7].moved:
+                moves.append((position[0] + 2, position[1]))
+            if row[position[0] - 1] is None and row[position[0] - 2] is None and row[position[0] - 3] is None and \
+                    isinstance(row[0], OldRook) and not row[0].moved:
+                moves.append((position[0] - 2, position[1]))
+        return moves, captures
+
+    def copy(self):
+        return OldKing(self.color, self.moved)
+
+
+class OldBoard:
+    def __init__(self, board, en_passant=None):
+        self.board = board
+        self.en_passant = en_passant
+
+    @classmethod
+    def from_board(cls, board):
+        # Rooks and kings count as moved once the castling rights they take part in are gone
+        rights = {(7, 7): WHITE_KING_SIDE, (0, 7): WHITE_QUEEN_SIDE, (7, 0): BLACK_KING_SIDE, (0, 0): BLACK_QUEEN_SIDE}
+        kings = {'white': WHITE_KING_SIDE | WHITE_QUEEN_SIDE, 'black': BLACK_KING_SIDE | BLACK_QUEEN_SIDE}
+        rows = [[None] * 8 for _ in range(8)]
+        for sq, code in enumerate(board.squares):
+            if not code:
+                continue
+            x, y = sq & 7, sq >> 3
+            color = piece_color(code)
+            kind = code & 7
+            if kind == PAWN:
+                direction = pawn_direction(code)
+                piece = OldPawn(color, direction, y == (1 if direction == 1 else 6))
+            elif kind == ROOK:
+                piece = OldRook(color, not board.castling & rights.get((x, y), 0))
+            elif kind == KING:
+                piece = OldKing(color, not board.castling & kings[color])
+            else:
+                piece = {KNIGHT: OldKnight, BISHOP: OldBishop, QUEEN: OldQueen}[kind](color)
+            rows[y][x] = piece
+        return cls(rows, board.en_passant)
+
+    def is_check(self, color, position=None):
+        for i in range(8):
+            for j in range(8):
+                piece = self.board[i][j]
+                if piece is None or piece.color == color:
+                    continue
+                _, caps = piece.get_mvs_and_caps(self.board, (j, i))
+                for other in caps:
+                    if position is None and isinstance(self.board[other[1]][other[0]], OldKing):
+                        return True
+                    if position is not None and other == position:
+                        return True
+        return False
+
+    def copy(self):
+        return OldBoard([[None if piece is None else piece.copy() for piece in row] for row in self.board])
+
+    def move(self, original, final, color):
+        piece = self.board[original[1]][original[0]]
+        self.board[original[1]][original[0]] = None
+        if isinstance(piece, OldPawn) and self.en_passant is not None:
+            other = self.board[self.en_passant[1]][self.en_passant[0]]
+            if piece.color != other.color and final == (self.en_passant[0], self.en_passant[1] - other.direction):
+                self.board[self.en_passant[1]][self.en_passant[0]] = None
+        if isinstance(piece, OldKing) and abs(final[0] - original[0]) == 2:
+            corner, beside = (7, final[0] - 1) if final[0] > original[0] else (0, final[0] + 1)
+            self.board[original[1]][beside] = self.board[original[1]][corner]
+            self.board[original[1]][corner] = None
+        self.board[final[1]][final[0]] = piece
+        return 'check' if self.is_check(opposite_color(color)) else 'move'
+
+    def get_move_options(self, position):
+        new_mvs = []
+        new_caps = []
+        piece = self.board[position[1]][position[0]]
+        mvs, caps = piece.get_mvs_and_caps(self.board, position)
+        if self.en_passant is not None and isinstance(piece, OldPawn) and position[1] == self.en_passant[1] \
+                and abs(position[0] - self.en_passant[0]) == 1:
+            other = self.board[self.en_passant[1]][self.en_passant[0]]
+            if piece.color != other.color:
+                mvs.append((self.en_passant[0], self.en_passant[1] - other.direction))
+        for mv in mvs:
+            test = self.copy()
+            test.en_passant = self.en_passant
+            x = test.move(position, mv, opposite_color(piece.color))
+            if isinstance(piece, OldKing) and abs(mv[0] - position[0]) == 2 and not self.is_check(piece.color) and \
+                    test.is_check(piece.color, ((mv[0] + position[0]) / 2, position[1])):
+                continue
+            if x != 'check':
+                new_mvs.append(mv)
+        for mv in caps:
+            test = self.copy()
+            x = test.move(position, mv, opposite_color(piece.color))
+            if x != 'check':
+                new_caps.append(mv)
+        return new_mvs, new_caps
+
+    def legal_moves(self, turn):
+        count = 0
+        for y in range(8):
+            for x in range(8):
+                piece = self.board[y][x]
+                if piece is not None and piece.color == turn:
+                    mvs, caps = self.get_move_options((x, y))
+                    count += len(mvs) + len(caps)
+        return count
+
+
+def piece_pseudo_legal(board, turn):
+    count = 0
+    for sq, code in enumerate(board.squares):
+        if code and piece_color(code) == turn:
+            mvs, caps = piece_type(code).get_mvs_and_caps(board.squares, (sq & 7, sq >> 3), code, board.castling)
+            count += len(mvs) + len(caps)
+    return count
+
+
+def main():
+    print('{:<12} {:>14} {:>14} {:>8} {:>14} {:>14} {:>14} {:>8} {:>8}'.format(
+        'position', 'Piece pseudo', 'BitBoard', 'gain', 'original legal', 'Board legal', 'BitBoard', 'gain',
+        'vs orig'))
+    for name, fen in POSITIONS.items():
+        position = BitBoard.from_fen(fen)
+        board = position.to_board()
+        original = OldBoard.from_board(board)
+        turn = COLORS[position.turn]
+        # The baseline has to agree with the others, or its speed says nothing
+        assert original.legal_moves(turn) == len(board.legal_moves(turn)) == len(position.generate_moves()), name
+
+        old_pseudo = measure(lambda: piece_pseudo_legal(board, turn))
+        new_pseudo = measure(lambda: len(position.generate_moves(legal=False)))
+        orig_legal = measure(lambda: original.legal_moves(turn))
+        old_legal = measure(lambda: len(board.legal_moves(turn)))
+        new_legal = measure(lambda: len(position.generate_moves()))
+        print('{:<12} {:>14,.0f} {:>14,.0f} {:>7.1f}x {:>14,.0f} {:>14,.0f} {:>14,.0f} {:>7.1f}x {:>7.0f}x'.format(
+            name, old_pseudo, new_pseudo, new_pseudo / old_pseudo, orig_legal, old_legal, new_legal,
+            new_legal / old_legal, new_legal / orig_legal))
+
+        # Same legal moves, decoded to the ((x, y), (x, y), promotion) tuples Simulation works with
+        coordinates = measure(lambda: len(position.legal_moves()))
+        print('{:<12} {:>14} {:>14} {:>8} {:>14} {:>14} {:>14,.0f} {:>7.1f}x {:>7.0f}x'.format(
+            '', '', '', '', '', '(x, y) API', coordinates, coordinates / old_legal, coordinates / orig_legal))
+
+
+if __name__ == '__main__':
+    main()
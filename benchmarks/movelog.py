@@ -0,0 +1,64 @@
+# Time to jump to random plies of a long game through MoveLog, and the bytes it keeps per ply. Every jump is checked
+# against the position and, until the fifty-move rule ends the game, the repetition count recorded while it was played.
+# Run from the repository root: python -m benchmarks.movelog [--plies N] [--jumps N]
+import argparse
+import random
+import time
+
+from core.board import Board
+from core.engine import generate_moves
+from core.movelog import MoveLog, FIFTY_MOVES
+
+
+def long_game(plies: int):
+    # Random moves, starting over from the first position whenever a game ends, until plies moves are logged
+    board = Board()
+    log = MoveLog(board)
+    fens = [board.fen()]
+    hashes = [board.hash]
+    counts = [1]
+    while len(log) < plies:
+        moves = generate_moves(board, board.turn)
+        if not moves:
+            board = log.goto(board, 0)
+            del fens[1:], hashes[1:], counts[1:]
+            continue
+        move = random.choice(moves)
+        board.make_move(*move)
+        log.push(board, move)
+        fens.append(board.fen())
+        hashes.append(board.hash)
+        counts.append(hashes[max(len(hashes) - 1 - board.halfmove, 0):].count(board.hash))
+    return board, log, fens, counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plies', type=int, default=5000)
+    parser.add_argument('--jumps', type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    board, log, fens, counts = long_game(args.plies)
+    size = log.moves.itemsize * len(log.moves) + sum(len(keyframe) for keyframe in log.keyframes)
+    print('{} plies logged in {} bytes, {:.1f} bytes per ply'.format(len(log), size, size / len(log)))
+
+    for name, step in (('step back', lambda ply: ply - 1), ('step forward', lambda ply: ply + 1),
+                       ('random ply', lambda ply: random.randrange(len(log) + 1))):
+        times = []
+        for _ in range(args.jumps):
+            target = min(max(step(log.ply), 0), len(log))
+            start = time.perf_counter()
+            board = log.goto(board, target)
+            times.append(time.perf_counter() - start)
+            if board.fen() != fens[target]:
+                raise AssertionError('wrong position at ply {}'.format(target))
+            if board.halfmove < FIFTY_MOVES and board.repetitions() != counts[target]:
+                raise AssertionError('wrong repetition count at ply {}'.format(target))
+        times.sort()
+        print('{:<14} mean {:>7.3f}ms  p99 {:>7.3f}ms  max {:>7.3f}ms'.format(
+            name, 1000 * sum(times) / len(times), 1000 * times[len(times) * 99 // 100], 1000 * times[-1]))
+
+
+if __name__ == '__main__':
+    main()
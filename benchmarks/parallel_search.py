@@ -0,0 +1,41 @@
+# Time-to-depth of the root-splitting parallel search at several worker counts.
+# Run from the repository root: python -m benchmarks.parallel_search [--depth N] [--workers 1 2 4 8]
+import argparse
+import time
+
+from core.parallel import ParallelEngine
+from core.perft import load_fen
+
+POSITIONS = {
+    'start': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'kiwipete': 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'middlegame': 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    'italian': 'r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    baseline = {}
+    print('{:<12} {:>8} {:>10} {:>12} {:>10} {:>8}'.format('position', 'workers', 'time', 'nodes', 'nps', 'speedup'))
+    for workers in args.workers:
+        for name, fen in POSITIONS.items():
+            # A fresh pool per run so no transposition table survives from another measurement
+            engine = ParallelEngine(workers, time_limit=3600)
+            engine.start()
+            board, color = load_fen(fen)
+            start = time.perf_counter()
+            move, score, depth = engine.search(board, color, max_depth=args.depth)
+            elapsed = time.perf_counter() - start
+            engine.close()
+            baseline.setdefault(name, elapsed)
+            print('{:<12} {:>8} {:>9.2f}s {:>12} {:>10.0f} {:>7.2f}x'.format(
+                name, workers, elapsed, engine.nodes, engine.nodes / elapsed, baseline[name] / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Runs the standard perft positions, checks the node counts and reports speed.
+# Run from the repository root: python -m benchmarks.perft_suite [--depth N] [--backend board|bitboard]
+import argparse
+import sys
+import time
+
+from core.bitboard import BitBoard
+from core.perft import load_fen, perft
+
+# (name, fen, node counts for depth 1, 2, ...)
+POSITIONS = (
+    ('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     (20, 400, 8902, 197281, 4865609)),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     (48, 2039, 97862, 4085603)),
+    ('en passant', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     (14, 191, 2812, 43238, 674624)),
+    ('promotions', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     (6, 264, 9467, 422333)),
+    ('promotions mirrored', 'r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1',
+     (6, 264, 9467, 422333)),
+    ('castling', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     (44, 1486, 62379, 2103487)),
+    ('middlegame', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     (46, 2079, 89890, 3894594)),
+)
+
+
+def bitboard_perft(position, depth):
+    moves = position.generate_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        child = position.copy()
+        child.play(move)
+        nodes += bitboard_perft(child, depth - 1)
+    return nodes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=3, help='deepest level to run for every position')
+    parser.add_argument('--backend', choices=('board', 'bitboard'), default='board')
+    args = parser.parse_args()
+
+    total_nodes = 0
+    total_time = 0.0
+    failures = 0
+    print('{:<20} {:>5} {:>10} {:>10} {:>9} {:>10}'.format('position', 'depth', 'nodes', 'expected', 'time', 'nps'))
+    for name, fen, expected in POSITIONS:
+        for depth in range(1, min(args.depth, len(expected)) + 1):
+            if args.backend == 'board':
+                board, color = load_fen(fen)
+                start = time.perf_counter()
+                nodes = perft(board, color, depth)
+            else:
+                position = BitBoard.from_fen(fen)
+                start = time.perf_counter()
+                nodes = bitboard_perft(position, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            status = '' if nodes == expected[depth - 1] else '  MISMATCH'
+            failures += bool(status)
+            print('{:<20} {:>5} {:>10} {:>10} {:>8.3f}s {:>10.0f}{}'.format(
+                name, depth, nodes, expected[depth - 1], elapsed, nodes / elapsed if elapsed else 0, status))
+
+    print('total {} nodes in {:.3f}s, {:.0f} nodes per second'.format(total_nodes, total_time,
+                                                                     total_nodes / total_time))
+    if failures:
+        print('{} node counts did not match'.format(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
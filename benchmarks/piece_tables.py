@@ -0,0 +1,126 @@
+# Pseudo-legal moves per second for each piece type: the table-driven generators in core.pieces against
+# the offset and step-by-step ray walking they replaced, kept here as the reference.
+# Run from the repository root: python -m benchmarks.piece_tables
+import time
+
+from core.board import Board
+from core.pieces import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK, KINDS
+from core.utils import isvalid
+
+POSITIONS = {
+    'start': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'kiwipete': 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'middlegame': 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    'endgame': '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+}
+
+
+def go_til_hit(squares, position, direction, code):
+    moves = []
+    capture = None
+    px = position[0] + direction[0]
+    py = position[1] + direction[1]
+    while isvalid((px, py)) and not squares[8 * py + px]:
+        moves.append((px, py))
+        px += direction[0]
+        py += direction[1]
+    if isvalid((px, py)) and (squares[8 * py + px] ^ code) & BLACK:
+        capture = (px, py)
+    return moves, capture
+
+
+def offsets(squares, position, code, deltas):
+    moves = []
+    captures = []
+    for dx, dy in deltas:
+        move = (position[0] + dx, position[1] + dy)
+        if isvalid(move):
+            value = squares[8 * move[1] + move[0]]
+            if value and (value ^ code) & BLACK:
+                captures.append(move)
+            elif not value:
+                moves.append(move)
+    return moves, captures
+
+
+def rays(squares, position, code, directions):
+    moves = []
+    captures = []
+    for direction in directions:
+        m, c = go_til_hit(squares, position, direction, code)
+        moves += m
+        if c is not None:
+            captures.append(c)
+    return moves, captures
+
+
+def reference_pawn(squares, position, code):
+    direction = 1 if code & BLACK else -1
+    move = (position[0], position[1] + direction)
+    moves = []
+    if not isvalid(move):
+        return [], []
+    if not squares[8 * move[1] + move[0]]:
+        moves = [move]
+        if position[1] == (1 if code & BLACK else 6) and not squares[8 * (move[1] + direction) + move[0]]:
+            moves.append((move[0], move[1] + direction))
+    captures = []
+    for cx in (move[0] - 1, move[0] + 1):
+        if 0 <= cx < 8:
+            other = squares[8 * move[1] + cx]
+            if other and (other ^ code) & BLACK:
+                captures.append((cx, move[1]))
+    return moves, captures
+
+
+STRAIGHT = ((0, -1), (0, 1), (1, 0), (-1, 0))
+DIAGONAL = ((1, -1), (-1, -1), (1, 1), (-1, 1))
+REFERENCE = {
+    PAWN: reference_pawn,
+    KNIGHT: lambda s, p, c: offsets(s, p, c, ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1),
+                                              (-1, 2))),
+    BISHOP: lambda s, p, c: rays(s, p, c, DIAGONAL),
+    ROOK: lambda s, p, c: rays(s, p, c, STRAIGHT),
+    QUEEN: lambda s, p, c: rays(s, p, c, STRAIGHT + DIAGONAL),
+    KING: lambda s, p, c: offsets(s, p, c, ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))),
+}
+
+
+def measure(function, min_time=0.3):
+    count = 0
+    start = time.perf_counter()
+    while True:
+        count += function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return count / elapsed
+
+
+def main():
+    boards = [Board.from_fen(fen) for fen in POSITIONS.values()]
+    print('{:<8} {:>8} {:>14} {:>14} {:>8}'.format('piece', 'pieces', 'reference', 'tables', 'gain'))
+    for kind in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        pieces = [(board.squares, (sq & 7, sq >> 3), code) for board in boards
+                  for sq, code in enumerate(board.squares) if code & 7 == kind]
+        generate = KINDS[kind].get_mvs_and_caps
+        reference = REFERENCE[kind]
+        for squares, position, code in pieces:
+            new, old = generate(squares, position, code), reference(squares, position, code)
+            if sorted(new[0]) != sorted(old[0]) or sorted(new[1]) != sorted(old[1]):
+                raise AssertionError('{} moves differ at {}'.format(KINDS[kind].__name__, position))
+
+        def run(function):
+            count = 0
+            for squares, position, code in pieces:
+                mvs, caps = function(squares, position, code)
+                count += len(mvs) + len(caps)
+            return count
+
+        old_rate = measure(lambda: run(reference))
+        new_rate = measure(lambda: run(generate))
+        print('{:<8} {:>8} {:>14,.0f} {:>14,.0f} {:>7.2f}x'.format(
+            KINDS[kind].__name__, len(pieces), old_rate, new_rate, new_rate / old_rate))
+
+
+if __name__ == '__main__':
+    main()
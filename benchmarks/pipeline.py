@@ -0,0 +1,69 @@
+# Measures games per second of the PGN analysis pipeline at several worker counts, and the peak memory of each run on
+# inputs of different lengths, which should stay flat as the file grows. The games are random ones played here first.
+# Run from the repository root: python -m benchmarks.pipeline [--games N] [--workers 1 2 4] [--chunk N]
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+
+from core.engine import random_move
+from core.notation import pgn
+from core.pipeline import run_pipeline, CHUNK_SIZE
+from core.selfplay import play_game
+
+
+def random_games(path: str, games: int, copies: int):
+    chooser = {'white': random_move, 'black': random_move}
+    texts = []
+    for _ in range(games):
+        sans, result = play_game(chooser, 200)[:2]
+        texts.append(pgn({'White': 'random', 'Black': 'random', 'Result': result}, sans, result))
+    with open(path, 'w') as file:
+        for _ in range(copies):
+            file.writelines(texts)
+
+
+def measure(path: str, workers: int, chunk: int, results):
+    # Runs in its own process, so the peak resident size is this run's alone; the pool's workers count separately
+    summary = run_pipeline(path, os.devnull, workers, chunk, quiet=True)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    results.put((summary['records'], summary['seconds'], peak // 1024, children // 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=500, help='distinct random games in the input')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    random.seed(0)
+    directory = tempfile.mkdtemp()
+    paths = []
+    for copies in (1, 4):
+        paths.append(os.path.join(directory, 'games{}.pgn'.format(copies)))
+        random_games(paths[-1], args.games, copies)
+
+    context = multiprocessing.get_context('spawn')
+    print('{} core(s)'.format(os.cpu_count()))
+    print('{:>8} {:>8} {:>10} {:>10} {:>12} {:>12}'.format('workers', 'games', 'seconds', 'games/s', 'parent MB',
+                                                           'worker MB'))
+    for path in paths:
+        for workers in args.workers:
+            results = context.Queue()
+            process = context.Process(target=measure, args=(path, workers, args.chunk, results))
+            process.start()
+            games, seconds, peak, children = results.get()
+            process.join()
+            print('{:>8} {:>8} {:>10.2f} {:>10.1f} {:>12} {:>12}'.format(workers, games, seconds, games / seconds,
+                                                                         peak, children))
+    for path in paths:
+        os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+# Games per second of headless self-play at several worker counts.
+# Run from the repository root: python -m benchmarks.selfplay [--games N] [--workers 1 2 4 8] [--white engine]
+import argparse
+
+from core.selfplay import run_selfplay, CHOOSERS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--white', choices=CHOOSERS, default='random')
+    parser.add_argument('--black', choices=CHOOSERS, default='random')
+    parser.add_argument('--movetime', type=float, default=0.01)
+    parser.add_argument('--max-plies', type=int, default=200)
+    args = parser.parse_args()
+
+    baseline = None
+    print('{:>8} {:>10} {:>12} {:>8}'.format('workers', 'time', 'games/s', 'speedup'))
+    for workers in args.workers:
+        # The same seed in every run, so each worker count plays the same random games
+        summary = run_selfplay(args.games, workers, args.white, args.black, args.max_plies, args.movetime,
+                               seed=0, quiet=True)
+        rate = summary['games'] / summary['seconds']
+        baseline = baseline or rate
+        print('{:>8} {:>9.2f}s {:>12.2f} {:>7.2f}x'.format(workers, summary['seconds'], rate, rate / baseline))
+
+
+if __name__ == '__main__':
+    main()
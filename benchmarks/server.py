@@ -0,0 +1,140 @@
+# Load test for the game server: many sessions at once play random legal moves over a few connections, and the
+# round-trip latency of every move is reported along with the server's own timing of its move validation. Without
+# --address a server is started here on a Unix socket and stopped at the end. With --think 0 every session moves as
+# soon as it can, which measures throughput; the latency then is mostly the queue of all the other sessions.
+# Run from the repository root: python -m benchmarks.server [--sessions N] [--connections N] [--plies N] [--think S]
+#                                                           [--engine N]
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from core.profiler import Timer
+
+
+class Connection:
+    # Requests are pipelined on one stream and matched to their replies by id
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = {}
+        self.ids = 0
+        self.listener = asyncio.ensure_future(self.listen())
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            future = self.waiting.pop(reply['id'], None)
+            if future is not None:
+                future.set_result(reply)
+
+    async def request(self, op: str, **fields) -> dict:
+        self.ids += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.ids] = future
+        self.writer.write(json.dumps(dict(id=self.ids, op=op, **fields)).encode() + b'\n')
+        reply = await future
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    async def close(self):
+        self.listener.cancel()
+        self.writer.close()
+
+
+async def connect(address: str) -> Connection:
+    if ':' in address and not address.startswith(('/', '.')):
+        host, _, port = address.rpartition(':')
+        return Connection(*await asyncio.open_connection(host, int(port), limit=1 << 16))
+    return Connection(*await asyncio.open_unix_connection(address, limit=1 << 16))
+
+
+async def session(connection: Connection, plies: int, engine_plies: int, think: float, latency: Timer,
+                  opened: asyncio.Barrier):
+    # One game of random moves, with the engine playing the first engine_plies of them for the side to move, and a
+    # random pause averaging think seconds before each one
+    game = (await connection.request('new'))['game']
+    # Every session has its game before the first move, so they are all open at once
+    await opened.wait()
+    for ply in range(plies):
+        if think:
+            await asyncio.sleep(random.uniform(0, 2 * think))
+        if ply < engine_plies:
+            reply = await connection.request('engine', game=game, movetime=0.05, depth=2, play=True)
+        else:
+            moves = (await connection.request('legal', game=game))['moves']
+            start = time.perf_counter()
+            reply = await connection.request('move', game=game, move=random.choice(moves))
+            latency.add(time.perf_counter() - start)
+        if reply['result'] is not None:
+            break
+    await connection.request('close', game=game)
+
+
+async def load(address: str, sessions: int, connections: int, plies: int, engine_plies: int, think: float):
+    pool = [await connect(address) for _ in range(connections)]
+    latency = Timer()
+    opened = asyncio.Barrier(sessions + 1)
+    tasks = [asyncio.ensure_future(session(pool[index % connections], plies, engine_plies, think, latency, opened))
+             for index in range(sessions)]
+    await opened.wait()
+    open_games = (await pool[0].request('stats'))['games']
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    stats = await pool[0].request('stats')
+    for connection in pool:
+        await connection.close()
+
+    moves = latency.summary()
+    print('{} sessions open at once over {} connections'.format(open_games, connections))
+    print('{} moves in {:.2f}s, {:,.0f} moves/s'.format(moves['calls'], elapsed, moves['calls'] / elapsed))
+    print('{:<26} {:>10} {:>10} {:>10} {:>10}'.format('latency (us)', 'p50', 'p90', 'p99', 'max'))
+    for name, summary in (('move round trip', moves), ('server move validation', stats['move_validation'])):
+        print('{:<26} {:>10.0f} {:>10.0f} {:>10.0f} {:>10.0f}'.format(
+            name, summary['p50_us'], summary['p90_us'], summary['p99_us'], summary['max_us']))
+    if stats['engine']['calls']:
+        print('{} engine moves, p99 {:.0f}ms'.format(stats['engine']['calls'], stats['engine']['p99_us'] / 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--address', help='HOST:PORT or socket path of a running server')
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--plies', type=int, default=20, help='moves played in each session')
+    parser.add_argument('--think', type=float, default=2.0, help='mean seconds between the moves of a session')
+    parser.add_argument('--engine', type=int, default=0, help='of those, moves the engine chooses')
+    parser.add_argument('--jobs', type=int, default=1, help='engine processes of the server started here')
+    args = parser.parse_args()
+
+    random.seed(0)
+    server = None
+    address = args.address
+    if address is None:
+        address = os.path.join(tempfile.mkdtemp(), 'games.sock')
+        server = subprocess.Popen([sys.executable, 'main.py', '--serve', address, '--jobs', str(args.jobs)],
+                                  stdout=subprocess.PIPE)
+        server.stdout.readline()
+    try:
+        asyncio.run(load(address, args.sessions, args.connections, args.plies, args.engine, args.think))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            if os.path.exists(address):
+                os.remove(address)
+            os.rmdir(os.path.dirname(address))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+# Rules, search and analysis code that runs without pygame.
+# Heavier modules (core.bitboard, core.engine, core.parallel, ...) are imported on demand.
+from core.pieces import Piece, Pawn, Knight, Bishop, Rook, Queen, King, opposite_color
+from core.board import Board
@@ -0,0 +1,89 @@
+import multiprocessing
+import queue
+import threading
+from typing import Union
+
+from core import profiler
+from core.board import Board
+
+
+class StopFlag:
+    # Tells a running search that its request, or a later one, has been cancelled
+    def __init__(self, cancelled, request_id: int):
+        self.cancelled = cancelled
+        self.request_id = request_id
+
+    def is_set(self) -> bool:
+        return self.cancelled.value >= self.request_id
+
+
+def serve(chooser, requests, results, cancelled, profile: bool = False):
+    # A worker process has its own counters, so with profile they are enabled there and sent back with every answer
+    if profile:
+        profiler.enable()
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, packed, color, history = request
+        if cancelled.value >= request_id:
+            continue
+        move = chooser(Board.unpack(packed, history), color, stop=StopFlag(cancelled, request_id))
+        results.put((request_id, move, profiler.collect() if profile else None))
+
+
+class AIWorker:
+    def __init__(self, chooser, mode: str = 'process'):
+        self.mode = mode
+        self.request_id = 0
+        self.pending = None
+
+        if mode == 'process':
+            # Spawn rather than fork so the child does not inherit the pygame display
+            context = multiprocessing.get_context('spawn')
+            self.requests = context.Queue()
+            self.results = context.Queue()
+            self.cancelled = context.Value('q', 0, lock=False)
+            self.worker = context.Process(target=serve, args=(chooser, self.requests, self.results, self.cancelled,
+                                                              profiler.enabled), daemon=True)
+        elif mode == 'thread':
+            self.requests = queue.Queue()
+            self.results = queue.Queue()
+            self.cancelled = multiprocessing.Value('q', 0, lock=False)
+            self.worker = threading.Thread(target=serve, args=(chooser, self.requests, self.results, self.cancelled),
+                                           daemon=True)
+        else:
+            raise ValueError('Invalid worker mode: ', mode)
+        self.worker.start()
+
+    def request(self, board, color: str) -> int:
+        self.request_id += 1
+        self.pending = self.request_id
+        # Positions travel as the fixed-size packed bytes rather than a pickled graph of Piece objects, with the
+        # hashes of the earlier positions so the engine can steer clear of repetitions
+        self.requests.put((self.request_id, board.pack(), color, tuple(board.history())))
+        return self.request_id
+
+    def cancel(self):
+        if self.pending is not None:
+            self.cancelled.value = self.pending
+            self.pending = None
+
+    def poll(self) -> Union[None, tuple]:
+        # Returns (request id, move) once the pending request is answered, dropping answers to cancelled ones
+        while self.pending is not None:
+            try:
+                request_id, move, counters = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            if counters:
+                profiler.merge(counters)
+            if request_id == self.pending:
+                self.pending = None
+                return request_id, move
+        return None
+
+    def close(self):
+        self.cancelled.value = self.request_id
+        self.requests.put(None)
+        self.worker.join(timeout=1)
@@ -0,0 +1,204 @@
+from typing import Tuple, Union
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError('core.batch needs NumPy (pip install numpy); the rest of core does not') from error
+
+from core.board import PACKED
+from core.evaluation import MG_TABLE, EG_TABLE, MG_VALUES, PHASE, TOTAL_PHASE, DOUBLED, ISOLATED, PASSED_MG, PASSED_EG
+from core.pieces import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK
+from core.tables import DIRECTIONS, STRAIGHT, DIAGONAL, KNIGHT_OFFSETS, KING_OFFSETS, PAWN_CAPTURE_OFFSETS
+
+# Whole batches of positions at once. A batch is an (N, 64) array of the piece codes Board keeps, square 8 * y + x,
+# or the (N, 12, 64) one-hot planes of PLANE_CODES; turns are 0 for white to move and 1 for black, as in Board.pack.
+# Attacks and pawn structure work on one 64-bit mask per position, bit i for square i, so moving every piece of the
+# batch one step is a single shift.
+PLANE_CODES = np.array([kind | side for side in (0, BLACK) for kind in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)],
+                       np.uint8)
+
+# Flattened to code * 64 + square, so a batch is scored with one take per table
+MG = np.array(MG_TABLE, np.int64).ravel()
+EG = np.array(EG_TABLE, np.int64).ravel()
+PHASES = np.array(PHASE, np.int64)
+MATERIAL = np.array([(-1 if code & BLACK else 1) * MG_VALUES[code & 7] if code & 7 <= KING else 0
+                     for code in range(16)], np.int64)
+SQUARES = np.arange(64, dtype=np.intp)
+
+ZERO = np.uint64(0)
+ALL = ~ZERO
+# Squares left once a shift by dx files has wrapped pieces round to the other edge of the board
+FILE_MASKS = {dx: np.uint64(sum(1 << sq for sq in range(64) if 0 <= (sq & 7) - dx < 8)) for dx in range(-2, 3)}
+FIRST_ROW = np.uint64(0xFF)
+EVERY_ROW = np.uint64(0x0101010101010101)
+BYTE_COUNTS = np.array([bin(byte).count('1') for byte in range(256)], np.int64)
+ONES = np.ones(8, np.int64)
+# Passed pawn bonuses by the row the pawn stands on, for white and for black
+PASSED_ROWS = tuple(tuple(np.array([0] + [bonus[6 - y] if side == 0 else bonus[y - 1] for y in range(1, 7)] + [0],
+                                   np.int64) for bonus in (PASSED_MG, PASSED_EG)) for side in (0, 1))
+
+
+def from_boards(boards) -> Tuple[np.ndarray, np.ndarray]:
+    boards = list(boards)
+    codes = np.frombuffer(b''.join(board.squares for board in boards), np.uint8).reshape(len(boards), 64)
+    turns = np.fromiter((board.turn == 'black' for board in boards), np.uint8, len(boards))
+    return codes, turns
+
+
+def from_packed(data) -> Tuple[np.ndarray, np.ndarray]:
+    # data is Board.pack() output, either one bytes object with the records back to back or an iterable of them
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = b''.join(data)
+    raw = np.frombuffer(data, np.uint8).reshape(-1, PACKED.size)
+    codes = np.empty((len(raw), 64), np.uint8)
+    codes[:, 0::2] = raw[:, :32] & 15
+    codes[:, 1::2] = raw[:, :32] >> 4
+    return codes, raw[:, 32] & 1
+
+
+def planes(positions: np.ndarray) -> np.ndarray:
+    return codes_of(positions)[:, None, :] == PLANE_CODES[None, :, None]
+
+
+def codes_of(positions: np.ndarray) -> np.ndarray:
+    positions = np.asarray(positions)
+    if positions.ndim == 3:
+        return np.einsum('k,nks->ns', PLANE_CODES, positions.astype(np.uint8, copy=False)).astype(np.uint8)
+    return positions.astype(np.uint8, copy=False)
+
+
+def bit_planes(codes: np.ndarray) -> np.ndarray:
+    # The four bits of every piece code as masks, shape (4, N), bit 3 being the colour. The squares of any piece are
+    # then a few logical operations on N integers away, rather than a pass over the (N, 64) codes
+    return np.stack([np.packbits((codes >> bit) & 1, axis=1, bitorder='little').view('<u8')[:, 0] for bit in range(4)])
+
+
+def pieces(bits: np.ndarray, code: int, colour: Union[None, np.ndarray] = None) -> np.ndarray:
+    # The squares holding code, one mask per position; colour stands in for the colour plane when given
+    colour = bits[3] if colour is None else colour
+    found = colour if code & BLACK else ~colour
+    for bit in range(3):
+        found = found & (bits[bit] if code >> bit & 1 else ~bits[bit])
+    return found
+
+
+def _row_counts(masks: np.ndarray) -> np.ndarray:
+    # Squares set on each row, shape (N, 8); byte y of a mask is row y
+    return BYTE_COUNTS[masks.astype('<u8', copy=False).view(np.uint8).reshape(-1, 8)]
+
+
+def _shift(masks: np.ndarray, dx: int, dy: int, steps: int = 1) -> np.ndarray:
+    delta = (dx + 8 * dy) * steps
+    return masks << np.uint64(delta) if delta > 0 else masks >> np.uint64(-delta)
+
+
+def _step(masks: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    return _shift(masks, dx, dy) & FILE_MASKS[dx]
+
+
+def _fill(masks: np.ndarray, dy: int) -> np.ndarray:
+    # Every square beyond the masked ones in direction dy along their files
+    filled = _shift(masks, 0, dy)
+    for steps in (1, 2, 4):
+        filled |= _shift(filled, 0, dy, steps)
+    return filled
+
+
+def _slide(sliders: np.ndarray, empty: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    # Kogge-Stone fill: the squares the sliders reach in one direction, up to and including the first blocker
+    empty = empty & FILE_MASKS[dx]
+    for steps in (1, 2, 4):
+        sliders = sliders | empty & _shift(sliders, dx, dy, steps)
+        empty = empty & _shift(empty, dx, dy, steps)
+    return _step(sliders, dx, dy)
+
+
+def piece_square(positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Middlegame and endgame material plus placement from white's side and the game phase, the sums Board keeps
+    codes = codes_of(positions)
+    index = codes.astype(np.intp) << 6 | SQUARES
+    return MG.take(index).sum(axis=1), EG.take(index).sum(axis=1), PHASES.take(codes).sum(axis=1)
+
+
+def material(positions: np.ndarray) -> np.ndarray:
+    # Middlegame piece values, white minus black
+    return MATERIAL.take(codes_of(positions)).sum(axis=1)
+
+
+def pawn_structure(positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Doubled, isolated and passed pawns as core.evaluation.pawn_structure scores them
+    bits = bit_planes(codes_of(positions))
+    white, black = pieces(bits, PAWN), pieces(bits, PAWN | BLACK)
+    # A pawn is passed unless an enemy pawn stands ahead of it on its own file or one beside it. White moves
+    # towards row 0, so the squares black's pawns guard against it are those below them and the other way round
+    spans = (_fill(black, 1), _fill(white, -1))
+
+    mg = np.zeros(bits.shape[1], np.int64)
+    eg = np.zeros(bits.shape[1], np.int64)
+    for side, pawns, sign in ((0, white, 1), (1, black, -1)):
+        span = spans[side]
+        passed = pawns & ~(span | _step(span, 1, 0) | _step(span, -1, 0))
+        folded = pawns | pawns >> np.uint64(32)
+        folded |= folded >> np.uint64(16)
+        files = (folded | folded >> np.uint64(8)) & FIRST_ROW
+        lonely = files & ~(files << np.uint64(1) | files >> np.uint64(1))
+        doubled = _row_counts(pawns) @ ONES - BYTE_COUNTS.take(files.astype(np.intp))
+        isolated = _row_counts(pawns & lonely * EVERY_ROW) @ ONES
+        passed_rows = _row_counts(passed)
+        mg += sign * (DOUBLED[0] * doubled + ISOLATED[0] * isolated + passed_rows @ PASSED_ROWS[side][0])
+        eg += sign * (DOUBLED[1] * doubled + ISOLATED[1] * isolated + passed_rows @ PASSED_ROWS[side][1])
+    return mg, eg
+
+
+def evaluate(positions: np.ndarray, turns: Union[None, np.ndarray] = None) -> np.ndarray:
+    # core.evaluation.evaluate for the whole batch: from the side to move with turns, otherwise from white's side
+    codes = codes_of(positions)
+    mg, eg, phase = piece_square(codes)
+    pawn_mg, pawn_eg = pawn_structure(codes)
+    phase = np.minimum(phase, TOTAL_PHASE)
+    score = ((mg + pawn_mg) * phase + (eg + pawn_eg) * (TOTAL_PHASE - phase)) // TOTAL_PHASE
+    return score if turns is None else np.where(np.asarray(turns) == 0, score, -score)
+
+
+def _attacks(bits: np.ndarray, colour: np.ndarray, side: int, pawns_black) -> np.ndarray:
+    # The squares attacked by the pieces of side in colour. pawns_black says which way their pawns capture, for the
+    # whole batch or per position
+    empty = ~(bits[0] | bits[1] | bits[2])
+    attacked = np.zeros(bits.shape[1], np.uint64)
+    pawns = pieces(bits, PAWN | side, colour)
+    for black, offsets in enumerate(PAWN_CAPTURE_OFFSETS):
+        captures = np.zeros_like(attacked)
+        for dx, dy in offsets:
+            captures |= _step(pawns, dx, dy)
+        attacked |= np.where(pawns_black == bool(black), captures, ZERO)
+    for offsets, kind in ((KNIGHT_OFFSETS, KNIGHT), (KING_OFFSETS, KING)):
+        found = pieces(bits, kind | side, colour)
+        for dx, dy in offsets:
+            attacked |= _step(found, dx, dy)
+    queens = pieces(bits, QUEEN | side, colour)
+    for directions, kind in ((STRAIGHT, ROOK), (DIAGONAL, BISHOP)):
+        sliders = pieces(bits, kind | side, colour) | queens
+        for direction in directions:
+            attacked |= _slide(sliders, empty, *DIRECTIONS[direction])
+    return attacked
+
+
+def attacks(positions: np.ndarray, color: str) -> np.ndarray:
+    # The squares color attacks, as one mask per position
+    bits = bit_planes(codes_of(positions))
+    return _attacks(bits, bits[3], 0 if color == 'white' else BLACK, color == 'black')
+
+
+def attack_masks(positions: np.ndarray, color: str) -> np.ndarray:
+    # attacks() spread out to an (N, 64) boolean array indexed by square
+    return np.unpackbits(attacks(positions, color).astype('<u8').view(np.uint8).reshape(-1, 8), axis=1,
+                         bitorder='little').astype(bool)
+
+
+def in_check(positions: np.ndarray, turns: np.ndarray) -> np.ndarray:
+    # Whether the side to move is in check. The colours are swapped where black is to move, so the attacks of the
+    # enemy are a single pass over the batch; only its pawns still capture the way their real colour does
+    bits = bit_planes(codes_of(positions))
+    black = np.asarray(turns) != 0
+    colour = bits[3] ^ ((bits[0] | bits[1] | bits[2]) & np.where(black, ALL, ZERO))
+    return pieces(bits, KING, colour) & _attacks(bits, colour, BLACK, ~black) != 0
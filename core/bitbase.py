@@ -0,0 +1,364 @@
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+from array import array
+from typing import Union
+
+from core.board import Board
+from core.engine import generate_moves
+from core.pieces import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK, EMPTY
+from core.zobrist import SIDE_KEY
+
+# Win/draw/loss tables for endings with a few pieces, from the side to move's point of view. A table is named after
+# its material with the stronger side first, as KQK or KRKP, and covers both colours: a position where black is the
+# stronger side is looked up mirrored top to bottom with the colours swapped.
+#
+# Positions are numbered turn, stronger king, weaker king, then the other pieces in the order the name gives them,
+# 64 squares each, and stored at two bits apiece after a short header.
+WIN, DRAW, LOSS = 1, 0, -1
+STORED_DRAW, STORED_WIN, STORED_LOSS, STORED_ILLEGAL = 0, 1, 2, 3
+RESULTS = (DRAW, WIN, LOSS, None)
+HEADER = struct.Struct('<8s8s')
+MAGIC = b'BITBASE1'
+DEFAULT_SIGNATURES = ('KQK', 'KRK', 'KPK')
+
+LETTERS = {'Q': QUEEN, 'R': ROOK, 'B': BISHOP, 'N': KNIGHT, 'P': PAWN}
+ORDER = 'QRBNP'
+# Non-king piece codes in the order probe finds them, and the material that can never mate
+PIECE_CODES = tuple(kind | side for side in (0, BLACK) for kind in (QUEEN, ROOK, BISHOP, KNIGHT, PAWN))
+TRIVIAL_DRAWS = {0, KNIGHT << 4, BISHOP << 4, (KNIGHT | BLACK) << 4, (BISHOP | BLACK) << 4}
+
+
+def canonical(white: str, black: str) -> tuple:
+    # (name, flipped) for the material given as piece letters of each side, flipped when black is the stronger side
+    white = ''.join(sorted(white, key=ORDER.index))
+    black = ''.join(sorted(black, key=ORDER.index))
+    strength = lambda letters: [len(ORDER) - ORDER.index(letter) for letter in letters]
+    if (strength(black), len(black)) > (strength(white), len(white)):
+        return 'K' + black + 'K' + white, True
+    return 'K' + white + 'K' + black, False
+
+
+def split(signature: str) -> tuple:
+    strong, weak = signature[1:].split('K')
+    return strong, weak
+
+
+def slot_codes(signature: str, flipped: bool = False) -> tuple:
+    # Piece codes of the non-king slots of a table, with the stronger side white unless flipped
+    strong, weak = split(signature)
+    strong_side, weak_side = (BLACK, 0) if flipped else (0, BLACK)
+    return tuple(LETTERS[letter] | strong_side for letter in strong) + tuple(LETTERS[letter] | weak_side
+                                                                            for letter in weak)
+
+
+def dependencies(signature: str) -> list:
+    # Tables reached by a capture or a promotion, whose values the table needs while it is generated
+    strong, weak = split(signature)
+    found = []
+    for side, letters in ((0, strong), (1, weak)):
+        for i, letter in enumerate(letters):
+            others = (weak, strong)[side]
+            options = [letters[:i] + letters[i + 1:]]
+            if letter == 'P':
+                options += [letters[:i] + promoted + letters[i + 1:] for promoted in 'QRBN']
+            for option in options:
+                white, black = (option, others) if side == 0 else (others, option)
+                name = canonical(white, black)[0]
+                if name not in found and name not in ('KK', 'KBK', 'KNK') and name != signature:
+                    found.append(name)
+    return found
+
+
+def table_path(directory: str, signature: str) -> str:
+    return os.path.join(directory, signature + '.bb')
+
+
+class Bitbases:
+    # Maps every table found in directory. probe is a handful of integer operations and one byte read from the
+    # mapped file, whatever the size of the table. Pickling keeps only the directory, so a copy sent to another
+    # process maps the same files and shares their pages.
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.files = []
+        self.tables = {}
+        self.max_pieces = 2
+        names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+        for name in names:
+            if name.endswith('.bb'):
+                self.load(os.path.join(directory, name))
+
+    def __getstate__(self):
+        return self.directory
+
+    def __setstate__(self, directory):
+        self.__init__(directory)
+
+    def load(self, path: str):
+        file = open(path, 'rb')
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, signature = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            data.close()
+            file.close()
+            raise ValueError('Not a bitbase: ' + path)
+        self.files.append((file, data))
+        signature = signature.rstrip(b' ').decode()
+        count = len(signature) - 2
+        self.max_pieces = max(self.max_pieces, count + 2)
+        for flipped in (False, True):
+            codes = slot_codes(signature, flipped)
+            # The key lists the pieces in PIECE_CODES order; swapped tells that the table has the two the other way
+            ordered = sorted(codes, key=PIECE_CODES.index)
+            key = ordered[0] << 4 | (ordered[1] if count > 1 else 0)
+            swapped = count > 1 and list(codes) != ordered
+            self.tables.setdefault(key, (data, flipped, swapped, count))
+
+    def close(self):
+        for file, data in self.files:
+            data.close()
+            file.close()
+        self.files = []
+        self.tables = {}
+
+    def probe(self, board) -> Union[None, int]:
+        # WIN, DRAW or LOSS for the side to move, None without a table for the material
+        squares = board.squares
+        if 64 - squares.count(EMPTY) > self.max_pieces:
+            return None
+        first = second = 0
+        first_sq = second_sq = 0
+        for code in PIECE_CODES:
+            sq = squares.find(code)
+            while sq != -1:
+                if first:
+                    second, second_sq = code, sq
+                else:
+                    first, first_sq = code, sq
+                sq = squares.find(code, sq + 1)
+        key = first << 4 | second
+        entry = self.tables.get(key)
+        if entry is None:
+            return DRAW if key in TRIVIAL_DRAWS else None
+        data, flipped, swapped, count = entry
+
+        kings = board.kings
+        white_king, black_king = kings['white'], kings['black']
+        strong_king = 8 * white_king[1] + white_king[0]
+        weak_king = 8 * black_king[1] + black_king[0]
+        turn = board.turn == 'black'
+        if flipped:
+            strong_king, weak_king = weak_king ^ 56, strong_king ^ 56
+            first_sq ^= 56
+            second_sq ^= 56
+            turn = not turn
+        if swapped:
+            first_sq, second_sq = second_sq, first_sq
+        index = ((turn * 64 + strong_king) * 64 + weak_king) * 64 + first_sq
+        if count > 1:
+            index = index * 64 + second_sq
+        return RESULTS[data[HEADER.size + (index >> 2)] >> ((index & 3) << 1) & 3]
+
+
+def _decode(index: int, count: int) -> tuple:
+    # (turn bit, stronger king square, weaker king square, slot squares) of a table index
+    slots = []
+    for _ in range(count):
+        slots.append(index & 63)
+        index >>= 6
+    slots.reverse()
+    weak_king = index & 63
+    strong_king = (index >> 6) & 63
+    return index >> 12, strong_king, weak_king, slots
+
+
+# Per-process state of the generator workers, set up once by _init_worker
+_signature = None
+_bitbases = None
+
+
+def _init_worker(signature: str, directory: str):
+    global _signature, _bitbases
+    _signature = signature
+    _bitbases = Bitbases(directory)
+
+
+def _scan(span: tuple) -> tuple:
+    # Plays every legal move of every position in [start, stop) once with Board. Returns the stored value of each
+    # position as far as it is known without the rest of the table, how many of its moves are not yet known to lose
+    # for it, and each move that stays in the table as a pair of (next position, position) indices
+    start, stop = span
+    codes = slot_codes(_signature)
+    count = len(codes)
+    status = bytearray(stop - start)
+    pending = bytearray(stop - start)
+    children = array('I')
+    parents = array('I')
+    board = Board(bytearray(64), 0)
+    placed = []
+
+    for index in range(start, stop):
+        turn, strong_king, weak_king, slots = _decode(index, count)
+        squares = [strong_king, weak_king] + slots
+        if len(set(squares)) != len(squares) or any(code & 7 == PAWN and not 8 <= sq < 56
+                                                      for code, sq in zip(codes, slots)):
+            status[index - start] = STORED_ILLEGAL
+            continue
+        # Moved with the board's own helpers, so its hash and evaluation terms stay in step with the squares
+        for sq in placed:
+            board.pop_piece((sq & 7, sq >> 3))
+        board.put_piece((strong_king & 7, strong_king >> 3), KING)
+        board.put_piece((weak_king & 7, weak_king >> 3), KING | BLACK)
+        for code, sq in zip(codes, slots):
+            board.put_piece((sq & 7, sq >> 3), code)
+        placed = squares
+        if board.turn != ('black' if turn else 'white'):
+            board.turn = 'black' if turn else 'white'
+            board.hash ^= SIDE_KEY
+        enemy = 'white' if turn else 'black'
+        if board.is_check(enemy):
+            status[index - start] = STORED_ILLEGAL
+            continue
+
+        moves = generate_moves(board, board.turn)
+        if not moves:
+            status[index - start] = STORED_LOSS if board.is_check(board.turn) else STORED_DRAW
+            continue
+        open_moves = 0
+        value = STORED_DRAW
+        for original, final, promotion in moves:
+            sq = 8 * original[1] + original[0]
+            target = 8 * final[1] + final[0]
+            # Captures, including en passant, and promotions change the material, so another table decides them
+            if board.squares[target] or promotion is not None or \
+                    (board.squares[sq] & 7 == PAWN and original[0] != final[0]):
+                board.make_move(original, final, promotion)
+                result = _bitbases.probe(board)
+                board.unmake_move()
+                if result is None:
+                    raise RuntimeError('Missing bitbase for a position after {}'.format(_signature))
+                if result == LOSS:
+                    value = STORED_WIN
+                    break
+                if result == DRAW:
+                    open_moves += 1
+                continue
+            # The next position has the moved piece on final and the other side to move. A double pawn push leaves
+            # an en passant right that the tables do not record
+            moved = squares.index(sq)
+            child = squares[:]
+            child[moved] = target
+            next_index = 1 - turn
+            for child_sq in child:
+                next_index = next_index * 64 + child_sq
+            children.append(next_index)
+            parents.append(index)
+            open_moves += 1
+        if value == STORED_WIN:
+            status[index - start] = STORED_WIN
+        elif not open_moves:
+            status[index - start] = STORED_LOSS
+        else:
+            pending[index - start] = min(open_moves, 255)
+    return start, bytes(status), bytes(pending), children.tobytes(), parents.tobytes()
+
+
+def generate(signature: str, directory: str, workers: int = 1, quiet: bool = False) -> str:
+    # Writes the table for signature into directory; the tables its captures and promotions lead to must be there
+    count = len(signature) - 2
+    size = 2 * 64 ** (count + 2)
+    start_time = time.perf_counter()
+    chunk = max(size // (workers * 16), 4096)
+    spans = [(start, min(start + chunk, size)) for start in range(0, size, chunk)]
+
+    status = bytearray(size)
+    pending = bytearray(size)
+    children = array('I')
+    parents = array('I')
+    pool = None
+    try:
+        if workers > 1:
+            pool = multiprocessing.get_context('spawn').Pool(workers, _init_worker, (signature, directory))
+            results = pool.imap_unordered(_scan, spans)
+        else:
+            _init_worker(signature, directory)
+            results = map(_scan, spans)
+        for start, chunk_status, chunk_pending, chunk_children, chunk_parents in results:
+            status[start:start + len(chunk_status)] = chunk_status
+            pending[start:start + len(chunk_pending)] = chunk_pending
+            children.frombytes(chunk_children)
+            parents.frombytes(chunk_parents)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    if not quiet:
+        print('{}: {} positions and {} moves scanned in {:.1f}s'.format(signature, size, len(children),
+                                                                       time.perf_counter() - start_time))
+
+    # The positions each position is reached from, grouped by position
+    offsets = array('I', bytes(4 * (size + 1)))
+    for child in children:
+        offsets[child + 1] += 1
+    for index in range(size):
+        offsets[index + 1] += offsets[index]
+    fill = offsets[:-1]
+    predecessors = array('I', bytes(4 * len(children)))
+    for child, parent in zip(children, parents):
+        predecessors[fill[child]] = parent
+        fill[child] += 1
+    del children, parents, fill
+
+    # Retrograde pass: a position is won when one move leads to a lost position, and lost when every move leads
+    # to a won one. Whatever is left at the end is drawn.
+    queue = [index for index in range(size) if status[index] in (STORED_WIN, STORED_LOSS)]
+    head = 0
+    while head < len(queue):
+        index = queue[head]
+        head += 1
+        lost = status[index] == STORED_LOSS
+        for parent in predecessors[offsets[index]:offsets[index + 1]]:
+            if status[parent] != STORED_DRAW or not pending[parent]:
+                continue
+            if lost:
+                status[parent] = STORED_WIN
+                queue.append(parent)
+            else:
+                pending[parent] -= 1
+                if not pending[parent]:
+                    status[parent] = STORED_LOSS
+                    queue.append(parent)
+
+    packed = bytearray(size // 4)
+    for i in range(0, size, 4):
+        packed[i >> 2] = status[i] | status[i + 1] << 2 | status[i + 2] << 4 | status[i + 3] << 6
+    os.makedirs(directory, exist_ok=True)
+    path = table_path(directory, signature)
+    temporary = '{}.{}'.format(path, os.getpid())
+    with open(temporary, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, signature.encode().ljust(8)))
+        file.write(packed)
+    os.replace(temporary, path)
+    if not quiet:
+        print('{}: {} won, {} lost for the side to move, written to {} in {:.1f}s'.format(
+            signature, status.count(STORED_WIN), status.count(STORED_LOSS), path, time.perf_counter() - start_time))
+    return path
+
+
+def build_bitbases(signatures=DEFAULT_SIGNATURES, directory: str = 'bitbases', workers: int = 1,
+                   quiet: bool = False) -> list:
+    # Generates the tables that are missing, along with the ones they depend on, smaller and pawnless ones first
+    needed = []
+    todo = [canonical(*split(signature))[0] for signature in signatures]
+    while todo:
+        signature = todo.pop()
+        if signature not in needed:
+            needed.append(signature)
+            todo += dependencies(signature)
+    needed.sort(key=lambda signature: (len(signature), signature.count('P')))
+    written = []
+    for signature in needed:
+        if not os.path.exists(table_path(directory, signature)):
+            written.append(generate(signature, directory, workers, quiet))
+    return written
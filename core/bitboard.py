@@ -0,0 +1,426 @@
+from core.tables import POSITIVE, STRAIGHT, DIAGONAL, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, RAYS, \
+    ROOK_RAYS, BISHOP_RAYS, BETWEEN, LINE
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+COLORS = ('white', 'black')
+PIECE_NAMES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+FEN_LETTERS = 'pnbrqk'
+
+# Castling right bits
+WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE = 1, 2, 4, 8
+
+FULL = (1 << 64) - 1
+
+# Squares follow the (x, y) convention of Board: x is the file from the left, y is the row from the top,
+# so square = 8 * y + x, black starts on rows 0 and 1 and white pawns move towards lower squares.
+
+ROOK_DIRECTIONS = STRAIGHT
+BISHOP_DIRECTIONS = DIAGONAL
+
+
+def square(position: tuple[int, int]) -> int:
+    return 8 * position[1] + position[0]
+
+
+def coord(sq: int) -> tuple[int, int]:
+    return sq & 7, sq >> 3
+
+
+# Castling rights kept after a piece leaves or lands on each square
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[60] = 15 & ~(WHITE_KING_SIDE | WHITE_QUEEN_SIDE)
+CASTLING_MASK[63] = 15 & ~WHITE_KING_SIDE
+CASTLING_MASK[56] = 15 & ~WHITE_QUEEN_SIDE
+CASTLING_MASK[4] = 15 & ~(BLACK_KING_SIDE | BLACK_QUEEN_SIDE)
+CASTLING_MASK[7] = 15 & ~BLACK_KING_SIDE
+CASTLING_MASK[0] = 15 & ~BLACK_QUEEN_SIDE
+
+# (right, king from, king to, rook from, rook to, squares that must be empty)
+CASTLES = ((WHITE_KING_SIDE, 60, 62, 63, 61, (1 << 61) | (1 << 62)),
+           (WHITE_QUEEN_SIDE, 60, 58, 56, 59, (1 << 57) | (1 << 58) | (1 << 59)),
+           (BLACK_KING_SIDE, 4, 6, 7, 5, (1 << 5) | (1 << 6)),
+           (BLACK_QUEEN_SIDE, 4, 2, 0, 3, (1 << 1) | (1 << 2) | (1 << 3)))
+
+RANK_MASKS = [0xFF << (8 * y) for y in range(8)]
+FILE_A = sum(1 << (8 * y) for y in range(8))
+FILE_H = FILE_A << 7
+NOT_FILE_A = FULL & ~FILE_A
+NOT_FILE_H = FULL & ~FILE_H
+PROMOTION_RANKS = (RANK_MASKS[0], RANK_MASKS[7])
+
+
+def _slide(sq, occupied, directions):
+    attacks = 0
+    for d in directions:
+        ray = RAYS[d][sq]
+        blockers = ray & occupied
+        if blockers:
+            if POSITIVE[d]:
+                ray ^= RAYS[d][(blockers & -blockers).bit_length() - 1]
+            else:
+                ray ^= RAYS[d][blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    return _slide(sq, occupied, ROOK_DIRECTIONS)
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    return _slide(sq, occupied, BISHOP_DIRECTIONS)
+
+
+def encode_move(original: int, final: int, promotion: int = 0) -> int:
+    return original | (final << 6) | (promotion << 12)
+
+
+def decode_move(move: int) -> tuple[tuple[int, int], tuple[int, int], str | None]:
+    promotion = move >> 12
+    return coord(move & 63), coord((move >> 6) & 63), PIECE_NAMES[promotion] if promotion else None
+
+
+class BitBoard:
+    def __init__(self):
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.mailbox = [None] * 64
+        self.turn = WHITE
+        self.castling = 0
+        self.ep = None
+        self.halfmove = 0
+        self.fullmove = 1
+
+    @classmethod
+    def from_fen(cls, fen: str = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1') -> 'BitBoard':
+        fields = fen.split()
+        position = cls()
+        y = 0
+        x = 0
+        for char in fields[0]:
+            if char == '/':
+                y += 1
+                x = 0
+            elif char.isdigit():
+                x += int(char)
+            else:
+                color = WHITE if char.isupper() else BLACK
+                position._put(8 * y + x, color, FEN_LETTERS.index(char.lower()))
+                x += 1
+        position.turn = WHITE if len(fields) < 2 or fields[1] == 'w' else BLACK
+        rights = fields[2] if len(fields) > 2 else '-'
+        for char, bit in zip('KQkq', (WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE)):
+            if char in rights:
+                position.castling |= bit
+        if len(fields) > 3 and fields[3] != '-':
+            position.ep = square((ord(fields[3][0]) - ord('a'), 8 - int(fields[3][1])))
+        if len(fields) > 5:
+            position.halfmove = int(fields[4])
+            position.fullmove = int(fields[5])
+        return position
+
+    def fen(self) -> str:
+        rows = []
+        for y in range(8):
+            row = ''
+            empty = 0
+            for x in range(8):
+                piece = self.mailbox[8 * y + x]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[piece % 6]
+                row += letter.upper() if piece < 6 else letter
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        rights = ''.join(char for char, bit in zip('KQkq', (1, 2, 4, 8)) if self.castling & bit) or '-'
+        ep = '-' if self.ep is None else 'abcdefgh'[self.ep & 7] + str(8 - (self.ep >> 3))
+        return '{} {} {} {} {} {}'.format('/'.join(rows), 'wb'[self.turn], rights, ep, self.halfmove, self.fullmove)
+
+    @classmethod
+    def from_board(cls, board, turn: str = 'white') -> 'BitBoard':
+        # Board codes are the kind + 1, plus 8 for black
+        position = cls()
+        for sq, code in enumerate(board.squares):
+            if code:
+                position._put(sq, code >> 3, (code & 7) - 1)
+        position.turn = COLORS.index(turn)
+        position.castling = board.castling
+        position.halfmove, position.fullmove = board.halfmove, board.fullmove
+
+        if board.en_passant is not None:
+            x, y = board.en_passant
+            code = board.squares[8 * y + x]
+            if code and (code >> 3) != position.turn:
+                position.ep = square((x, y + 1 if code >> 3 == WHITE else y - 1))
+        return position
+
+    def to_board(self):
+        from core.board import Board
+
+        squares = bytearray(64)
+        for sq, piece in enumerate(self.mailbox):
+            if piece is not None:
+                squares[sq] = (piece % 6 + 1) | (piece // 6) << 3
+        en_passant = None
+        if self.ep is not None:
+            en_passant = coord(self.ep + 8 if self.turn == WHITE else self.ep - 8)
+        return Board.from_squares(squares, COLORS[self.turn], self.castling, en_passant, self.halfmove, self.fullmove)
+
+    def copy(self) -> 'BitBoard':
+        other = BitBoard.__new__(BitBoard)
+        other.pieces = [self.pieces[0][:], self.pieces[1][:]]
+        other.occupancy = self.occupancy[:]
+        other.mailbox = self.mailbox[:]
+        other.turn = self.turn
+        other.castling = self.castling
+        other.ep = self.ep
+        other.halfmove = self.halfmove
+        other.fullmove = self.fullmove
+        return other
+
+    def _put(self, sq, color, kind):
+        bit = 1 << sq
+        self.pieces[color][kind] |= bit
+        self.occupancy[color] |= bit
+        self.mailbox[sq] = 6 * color + kind
+
+    def _remove(self, sq):
+        piece = self.mailbox[sq]
+        bit = 1 << sq
+        self.pieces[piece // 6][piece % 6] ^= bit
+        self.occupancy[piece // 6] ^= bit
+        self.mailbox[sq] = None
+        return piece
+
+    def attackers(self, sq: int, by: int, occupied: int) -> int:
+        pieces = self.pieces[by]
+        return (KNIGHT_ATTACKS[sq] & pieces[KNIGHT]) | (KING_ATTACKS[sq] & pieces[KING]) | \
+            (PAWN_ATTACKS[by ^ 1][sq] & pieces[PAWN]) | \
+            (rook_attacks(sq, occupied) & (pieces[ROOK] | pieces[QUEEN])) | \
+            (bishop_attacks(sq, occupied) & (pieces[BISHOP] | pieces[QUEEN]))
+
+    def is_attacked(self, sq: int, by: int, occupied: int | None = None, removed: int = 0) -> bool:
+        pieces = self.pieces[by]
+        if occupied is None:
+            occupied = self.occupancy[0] | self.occupancy[1]
+        if KNIGHT_ATTACKS[sq] & pieces[KNIGHT] & ~removed or KING_ATTACKS[sq] & pieces[KING] or \
+                PAWN_ATTACKS[by ^ 1][sq] & pieces[PAWN] & ~removed:
+            return True
+        straight = (pieces[ROOK] | pieces[QUEEN]) & ~removed
+        if straight & ROOK_RAYS[sq] and rook_attacks(sq, occupied) & straight:
+            return True
+        diagonal = (pieces[BISHOP] | pieces[QUEEN]) & ~removed
+        return bool(diagonal & BISHOP_RAYS[sq] and bishop_attacks(sq, occupied) & diagonal)
+
+    def is_check(self, color: int | None = None) -> bool:
+        if color is None:
+            color = self.turn
+        king = self.pieces[color][KING]
+        return self.is_attacked(king.bit_length() - 1, color ^ 1)
+
+    def generate_moves(self, legal: bool = True) -> list[int]:
+        us = self.turn
+        them = us ^ 1
+        own = self.pieces[us]
+        opponent = self.pieces[them]
+        own_occ = self.occupancy[us]
+        occupied = own_occ | self.occupancy[them]
+        empty = FULL ^ occupied
+        moves = []
+        append = moves.append
+
+        king = own[KING]
+        king_sq = king.bit_length() - 1
+        target = FULL ^ own_occ
+        pinned = 0
+        pin_lines = {}
+
+        if legal:
+            checkers = self.attackers(king_sq, them, occupied)
+            snipers = (ROOK_RAYS[king_sq] & (opponent[ROOK] | opponent[QUEEN])) | \
+                      (BISHOP_RAYS[king_sq] & (opponent[BISHOP] | opponent[QUEEN]))
+            while snipers:
+                bit = snipers & -snipers
+                snipers ^= bit
+                sniper = bit.bit_length() - 1
+                blockers = BETWEEN[64 * king_sq + sniper] & occupied
+                if blockers and not blockers & (blockers - 1) and blockers & own_occ:
+                    pinned |= blockers
+                    pin_lines[blockers.bit_length() - 1] = LINE[64 * king_sq + sniper]
+
+            # King steps are checked with the king lifted so it cannot hide behind itself on a ray
+            without_king = occupied ^ king
+            steps = KING_ATTACKS[king_sq] & target
+            while steps:
+                bit = steps & -steps
+                steps ^= bit
+                sq = bit.bit_length() - 1
+                if not self.is_attacked(sq, them, without_king):
+                    append(king_sq | (sq << 6))
+            if checkers:
+                if checkers & (checkers - 1):
+                    return moves
+                checker = checkers.bit_length() - 1
+                target &= checkers | BETWEEN[64 * king_sq + checker]
+        else:
+            checkers = 0
+            steps = KING_ATTACKS[king_sq] & target
+            while steps:
+                bit = steps & -steps
+                steps ^= bit
+                append(king_sq | ((bit.bit_length() - 1) << 6))
+
+        for kind in (KNIGHT, BISHOP, ROOK, QUEEN):
+            bb = own[kind]
+            while bb:
+                bit = bb & -bb
+                bb ^= bit
+                sq = bit.bit_length() - 1
+                if kind == KNIGHT:
+                    if bit & pinned:
+                        continue
+                    attacks = KNIGHT_ATTACKS[sq]
+                elif kind == BISHOP:
+                    attacks = bishop_attacks(sq, occupied)
+                elif kind == ROOK:
+                    attacks = rook_attacks(sq, occupied)
+                else:
+                    attacks = rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+                attacks &= target
+                if bit & pinned:
+                    attacks &= pin_lines[sq]
+                while attacks:
+                    to = attacks & -attacks
+                    attacks ^= to
+                    append(sq | ((to.bit_length() - 1) << 6))
+
+        self._pawn_moves(append, own[PAWN], us, target, pinned, pin_lines, occupied, empty)
+
+        if self.ep is not None:
+            self._en_passant_moves(append, king_sq, legal)
+
+        if self.castling and not checkers:
+            for right, king_from, king_to, rook_from, rook_to, between in CASTLES:
+                if self.castling & right and king_from == king_sq and not between & occupied \
+                        and own[ROOK] & (1 << rook_from):
+                    if legal and (self.is_attacked(rook_to, them, occupied) or
+                                  self.is_attacked(king_to, them, occupied)):
+                        continue
+                    append(king_from | (king_to << 6))
+        return moves
+
+    def _pawn_moves(self, append, pawns, us, target, pinned, pin_lines, occupied, empty):
+        enemies = self.occupancy[us ^ 1]
+        promotion_rank = PROMOTION_RANKS[us]
+        if us == WHITE:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_MASKS[5]) >> 8) & empty
+            shifts = ((single, 8), (double, 16), (((pawns & NOT_FILE_A) >> 9) & enemies, 9),
+                      (((pawns & NOT_FILE_H) >> 7) & enemies, 7))
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & RANK_MASKS[2]) << 8) & empty
+            shifts = ((single, -8), (double, -16), (((pawns & NOT_FILE_H) << 9) & enemies & FULL, -9),
+                      (((pawns & NOT_FILE_A) << 7) & enemies & FULL, -7))
+
+        for targets, delta in shifts:
+            targets &= target
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                to = bit.bit_length() - 1
+                origin = to + delta
+                if (1 << origin) & pinned and not bit & pin_lines[origin]:
+                    continue
+                move = origin | (to << 6)
+                if bit & promotion_rank:
+                    append(move | (QUEEN << 12))
+                    append(move | (ROOK << 12))
+                    append(move | (BISHOP << 12))
+                    append(move | (KNIGHT << 12))
+                else:
+                    append(move)
+
+    def _en_passant_moves(self, append, king_sq, legal):
+        us = self.turn
+        them = us ^ 1
+        ep = self.ep
+        captured = ep + 8 if us == WHITE else ep - 8
+        occupied = self.occupancy[0] | self.occupancy[1]
+        capturers = PAWN_ATTACKS[them][ep] & self.pieces[us][PAWN]
+        while capturers:
+            bit = capturers & -capturers
+            capturers ^= bit
+            origin = bit.bit_length() - 1
+            # Both pawns leave their squares at once, so checks and pins are resolved on the resulting occupancy
+            after = occupied ^ bit ^ (1 << captured) ^ (1 << ep)
+            if not legal or not self.is_attacked(king_sq, them, after, 1 << captured):
+                append(origin | (ep << 6))
+
+    def play(self, move: int):
+        origin = move & 63
+        final = (move >> 6) & 63
+        promotion = move >> 12
+        us = self.turn
+        them = us ^ 1
+
+        piece = self._remove(origin)
+        kind = piece % 6
+        self.halfmove += 1
+        if self.mailbox[final] is not None:
+            self._remove(final)
+            self.halfmove = 0
+
+        ep = self.ep
+        self.ep = None
+        if kind == PAWN:
+            self.halfmove = 0
+            if final == ep:
+                self._remove(final + 8 if us == WHITE else final - 8)
+            elif abs(final - origin) == 16:
+                self.ep = (final + origin) >> 1
+            if promotion:
+                kind = promotion
+        elif kind == KING and abs(final - origin) == 2:
+            for _, king_from, king_to, rook_from, rook_to, _ in CASTLES:
+                if king_from == origin and king_to == final:
+                    self._put(rook_to, us, self._remove(rook_from) % 6)
+        self._put(final, us, kind)
+
+        self.castling &= CASTLING_MASK[origin] & CASTLING_MASK[final]
+        if us == BLACK:
+            self.fullmove += 1
+        self.turn = them
+
+    def pseudo_legal_moves(self) -> list[tuple[tuple[int, int], tuple[int, int], str | None]]:
+        return [decode_move(move) for move in self.generate_moves(legal=False)]
+
+    def legal_moves(self) -> list[tuple[tuple[int, int], tuple[int, int], str | None]]:
+        return [decode_move(move) for move in self.generate_moves()]
+
+    def move_options(self, position: tuple[int, int]) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+        origin = square(position)
+        mvs = []
+        caps = []
+        for move in self.generate_moves():
+            if move & 63 != origin or move >> 12 not in (0, QUEEN):
+                continue
+            final = (move >> 6) & 63
+            if self.mailbox[final] is not None:
+                caps.append(coord(final))
+            else:
+                mvs.append(coord(final))
+        return mvs, caps
+
+    def move(self, original_coord: tuple[int, int], final_coord: tuple[int, int], promotion: str = 'queen'):
+        origin, final = square(original_coord), square(final_coord)
+        move = origin | (final << 6)
+        if self.mailbox[origin] % 6 == PAWN and (1 << final) & PROMOTION_RANKS[self.turn]:
+            move |= PIECE_NAMES.index(promotion) << 12
+        self.play(move)
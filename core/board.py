@@ -0,0 +1,462 @@
+import struct
+
+from core.pieces import *
+from core.utils import isvalid
+from core.tables import COORDS, STRAIGHT, DIAGONAL, KNIGHT_SQUARES, KING_SQUARES, PAWN_CAPTURE_SQUARES, RAY_SQUARES
+from core.zobrist import SIDE_KEY, CASTLING_KEYS, PIECE_KEYS, en_passant_key, compute_hash
+from core.evaluation import MG_TABLE, EG_TABLE, PHASE, PAWN_KEYS, score_squares
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+FEN_PIECES = {'p': PAWN, 'n': KNIGHT, 'b': BISHOP, 'r': ROOK, 'q': QUEEN, 'k': KING}
+FEN_LETTERS = ' pnbrqk'
+
+# Binary positions: the 64 piece codes as 4-bit nibbles, a byte with the side to move in bit 0 and the castling
+# rights above it, the en passant file + 1 (0 for none), the halfmove clock and the fullmove number
+PACKED = struct.Struct('<32sBBHH')
+
+# Castling rights kept when a move starts or ends on each square
+CASTLING_MASK = [15] * 64
+for _bit, (_kx, _ky), (_rx, _ry) in CASTLING_SQUARES:
+    CASTLING_MASK[8 * _ky + _kx] &= ~_bit
+    CASTLING_MASK[8 * _ry + _rx] &= ~_bit
+
+START_SQUARES = bytearray([ROOK | BLACK, KNIGHT | BLACK, BISHOP | BLACK, QUEEN | BLACK, KING | BLACK,
+                           BISHOP | BLACK, KNIGHT | BLACK, ROOK | BLACK] + [PAWN | BLACK] * 8 + [EMPTY] * 32 +
+                          [PAWN] * 8 + [ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK])
+
+
+class Board:
+    __slots__ = ('squares', 'castling', 'pawn_to_promote', 'en_passant', 'turn', 'halfmove', 'fullmove',
+                 'undo_stack', 'prior', 'kings', 'hash', 'mg', 'eg', 'phase', 'pawn_hash')
+
+    def __init__(self, squares: None | bytearray = None, castling: None | int = None):
+        if squares is None:
+            self.squares = bytearray(START_SQUARES)
+            self.castling = 15 if castling is None else castling
+        else:
+            self.squares = squares
+            self.castling = 0 if castling is None else castling
+
+        self.pawn_to_promote = None
+        self.en_passant = None
+        self.turn = 'white'
+        self.halfmove = 0
+        self.fullmove = 1
+        self.undo_stack = []
+        # Hashes of the positions before the undo stack starts that can still repeat, oldest first, for copies
+        self.prior = ()
+        self.kings = {}
+        for sq, code in enumerate(self.squares):
+            if code & 7 == KING:
+                self.kings[piece_color(code)] = (sq & 7, sq >> 3)
+        self.hash = 0
+        self.rehash()
+        # Running evaluation terms, see core.evaluation
+        self.mg, self.eg, self.phase, self.pawn_hash = score_squares(self.squares)
+
+    def piece_at(self, position) -> int:
+        return self.squares[8 * position[1] + position[0]]
+
+    def pop_piece(self, position) -> int:
+        if not isvalid(position):
+            raise ValueError('Position out of range')
+        sq = 8 * position[1] + position[0]
+        code = self.squares[sq]
+        self.squares[sq] = EMPTY
+        if code:
+            self.hash ^= PIECE_KEYS[code][sq]
+            self.mg -= MG_TABLE[code][sq]
+            self.eg -= EG_TABLE[code][sq]
+            self.phase -= PHASE[code]
+            self.pawn_hash ^= PAWN_KEYS[code][sq]
+        return code
+
+    def put_piece(self, position, code: int):
+        if not isvalid(position):
+            raise ValueError('Position out of range')
+        sq = 8 * position[1] + position[0]
+        self.squares[sq] = code
+        if code:
+            self.hash ^= PIECE_KEYS[code][sq]
+            self.mg += MG_TABLE[code][sq]
+            self.eg += EG_TABLE[code][sq]
+            self.phase += PHASE[code]
+            self.pawn_hash ^= PAWN_KEYS[code][sq]
+            if code & 7 == KING:
+                self.kings[piece_color(code)] = position
+
+    def rehash(self):
+        self.hash = compute_hash(self.squares, self.castling, self.en_passant, self.turn)
+
+    def is_attacked(self, position, color) -> bool:
+        # Looks outward from position for a piece of the given color that attacks it
+        squares = self.squares
+        side = color_bit(color)
+        sq = 8 * position[1] + position[0]
+        for target in KNIGHT_SQUARES[sq]:
+            if squares[target] == KNIGHT | side:
+                return True
+        for target in KING_SQUARES[sq]:
+            if squares[target] == KING | side:
+                return True
+        # Pawns of color attack this square from where a pawn of the other side would capture
+        for target in PAWN_CAPTURE_SQUARES[(side ^ BLACK) >> 3][sq]:
+            if squares[target] == PAWN | side:
+                return True
+        queen = QUEEN | side
+        for directions, slider in ((STRAIGHT, ROOK | side), (DIAGONAL, BISHOP | side)):
+            for d in directions:
+                for target in RAY_SQUARES[d][sq]:
+                    code = squares[target]
+                    if code:
+                        if code == slider or code == queen:
+                            return True
+                        break
+        return False
+
+    def is_check(self, color, position: None | tuple[int, int] = None):
+        if position is None:
+            position = self.kings.get(color)
+            if position is None:
+                return False
+        return self.is_attacked(position, opposite_color(color))
+
+    def check_info(self, color) -> tuple:
+        # Checkers, the squares that answer a single check (None when not in check) and the pinned pieces
+        # with the squares each of them may still move to
+        king = self.kings[color]
+        king_sq = 8 * king[1] + king[0]
+        side = color_bit(color)
+        enemy = side ^ BLACK
+        squares = self.squares
+        checkers = []
+        block = set()
+        pins = {}
+
+        for target in KNIGHT_SQUARES[king_sq]:
+            if squares[target] == KNIGHT | enemy:
+                checkers.append(COORDS[target])
+                block.add(COORDS[target])
+        for target in PAWN_CAPTURE_SQUARES[side >> 3][king_sq]:
+            if squares[target] == PAWN | enemy:
+                checkers.append(COORDS[target])
+                block.add(COORDS[target])
+
+        queen = QUEEN | enemy
+        for directions, slider in ((STRAIGHT, ROOK | enemy), (DIAGONAL, BISHOP | enemy)):
+            for d in directions:
+                ray = []
+                shield = None
+                for target in RAY_SQUARES[d][king_sq]:
+                    code = squares[target]
+                    ray.append(COORDS[target])
+                    if code:
+                        if code & BLACK == side:
+                            if shield is not None:
+                                break
+                            shield = COORDS[target]
+                        else:
+                            if code == slider or code == queen:
+                                if shield is None:
+                                    checkers.append(COORDS[target])
+                                    block.update(ray)
+                                else:
+                                    pins[shield] = set(ray)
+                            break
+
+        return checkers, block if checkers else None, pins
+
+    def get_move_options(self, position, info: None | tuple = None) -> tuple:
+        sq = 8 * position[1] + position[0]
+        code = self.squares[sq]
+        color = piece_color(code)
+        enemy = opposite_color(color)
+        checkers, block, pins = self.check_info(color) if info is None else info
+        mvs, caps = KINDS[code & 7].get_mvs_and_caps(self.squares, position, code, self.castling)
+
+        if code & 7 == KING:
+            # Lift the king so squares behind it on a checking ray are not treated as shielded
+            self.squares[sq] = EMPTY
+            new_mvs = [mv for mv in mvs if abs(mv[0] - position[0]) < 2 and not self.is_attacked(mv, enemy)]
+            new_caps = [mv for mv in caps if not self.is_attacked(mv, enemy)]
+            self.squares[sq] = code
+            if not checkers:
+                for mv in mvs:
+                    if abs(mv[0] - position[0]) == 2 and not self.is_attacked(mv, enemy) and \
+                            not self.is_attacked(((mv[0] + position[0]) // 2, position[1]), enemy):
+                        new_mvs.append(mv)
+            return new_mvs, new_caps
+
+        if len(checkers) > 1:
+            return [], []
+        allowed = pins.get(position)
+        if block is not None:
+            allowed = block if allowed is None else allowed & block
+        if allowed is not None:
+            mvs = [mv for mv in mvs if mv in allowed]
+            caps = [mv for mv in caps if mv in allowed]
+
+        if self.en_passant is not None and code & 7 == PAWN and position[1] == self.en_passant[1] \
+                and abs(position[0] - self.en_passant[0]) == 1:
+            other = self.piece_at(self.en_passant)
+            if (code ^ other) & BLACK:
+                # Both pawns leave their squares, which the pin and check sets cannot describe
+                mv = (self.en_passant[0], self.en_passant[1] - pawn_direction(other))
+                self.make_move(position, mv)
+                if not self.is_check(color):
+                    mvs.append(mv)
+                self.unmake_move()
+        return mvs, caps
+
+    def legal_moves(self, color) -> list:
+        info = self.check_info(color)
+        side = color_bit(color)
+        moves = []
+        for sq, code in enumerate(self.squares):
+            if code and code & BLACK == side:
+                position = (sq & 7, sq >> 3)
+                mvs, caps = self.get_move_options(position, info)
+                moves += [(position, mv) for mv in mvs]
+                moves += [(position, mv) for mv in caps]
+        return moves
+
+    def has_legal_move(self, color) -> bool:
+        # Stops at the first piece that can move, starting with the king, the only piece that can answer a double check
+        info = self.check_info(color)
+        mvs, caps = self.get_move_options(self.kings[color], info)
+        if mvs or caps:
+            return True
+        side = color_bit(color)
+        for sq, code in enumerate(self.squares):
+            if code and code & BLACK == side and code & 7 != KING:
+                mvs, caps = self.get_move_options((sq & 7, sq >> 3), info)
+                if mvs or caps:
+                    return True
+        return False
+
+    def history(self) -> list:
+        # Hashes of the earlier positions that can still come back, oldest first: those since the last capture or
+        # pawn move, from the copied prior ones and the undo records
+        stack = self.undo_stack
+        if len(stack) >= self.halfmove:
+            return [record[8] for record in stack[len(stack) - self.halfmove:]]
+        hashes = list(self.prior) + [record[8] for record in stack]
+        return hashes[max(len(hashes) - self.halfmove, 0):]
+
+    def repetitions(self) -> int:
+        # Times the position has occurred, this one included. The side to move is part of the hash, so positions an
+        # odd number of plies back never match
+        return 1 + self.history().count(self.hash)
+
+    def outcome(self, has_moves: None | bool = None) -> None | tuple[str, str]:
+        # (result, termination) once the game is over, None while it goes on. Callers that already know whether
+        # the side to move has a move pass it in
+        if has_moves is None:
+            has_moves = self.has_legal_move(self.turn)
+        if not has_moves:
+            if self.is_check(self.turn):
+                return ('0-1' if self.turn == 'white' else '1-0'), 'checkmate'
+            return '1/2-1/2', 'stalemate'
+        if self.halfmove >= 100:
+            return '1/2-1/2', 'fifty-move rule'
+        if self.repetitions() >= 3:
+            return '1/2-1/2', 'threefold repetition'
+        return None
+
+    def copy(self):
+        board = Board.__new__(Board)
+        board.squares = self.squares[:]
+        board.castling = self.castling
+        board.pawn_to_promote = None
+        board.en_passant = self.en_passant
+        board.turn = self.turn
+        board.halfmove = self.halfmove
+        board.fullmove = self.fullmove
+        board.undo_stack = []
+        board.prior = tuple(self.history())
+        board.kings = self.kings.copy()
+        board.hash = self.hash
+        board.mg = self.mg
+        board.eg = self.eg
+        board.phase = self.phase
+        board.pawn_hash = self.pawn_hash
+        return board
+
+    @classmethod
+    def from_squares(cls, squares: bytearray, turn: str = 'white', castling: int = 0,
+                     en_passant: None | tuple[int, int] = None, halfmove: int = 0, fullmove: int = 1) -> 'Board':
+        # Castling rights without the king and rook on their starting squares are dropped
+        for bit, (kx, ky), (rx, ry) in CASTLING_SQUARES:
+            side = BLACK if ky == 0 else 0
+            if squares[8 * ky + kx] != KING | side or squares[8 * ry + rx] != ROOK | side:
+                castling &= ~bit
+        board = cls(squares, castling)
+        board.turn = turn
+        board.en_passant = en_passant
+        board.halfmove = halfmove
+        board.fullmove = fullmove
+        # The constructor hashed the pieces and castling rights already
+        board.hash ^= en_passant_key(squares, en_passant) ^ (SIDE_KEY if turn == 'black' else 0)
+        return board
+
+    @classmethod
+    def from_fen(cls, fen: str = START_FEN) -> 'Board':
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError('Invalid FEN: ' + fen)
+        squares = bytearray()
+        for text in fields[0].split('/'):
+            row = bytearray()
+            for char in text:
+                if char.isdigit():
+                    row += bytes(int(char))
+                elif char.lower() in FEN_PIECES:
+                    row.append(FEN_PIECES[char.lower()] | (0 if char.isupper() else BLACK))
+                else:
+                    raise ValueError('Invalid FEN: ' + fen)
+            if len(row) != 8:
+                raise ValueError('Invalid FEN: ' + fen)
+            squares += row
+        if len(squares) != 64 or fields[1] not in ('w', 'b'):
+            raise ValueError('Invalid FEN: ' + fen)
+
+        turn = 'white' if fields[1] == 'w' else 'black'
+        castling = 0
+        for char, bit in zip('KQkq', (WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE)):
+            if char in fields[2]:
+                castling |= bit
+        en_passant = None
+        if fields[3] != '-':
+            # FEN names the square behind the pawn, Board keeps the square of the pawn itself
+            x, y = 'abcdefgh'.index(fields[3][0]), 8 - int(fields[3][1])
+            en_passant = (x, y + 1 if turn == 'white' else y - 1)
+        halfmove = int(fields[4]) if len(fields) > 4 else 0
+        fullmove = int(fields[5]) if len(fields) > 5 else 1
+        return cls.from_squares(squares, turn, castling, en_passant, halfmove, fullmove)
+
+    def fen(self) -> str:
+        rows = []
+        for y in range(8):
+            row = ''
+            empty = 0
+            for code in self.squares[8 * y:8 * y + 8]:
+                if not code:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[code & 7]
+                row += letter if code & BLACK else letter.upper()
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        castling = ''.join(char for char, bit in zip('KQkq', (1, 2, 4, 8)) if self.castling & bit) or '-'
+        en_passant = '-'
+        if self.en_passant is not None:
+            x, y = self.en_passant
+            en_passant = 'abcdefgh'[x] + str(8 - (y - pawn_direction(self.piece_at(self.en_passant))))
+        return '{} {} {} {} {} {}'.format('/'.join(rows), 'w' if self.turn == 'white' else 'b', castling, en_passant,
+                                          self.halfmove, self.fullmove)
+
+    def pack(self) -> bytes:
+        squares = self.squares
+        flags = (self.turn == 'black') | self.castling << 1
+        en_passant = 0 if self.en_passant is None else self.en_passant[0] + 1
+        return PACKED.pack(bytes(squares[i] | squares[i + 1] << 4 for i in range(0, 64, 2)), flags, en_passant,
+                           self.halfmove, self.fullmove)
+
+    @classmethod
+    def unpack(cls, data: bytes, history: tuple = ()) -> 'Board':
+        # history is what history() gave on the packed board, which pack() leaves out so records keep their size
+        nibbles, flags, en_passant, halfmove, fullmove = PACKED.unpack(data)
+        squares = bytearray(64)
+        squares[0::2] = bytes(byte & 15 for byte in nibbles)
+        squares[1::2] = bytes(byte >> 4 for byte in nibbles)
+        turn = 'black' if flags & 1 else 'white'
+        if en_passant:
+            # The pawn that just moved two squares belongs to the side that is not to move
+            en_passant = (en_passant - 1, 4 if turn == 'black' else 3)
+        else:
+            en_passant = None
+        board = cls.from_squares(squares, turn, flags >> 1, en_passant, halfmove, fullmove)
+        board.prior = tuple(history)
+        return board
+
+    def make_move(self, original_coord, final_coord, promotion: None | type = None) -> str:
+        key = self.hash
+        turn = self.turn
+        castling = self.castling
+        self.hash ^= en_passant_key(self.squares, self.en_passant)
+
+        code = self.pop_piece(original_coord)
+        kind = code & 7
+        captured_coord = final_coord
+        rook_move = None
+        en_passant = None
+        mv_type = 'move'
+
+        if kind == PAWN:
+            if self.en_passant is not None:
+                other = self.piece_at(self.en_passant)
+                if (code ^ other) & BLACK and \
+                        final_coord == (self.en_passant[0], self.en_passant[1] - pawn_direction(other)):
+                    captured_coord = self.en_passant
+            if abs(final_coord[1] - original_coord[1]) == 2:
+                en_passant = final_coord
+        elif kind == KING and abs(final_coord[0] - original_coord[0]) == 2:
+            mv_type = 'castle'
+            if final_coord[0] > original_coord[0]:
+                rook_move = ((7, original_coord[1]), (final_coord[0] - 1, final_coord[1]))
+            else:
+                rook_move = ((0, original_coord[1]), (final_coord[0] + 1, final_coord[1]))
+            self.put_piece(rook_move[1], self.pop_piece(rook_move[0]))
+
+        captured = self.pop_piece(captured_coord)
+        if captured:
+            mv_type = 'capture'
+        self.put_piece(final_coord, code if promotion is None else promotion.kind | code & BLACK)
+
+        self.undo_stack.append((original_coord, final_coord, code, captured, captured_coord, self.en_passant,
+                                castling, rook_move, key, turn, self.halfmove, self.fullmove))
+        self.halfmove = 0 if captured or kind == PAWN else self.halfmove + 1
+        if code & BLACK:
+            self.fullmove += 1
+        self.en_passant = en_passant
+        self.hash ^= en_passant_key(self.squares, en_passant)
+        # Castling rights only change when a move starts or ends on a king or rook starting square
+        self.castling &= CASTLING_MASK[8 * original_coord[1] + original_coord[0]] & \
+            CASTLING_MASK[8 * final_coord[1] + final_coord[0]]
+        if self.castling != castling:
+            self.hash ^= CASTLING_KEYS[castling] ^ CASTLING_KEYS[self.castling]
+        self.turn = piece_color(code ^ BLACK)
+        if self.turn != turn:
+            self.hash ^= SIDE_KEY
+        return mv_type
+
+    def unmake_move(self) -> tuple:
+        original_coord, final_coord, code, captured, captured_coord, en_passant, self.castling, rook_move, key, turn, \
+            self.halfmove, self.fullmove = self.undo_stack.pop()
+        placed = self.pop_piece(final_coord)
+        self.put_piece(original_coord, code)
+        if captured:
+            self.put_piece(captured_coord, captured)
+        if rook_move is not None:
+            self.put_piece(rook_move[0], self.pop_piece(rook_move[1]))
+        self.en_passant = en_passant
+        self.hash = key
+        self.turn = turn
+        return original_coord, final_coord, None if placed == code else KINDS[placed & 7]
+
+    def move(self, original_coord, final_coord, color) -> tuple[str, str]:
+        mv_type = self.make_move(original_coord, final_coord)
+        code = self.piece_at(final_coord)
+        flag = ''
+
+        if self.is_check(opposite_color(color)):
+            mv_type = 'check'
+
+        if code & 7 == PAWN and final_coord[1] == (7 if code & BLACK else 0):
+            flag = 'promotion'
+
+        return mv_type, flag
@@ -0,0 +1,165 @@
+import mmap
+import os
+import random
+import struct
+from typing import Union
+
+from core.board import Board
+from core.engine import PROMOTION_CODES
+from core.notation import read_pgn, parse_san
+from core.pieces import ROOK, KING, BLACK, piece_color
+from core.polyglot import polyglot_key
+
+# Polyglot book entries: position key, move, weight and a learn field nobody uses, big-endian and sorted by key
+ENTRY = struct.Struct('>QHHI')
+KEY = struct.Struct('>Q')
+
+
+def encode_book_move(board, move: tuple) -> int:
+    # Polyglot counts rows from white's side and writes castling as the king taking its own rook
+    original, final, promotion = move
+    if board.piece_at(original) & 7 == KING and abs(final[0] - original[0]) == 2:
+        final = (7 if final[0] > original[0] else 0, final[1])
+    return final[0] | (7 - final[1]) << 3 | original[0] << 6 | (7 - original[1]) << 9 | \
+        PROMOTION_CODES.index(promotion) << 12
+
+
+def decode_book_move(board, value: int) -> tuple:
+    original = ((value >> 6) & 7, 7 - ((value >> 9) & 7))
+    final = (value & 7, 7 - ((value >> 3) & 7))
+    code = board.piece_at(original)
+    if code & 7 == KING and original[0] == 4 and board.piece_at(final) == ROOK | code & BLACK:
+        final = (6 if final[0] == 7 else 2, final[1])
+    return original, final, PROMOTION_CODES[(value >> 12) & 7]
+
+
+def is_legal(board, move: tuple, info: Union[None, tuple] = None) -> bool:
+    code = board.piece_at(move[0])
+    if not code or piece_color(code) != board.turn:
+        return False
+    mvs, caps = board.get_move_options(move[0], info)
+    return move[1] in mvs or move[1] in caps
+
+
+class OpeningBook:
+    # Reads a Polyglot .bin through mmap: a lookup is a binary search that touches a few pages of the file, and
+    # worker processes mapping the same file share those pages. Pickling keeps only the path, so a book handed to a
+    # spawned process maps the file again there.
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.map = b''
+        self.size = len(self.map) // ENTRY.size
+
+    def __getstate__(self):
+        return self.path
+
+    def __setstate__(self, path):
+        self.__init__(path)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def find(self, key: int) -> int:
+        # Index of the first entry with key, or of the first one after it
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.map, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def raw_entries(self, key: int) -> list:
+        # (encoded move, weight) for every entry with key, in the book's order
+        found = []
+        index = self.find(key)
+        while index < self.size:
+            entry_key, value, weight, _ = ENTRY.unpack_from(self.map, index * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((value, weight))
+            index += 1
+        return found
+
+    def entries(self, board) -> list:
+        # (move, weight) for each legal book move of the position. Keys can collide, so the legality check is needed
+        found = []
+        info = board.check_info(board.turn)
+        for value, weight in self.raw_entries(polyglot_key(board)):
+            move = decode_book_move(board, value)
+            if is_legal(board, move, info):
+                found.append((move, weight))
+        return found
+
+    def choose(self, board) -> Union[None, tuple]:
+        # A book move picked with probability proportional to its weight, None when out of book. Only the pick is
+        # decoded and checked, which is most of the cost of a lookup
+        entries = [entry for entry in self.raw_entries(polyglot_key(board)) if entry[1]]
+        while entries:
+            index = random.choices(range(len(entries)), [weight for _, weight in entries])[0]
+            move = decode_book_move(board, entries[index][0])
+            if is_legal(board, move):
+                return move
+            del entries[index]
+        return None
+
+
+class BookChooser:
+    # A move chooser that plays from the book while it can and asks chooser otherwise
+    def __init__(self, book: OpeningBook, chooser):
+        self.book = book
+        self.chooser = chooser
+
+    def __call__(self, board, color: str, stop=None) -> Union[None, tuple]:
+        move = self.book.choose(board)
+        if move is None:
+            return self.chooser(board, color, stop=stop)
+        return move
+
+
+def build_book(pgn_path: str, book_path: str, plies: int = 16) -> int:
+    # Counts the first plies moves of every game, two points for a win and one for a draw to the side that played
+    # them, and writes the moves that scored anything. Returns the number of entries written
+    weights = {}
+    with open(pgn_path, encoding='utf-8', errors='replace') as file:
+        for headers, sans, result in read_pgn(file):
+            board = Board.from_fen(headers['FEN']) if 'FEN' in headers else Board()
+            for text in sans[:plies]:
+                try:
+                    move = parse_san(board, board.turn, text)
+                except ValueError:
+                    break
+                if result == '1/2-1/2':
+                    points = 1
+                elif result == ('1-0' if board.turn == 'white' else '0-1'):
+                    points = 2
+                else:
+                    points = 0
+                if points:
+                    entry = (polyglot_key(board), encode_book_move(board, move))
+                    weights[entry] = weights.get(entry, 0) + points
+                board.make_move(*move)
+
+    # Weights are 16 bits, so busy books are scaled down, keeping every move at least at 1
+    scale = max(max(weights.values(), default=0) / 0xFFFF, 1)
+    entries = sorted(((key, -max(int(weight / scale), 1), value) for (key, value), weight in weights.items()))
+    with open(book_path, 'wb') as file:
+        for key, weight, value in entries:
+            file.write(ENTRY.pack(key, value, -weight, 0))
+    return len(entries)
@@ -0,0 +1,327 @@
+import time
+
+from core.pieces import PAWN, Knight, Bishop, Rook, Queen, opposite_color
+from core.tt import TranspositionTable, EXACT, LOWER, UPPER
+from core.evaluation import evaluate
+
+MATE = 100000
+INFINITY = 1000000
+# Endings the bitbases call won score above any material and below any mate
+BITBASE_WIN = 50000
+
+# Indexed by piece kind, for move ordering
+VALUES = (0, 100, 320, 330, 500, 900, 0)
+
+PROMOTIONS = (Queen, Knight, Rook, Bishop)
+PROMOTION_CODES = (None, Knight, Bishop, Rook, Queen)
+
+
+def generate_moves(board, color: str) -> list:
+    moves = []
+    for original, final in board.legal_moves(color):
+        if board.squares[8 * original[1] + original[0]] & 7 == PAWN and final[1] in (0, 7):
+            moves += [(original, final, piece) for piece in PROMOTIONS]
+        else:
+            moves.append((original, final, None))
+    return moves
+
+
+def encode_move(move) -> int:
+    original, final, promotion = move
+    return 8 * original[1] + original[0] | (8 * final[1] + final[0]) << 6 | PROMOTION_CODES.index(promotion) << 12
+
+
+def decode_move(code: int) -> tuple:
+    return (code & 7, (code >> 3) & 7), ((code >> 6) & 7, (code >> 9) & 7), PROMOTION_CODES[code >> 12]
+
+
+def score_to_table(score: int, ply: int) -> int:
+    # Mate scores are stored relative to the position so they stay valid when reached at another ply
+    if score > MATE - 1000:
+        return score + ply
+    if score < -MATE + 1000:
+        return score - ply
+    return score
+
+
+def score_from_table(score: int, ply: int) -> int:
+    if score > MATE - 1000:
+        return score - ply
+    if score < -MATE + 1000:
+        return score + ply
+    return score
+
+
+def principal_variation(engine, board, move: tuple, depth: int) -> list:
+    # The best move followed by the moves the transposition table still holds for the positions after it
+    line = [move]
+    tt = engine.tt
+    board = board.copy()
+    board.make_move(*move)
+    seen = {board.hash}
+    while len(line) < depth:
+        entry = tt.probe(board.hash)
+        if not entry or not entry[3]:
+            break
+        move = decode_move(entry[3])
+        if move not in generate_moves(board, board.turn):
+            break
+        board.make_move(*move)
+        if board.hash in seen:
+            break
+        seen.add(board.hash)
+        line.append(move)
+    return line
+
+
+def random_move(board, color: str, stop=None) -> None | tuple:
+    moves = generate_moves(board, color)
+    if not moves:
+        return None
+    # Imported here so that loading the engine does not load random
+    from random import choice
+    return choice(moves)
+
+
+def mop_up(board, winner: str) -> int:
+    # A won ending still needs a plan: the losing king driven to the edge and the winning king close to it
+    king, other = board.kings[winner], board.kings[opposite_color(winner)]
+    return 10 * (abs(2 * other[0] - 7) + abs(2 * other[1] - 7)) + \
+        4 * (14 - abs(king[0] - other[0]) - abs(king[1] - other[1]))
+
+
+def bitbase_score(board, color: str, result: int) -> int:
+    if not result:
+        return 0
+    winner = color if result > 0 else opposite_color(color)
+    score = BITBASE_WIN + evaluate(board, winner) + mop_up(board, winner)
+    return score if result > 0 else -score
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Engine:
+    def __init__(self, time_limit: float = 1.0, max_depth: int = 64, hash_mb: float = 16, bitbases=None):
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.tt = TranspositionTable(hash_mb)
+        # Probing pays off when a line reaches a known ending from outside one. Inside one the tables tell won from
+        # drawn but not how far mate is, so they only narrow down the root moves and the winner's leaves get mop_up
+        self.bitbases = bitbases
+        self.probing = False
+        self.winner = None
+        self.deadline = None
+        self.stop = None
+        self.nodes = 0
+        self.max_nodes = float('inf')
+        self.killers = []
+        # Hashes of the game's earlier positions that can still repeat followed by those on the line being searched
+        self.path = []
+        self.root_best = None
+        self.root_score = -INFINITY
+
+    def choose_move(self, board, color: str, stop=None) -> None | tuple:
+        return self.search(board, color, stop=stop)[0]
+
+    def search(self, board, color: str, time_limit: None | float = None,
+               max_depth: None | int = None, stop=None, info=None,
+               max_nodes: None | int = None) -> tuple[None | tuple, None | int, int]:
+        # stop is anything with an is_set() method, such as a threading.Event, checked every 16 nodes. info, when
+        # given, is called with (depth, score, nodes, seconds, move) after every completed iteration. The score is
+        # None when time ran out before a single root move was searched, and the move then is only the first in order.
+        # max_nodes ends the search like the clock does
+        start = time.perf_counter()
+        self.deadline = start + (self.time_limit if time_limit is None else time_limit)
+        self.stop = stop
+        self.max_nodes = float('inf') if max_nodes is None else max_nodes
+        max_depth = self.max_depth if max_depth is None else max_depth
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(max_depth + 64)]
+        self.tt.new_search()
+
+        # Search a private copy so an interrupted line never has to be taken back on the caller's board. The copy
+        # keeps the hashes of the earlier positions, so lines that go back to one of them are scored as draws
+        board = board.copy()
+        self.path = board.history() + [board.hash]
+        self.set_root(board, color)
+        moves = self.root_moves(board, color)
+        if not moves:
+            return None, 0, 0
+        best_move, best_score, completed = moves[0], None, 0
+
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self.root(board, color, depth, moves)
+            except SearchTimeout:
+                break
+            finally:
+                # Whatever the root managed to finish is at least as well informed as the previous iteration
+                if self.root_best is not None:
+                    best_move, best_score = self.root_best, self.root_score
+            completed = depth
+            moves.remove(move)
+            moves.insert(0, move)
+            if info is not None:
+                info(depth, score, self.nodes, time.perf_counter() - start, move)
+            if abs(score) >= MATE - 64:
+                break
+        return best_move, best_score, completed
+
+    def set_deadline(self, time_limit: float):
+        # Moves the end of a running search, such as one started without a limit while pondering
+        self.deadline = time.perf_counter() + time_limit
+
+    def set_root(self, board, color: str):
+        result = None if self.bitbases is None else self.bitbases.probe(board)
+        self.probing = self.bitbases is not None and result is None
+        self.winner = None if not result else color if result > 0 else opposite_color(color)
+
+    def root_moves(self, board, color: str) -> list:
+        entry = self.tt.probe(board.hash)
+        moves = self.order(board, generate_moves(board, color), decode_move(entry[3]) if entry and entry[3] else None,
+                           0)
+        if self.bitbases is not None and moves and self.bitbases.probe(board) is not None:
+            # Only the moves that keep the best result the tables know of
+            results = []
+            for move in moves:
+                board.make_move(*move)
+                result = self.bitbases.probe(board)
+                board.unmake_move()
+                results.append(0 if result is None else -result)
+            best = max(results)
+            moves = [move for move, result in zip(moves, results) if result == best]
+        return moves
+
+    def score_move(self, board, color: str, move: tuple, depth: int, alpha: int = -INFINITY, beta: int = INFINITY,
+                   time_limit: None | float = None, stop=None, max_nodes: None | int = None) -> int:
+        # Searches a single root move, for callers that share the root between several engines
+        self.deadline = time.perf_counter() + (self.time_limit if time_limit is None else time_limit)
+        self.stop = stop
+        self.max_nodes = float('inf') if max_nodes is None else max_nodes
+        self.set_root(board, color)
+        self.path = board.history() + [board.hash]
+        if len(self.killers) < depth + 64:
+            self.killers = [[None, None] for _ in range(depth + 64)]
+        board.make_move(*move)
+        try:
+            return -self.negamax(board, opposite_color(color), depth - 1, -beta, -alpha, 1)
+        finally:
+            board.unmake_move()
+
+    def root(self, board, color, depth, moves):
+        alpha = -INFINITY
+        self.root_best = None
+        self.root_score = -INFINITY
+        enemy = opposite_color(color)
+        for move in moves:
+            board.make_move(*move)
+            score = -self.negamax(board, enemy, depth - 1, -INFINITY, -alpha, 1)
+            board.unmake_move()
+            if score > alpha:
+                alpha = score
+                self.root_best = move
+                self.root_score = score
+        self.tt.store(board.hash, depth, EXACT, score_to_table(alpha, 0), encode_move(self.root_best))
+        return alpha, self.root_best
+
+    def tick(self):
+        self.nodes += 1
+        if self.nodes >= self.max_nodes or time.perf_counter() >= self.deadline or \
+                (self.stop is not None and not self.nodes & 15 and self.stop.is_set()):
+            raise SearchTimeout()
+
+    def negamax(self, board, color, depth, alpha, beta, ply):
+        # A position seen before on the line or in the game is a draw, as going round again can only repeat it
+        if board.hash in self.path:
+            return 0
+        if self.probing:
+            result = self.bitbases.probe(board)
+            if result is not None:
+                return bitbase_score(board, color, result)
+        if depth <= 0:
+            return self.quiesce(board, color, alpha, beta)
+        self.tick()
+
+        best = None
+        entry = self.tt.probe(board.hash)
+        if entry is not None:
+            entry_depth, bound, score, code = entry
+            if entry_depth >= depth:
+                score = score_from_table(score, ply)
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+            if code:
+                best = decode_move(code)
+
+        moves = generate_moves(board, color)
+        if not moves:
+            return -MATE + ply if board.is_check(color) else 0
+
+        enemy = opposite_color(color)
+        original_alpha = alpha
+        best_score = -INFINITY
+        self.path.append(board.hash)
+        for move in self.order(board, moves, best, ply):
+            board.make_move(*move)
+            score = -self.negamax(board, enemy, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not board.squares[8 * move[1][1] + move[1][0]] and move != self.killers[ply][0]:
+                    self.killers[ply] = [move, self.killers[ply][0]]
+                break
+        self.path.pop()
+
+        bound = LOWER if best_score >= beta else EXACT if best_score > original_alpha else UPPER
+        self.tt.store(board.hash, depth, bound, score_to_table(best_score, ply), encode_move(best))
+        return best_score
+
+    def quiesce(self, board, color, alpha, beta):
+        self.tick()
+        stand_pat = evaluate(board, color)
+        if self.winner is not None:
+            stand_pat += mop_up(board, self.winner) if color == self.winner else -mop_up(board, self.winner)
+        if stand_pat >= beta:
+            return beta
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        enemy = opposite_color(color)
+        # En passant lands on an empty square, but is the only pawn move that changes file without a victim there
+        squares = board.squares
+        captures = [move for move in generate_moves(board, color)
+                    if squares[8 * move[1][1] + move[1][0]] or move[2] is Queen or
+                    (move[0][0] != move[1][0] and squares[8 * move[0][1] + move[0][0]] & 7 == PAWN)]
+        for move in self.order(board, captures, None, None):
+            board.make_move(*move)
+            score = -self.quiesce(board, enemy, -beta, -alpha)
+            board.unmake_move()
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def order(self, board, moves, best, ply):
+        killers = self.killers[ply] if ply is not None and ply < len(self.killers) else ()
+
+        def key(move):
+            if move == best:
+                return 1000000
+            original, final, promotion = move
+            victim = board.squares[8 * final[1] + final[0]]
+            if victim:
+                return 100000 + 10 * VALUES[victim & 7] - VALUES[board.squares[8 * original[1] + original[0]] & 7]
+            if promotion is not None:
+                return 50000 + VALUES[promotion.kind]
+            if move in killers:
+                return 10000
+            return 0
+
+        return sorted(moves, key=key, reverse=True)
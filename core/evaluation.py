@@ -0,0 +1,176 @@
+from core.pieces import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK
+from core.zobrist import PIECE_KEYS
+
+# Tapered evaluation: every piece has a middlegame and an endgame score, and the two are blended by how much
+# material other than pawns is left. Board keeps the sums up to date as pieces are put and popped, so evaluating a
+# position only adds the pawn structure, which is cached by the hash of the pawns alone.
+# Set DEBUG to check the running sums against a full recount at every evaluation.
+DEBUG = False
+
+# Indexed by piece kind
+MG_VALUES = (0, 100, 320, 330, 500, 900, 0)
+EG_VALUES = (0, 120, 290, 320, 530, 940, 0)
+PHASE_VALUES = (0, 0, 1, 1, 2, 4, 0)
+TOTAL_PHASE = 24
+
+# Piece-square tables seen from white, indexed 8 * y + x with y = 0 on black's back rank as in Board.
+# Black pieces read the table with the rows mirrored, that is at square ^ 56.
+MG_PST = {
+    PAWN: (0, 0, 0, 0, 0, 0, 0, 0,
+           50, 50, 50, 50, 50, 50, 50, 50,
+           10, 10, 20, 30, 30, 20, 10, 10,
+           5, 5, 10, 25, 25, 10, 5, 5,
+           0, 0, 0, 20, 20, 0, 0, 0,
+           5, -5, -10, 0, 0, -10, -5, 5,
+           5, 10, 10, -20, -20, 10, 10, 5,
+           0, 0, 0, 0, 0, 0, 0, 0),
+    KNIGHT: (-50, -40, -30, -30, -30, -30, -40, -50,
+             -40, -20, 0, 0, 0, 0, -20, -40,
+             -30, 0, 10, 15, 15, 10, 0, -30,
+             -30, 5, 15, 20, 20, 15, 5, -30,
+             -30, 0, 15, 20, 20, 15, 0, -30,
+             -30, 5, 10, 15, 15, 10, 5, -30,
+             -40, -20, 0, 5, 5, 0, -20, -40,
+             -50, -40, -30, -30, -30, -30, -40, -50),
+    BISHOP: (-20, -10, -10, -10, -10, -10, -10, -20,
+             -10, 0, 0, 0, 0, 0, 0, -10,
+             -10, 0, 5, 10, 10, 5, 0, -10,
+             -10, 5, 5, 10, 10, 5, 5, -10,
+             -10, 0, 10, 10, 10, 10, 0, -10,
+             -10, 10, 10, 10, 10, 10, 10, -10,
+             -10, 5, 0, 0, 0, 0, 5, -10,
+             -20, -10, -10, -10, -10, -10, -10, -20),
+    ROOK: (0, 0, 0, 0, 0, 0, 0, 0,
+           5, 10, 10, 10, 10, 10, 10, 5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           0, 0, 0, 5, 5, 0, 0, 0),
+    QUEEN: (-20, -10, -10, -5, -5, -10, -10, -20,
+            -10, 0, 0, 0, 0, 0, 0, -10,
+            -10, 0, 5, 5, 5, 5, 0, -10,
+            -5, 0, 5, 5, 5, 5, 0, -5,
+            0, 0, 5, 5, 5, 5, 0, -5,
+            -10, 5, 5, 5, 5, 5, 0, -10,
+            -10, 0, 5, 0, 0, 0, 0, -10,
+            -20, -10, -10, -5, -5, -10, -10, -20),
+    KING: (-30, -40, -40, -50, -50, -40, -40, -30,
+           -30, -40, -40, -50, -50, -40, -40, -30,
+           -30, -40, -40, -50, -50, -40, -40, -30,
+           -30, -40, -40, -50, -50, -40, -40, -30,
+           -20, -30, -30, -40, -40, -30, -30, -20,
+           -10, -20, -20, -20, -20, -20, -20, -10,
+           20, 20, 0, 0, 0, 0, 20, 20,
+           20, 30, 10, 0, 0, 10, 30, 20),
+}
+
+# In the endgame pawns are worth more the closer they are to promoting and the king belongs in the centre
+EG_PST = dict(MG_PST)
+EG_PST[PAWN] = (0, 0, 0, 0, 0, 0, 0, 0,
+                80, 80, 80, 80, 80, 80, 80, 80,
+                50, 50, 50, 50, 50, 50, 50, 50,
+                30, 30, 30, 30, 30, 30, 30, 30,
+                15, 15, 15, 15, 15, 15, 15, 15,
+                5, 5, 5, 5, 5, 5, 5, 5,
+                0, 0, 0, 0, 0, 0, 0, 0,
+                0, 0, 0, 0, 0, 0, 0, 0)
+EG_PST[KING] = (-50, -40, -30, -20, -20, -30, -40, -50,
+                -30, -20, -10, 0, 0, -10, -20, -30,
+                -30, -10, 20, 30, 30, 20, -10, -30,
+                -30, -10, 30, 40, 40, 30, -10, -30,
+                -30, -10, 30, 40, 40, 30, -10, -30,
+                -30, -10, 20, 30, 30, 20, -10, -30,
+                -30, -30, 0, 0, 0, 0, -30, -30,
+                -50, -30, -30, -30, -30, -30, -30, -50)
+
+
+def _signed_table(values, pst) -> tuple:
+    # Indexed by piece code, then square: value plus placement, negated for black so the sums are from white's side
+    table = []
+    for code in range(16):
+        kind = code & 7
+        if not PAWN <= kind <= KING:
+            table.append((0,) * 64)
+        elif code & BLACK:
+            table.append(tuple(-values[kind] - pst[kind][sq ^ 56] for sq in range(64)))
+        else:
+            table.append(tuple(values[kind] + pst[kind][sq] for sq in range(64)))
+    return tuple(table)
+
+
+MG_TABLE = _signed_table(MG_VALUES, MG_PST)
+EG_TABLE = _signed_table(EG_VALUES, EG_PST)
+PHASE = tuple(PHASE_VALUES[code & 7] if code & 7 <= KING else 0 for code in range(16))
+# The zobrist keys of pawns and nothing for other pieces, so the xor of them names the pawn structure
+PAWN_KEYS = tuple(PIECE_KEYS[code] if code & 7 == PAWN else (0,) * 64 for code in range(16))
+
+# Pawn structure terms as (middlegame, endgame), and passed pawn bonuses by how many rows the pawn has advanced
+DOUBLED = (-10, -20)
+ISOLATED = (-10, -15)
+PASSED_MG = (5, 10, 15, 25, 40, 60)
+PASSED_EG = (10, 15, 25, 45, 70, 110)
+
+PAWN_CACHE_SIZE = 1 << 14
+pawn_cache = {}
+
+
+def score_squares(squares) -> tuple:
+    # The running sums Board keeps: middlegame and endgame scores, phase and pawn hash
+    mg = eg = phase = pawn_hash = 0
+    for sq, code in enumerate(squares):
+        if code:
+            mg += MG_TABLE[code][sq]
+            eg += EG_TABLE[code][sq]
+            phase += PHASE[code]
+            pawn_hash ^= PAWN_KEYS[code][sq]
+    return mg, eg, phase, pawn_hash
+
+
+def pawn_structure(squares) -> tuple:
+    # Rows of the pawns of each side on every file, white first
+    files = (tuple([] for _ in range(8)), tuple([] for _ in range(8)))
+    for sq, code in enumerate(squares):
+        if code & 7 == PAWN:
+            files[code >> 3][sq & 7].append(sq >> 3)
+
+    mg = eg = 0
+    for side, sign in ((0, 1), (1, -1)):
+        own, enemy = files[side], files[side ^ 1]
+        for x in range(8):
+            rows = own[x]
+            if not rows:
+                continue
+            if len(rows) > 1:
+                mg += sign * DOUBLED[0] * (len(rows) - 1)
+                eg += sign * DOUBLED[1] * (len(rows) - 1)
+            neighbours = [own[f] for f in (x - 1, x + 1) if 0 <= f < 8]
+            if not any(neighbours):
+                mg += sign * ISOLATED[0] * len(rows)
+                eg += sign * ISOLATED[1] * len(rows)
+            for y in rows:
+                # Passed when no enemy pawn stands ahead of it on its own or a neighbouring file
+                if side:
+                    blocked = any(row > y for f in (x - 1, x, x + 1) if 0 <= f < 8 for row in enemy[f])
+                    advanced = y - 1
+                else:
+                    blocked = any(row < y for f in (x - 1, x, x + 1) if 0 <= f < 8 for row in enemy[f])
+                    advanced = 6 - y
+                if not blocked:
+                    mg += sign * PASSED_MG[advanced]
+                    eg += sign * PASSED_EG[advanced]
+    return mg, eg
+
+
+def evaluate(board, color: str) -> int:
+    if DEBUG:
+        assert (board.mg, board.eg, board.phase, board.pawn_hash) == score_squares(board.squares), board.fen()
+    pawns = pawn_cache.get(board.pawn_hash)
+    if pawns is None:
+        if len(pawn_cache) >= PAWN_CACHE_SIZE:
+            pawn_cache.clear()
+        pawns = pawn_cache[board.pawn_hash] = pawn_structure(board.squares)
+    phase = min(board.phase, TOTAL_PHASE)
+    score = ((board.mg + pawns[0]) * phase + (board.eg + pawns[1]) * (TOTAL_PHASE - phase)) // TOTAL_PHASE
+    return score if color == 'white' else -score
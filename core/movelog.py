@@ -0,0 +1,72 @@
+from array import array
+
+from core.board import Board
+from core.engine import encode_move, decode_move
+
+# A board is packed every KEYFRAME_INTERVAL plies, so reaching any ply replays fewer moves than that
+KEYFRAME_INTERVAL = 16
+# Plies without a capture or pawn move after which the fifty-move rule ends the game, so that no older position can
+# decide a repetition
+FIFTY_MOVES = 100
+
+
+class MoveLog:
+    # Two bytes per ply for the move, plus a 38-byte keyframe every KEYFRAME_INTERVAL plies. The hashes for spotting
+    # repetitions are not logged: the board's undo records hold them for every ply since the last capture or pawn
+    # move, and a board rebuilt from a keyframe replays far enough back to have them too
+    def __init__(self, board: Board):
+        self.moves = array('H')
+        self.keyframes = [board.pack()]
+        self.ply = 0
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def push(self, board: Board, move: tuple):
+        # move has just been made on board at the current ply; anything that could have been redone is dropped
+        del self.moves[self.ply:]
+        del self.keyframes[self.ply // KEYFRAME_INTERVAL + 1:]
+        self.moves.append(encode_move(move))
+        self.ply += 1
+        if self.ply % KEYFRAME_INTERVAL == 0:
+            self.keyframes.append(board.pack())
+        self.trim(board)
+
+    def move_at(self, ply: int) -> tuple:
+        return decode_move(self.moves[ply])
+
+    def goto(self, board: Board, ply: int) -> Board:
+        # Returns the board at ply, which is the given board moved there when that is cheaper than a keyframe
+        if not 0 <= ply <= len(self.moves):
+            raise IndexError('Ply out of range: {}'.format(ply))
+        back = self.ply - ply
+        reached = True
+        if 0 <= back <= min(len(board.undo_stack), KEYFRAME_INTERVAL):
+            for _ in range(back):
+                board.unmake_move()
+        elif 0 < -back <= KEYFRAME_INTERVAL:
+            for code in self.moves[self.ply:ply]:
+                board.make_move(*decode_move(code))
+        else:
+            reached = False
+        # Taking back a capture or pawn move can need older positions than the undo records go back to
+        if not reached or len(board.undo_stack) < min(board.halfmove, ply) < FIFTY_MOVES:
+            start = ply - ply % KEYFRAME_INTERVAL
+            board = Board.unpack(self.keyframes[start // KEYFRAME_INTERVAL])
+            # The positions that can still repeat may go back past the keyframe, so replay from the one before them
+            first = max(start - min(board.halfmove, FIFTY_MOVES), 0)
+            if first < start:
+                start = first - first % KEYFRAME_INTERVAL
+                board = Board.unpack(self.keyframes[start // KEYFRAME_INTERVAL])
+            for code in self.moves[start:ply]:
+                board.make_move(*decode_move(code))
+        self.ply = ply
+        self.trim(board)
+        return board
+
+    @staticmethod
+    def trim(board: Board):
+        # Older plies are reached through keyframes, so the board's own undo records need not grow with the game,
+        # beyond those of the positions that can still repeat
+        if len(board.undo_stack) > 2 * KEYFRAME_INTERVAL:
+            del board.undo_stack[:-max(KEYFRAME_INTERVAL, min(board.halfmove, FIFTY_MOVES))]
@@ -0,0 +1,140 @@
+import re
+from typing import Union
+
+from core.pieces import PAWN, KING, KINDS, opposite_color
+from core.perft import square_name
+
+LETTERS = '  NBRQK'
+SAN_PATTERN = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h])([1-8])(?:=?([NBRQ]))?$')
+HEADER_PATTERN = re.compile(r'\[(\w+)\s+"(.*)"\]')
+MOVE_NUMBER = re.compile(r'^\d+\.+')
+TOKEN = re.compile(r'[{}();]|[^\s{}();]+')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def san(board, color: str, move: tuple, moves: Union[None, list] = None, suffix: bool = True) -> str:
+    # moves are the legal moves of color, as (original, final, promotion) or (original, final), if already known
+    original, final, promotion = move
+    kind = board.piece_at(original) & 7
+    if kind == KING and abs(final[0] - original[0]) == 2:
+        text = 'O-O' if final[0] > original[0] else 'O-O-O'
+    elif kind == PAWN:
+        text = square_name(final)
+        if final[0] != original[0]:
+            text = 'abcdefgh'[original[0]] + 'x' + text
+        if promotion is not None:
+            text += '=' + LETTERS[promotion.kind]
+    else:
+        if moves is None:
+            moves = board.legal_moves(color)
+        others = {m[0] for m in moves if m[1] == final and m[0] != original and
+                  board.piece_at(m[0]) & 7 == kind}
+        prefix = ''
+        if others:
+            if all(other[0] != original[0] for other in others):
+                prefix = 'abcdefgh'[original[0]]
+            elif all(other[1] != original[1] for other in others):
+                prefix = str(8 - original[1])
+            else:
+                prefix = square_name(original)
+        capture = 'x' if board.piece_at(final) else ''
+        text = LETTERS[kind] + prefix + capture + square_name(final)
+
+    if suffix:
+        enemy = opposite_color(color)
+        board.make_move(original, final, promotion)
+        if board.is_check(enemy):
+            text += '+' if board.legal_moves(enemy) else '#'
+        board.unmake_move()
+    return text
+
+
+def parse_san(board, color: str, text: str, moves: Union[None, list] = None) -> tuple:
+    # The (original, final, promotion) move of color that text names; moves are its legal moves if already known
+    text = text.rstrip('+#!?')
+    if moves is None:
+        moves = board.legal_moves(color)
+    if text in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+        king = board.kings[color]
+        final = (king[0] + (2 if len(text) == 3 else -2), king[1])
+        if (king, final) in moves or (king, final, None) in moves:
+            return king, final, None
+        raise ValueError('Illegal move: ' + text)
+
+    match = SAN_PATTERN.match(text)
+    if match is None:
+        raise ValueError('Invalid move: ' + text)
+    letter, file, rank, final_file, final_rank, promotion = match.groups()
+    kind = LETTERS.index(letter) if letter else PAWN
+    final = ('abcdefgh'.index(final_file), 8 - int(final_rank))
+    candidates = {move[0] for move in moves if move[1] == final and board.piece_at(move[0]) & 7 == kind and
+                  (file is None or move[0][0] == 'abcdefgh'.index(file)) and
+                  (rank is None or move[0][1] == 8 - int(rank))}
+    if len(candidates) != 1:
+        raise ValueError(('Ambiguous move: ' if candidates else 'Illegal move: ') + text)
+    if (kind == PAWN and final[1] in (0, 7)) != (promotion is not None):
+        raise ValueError('Invalid promotion: ' + text)
+    return candidates.pop(), final, None if promotion is None else KINDS[LETTERS.index(promotion)]
+
+
+def read_pgn(lines):
+    # Yields (headers, sans, result) for each game in an iterable of PGN lines, such as an open file, skipping
+    # comments, variations and annotations without reading more than one game ahead
+    headers = {}
+    sans = []
+    comment = False
+    depth = 0
+    for line in lines:
+        if not comment and not depth and line.startswith('['):
+            match = HEADER_PATTERN.match(line.strip())
+            if match is not None:
+                if sans:
+                    yield headers, sans, headers.get('Result', '*')
+                    headers, sans = {}, []
+                headers[match.group(1)] = match.group(2)
+                continue
+        if line.startswith('%'):
+            continue
+        for token in TOKEN.findall(line):
+            if comment:
+                comment = token != '}'
+            elif token == '{':
+                comment = True
+            elif token == ';':
+                break
+            elif token == '(':
+                depth += 1
+            elif token == ')':
+                depth -= 1
+            elif depth or token[0] == '$':
+                continue
+            elif token in RESULTS:
+                yield headers, sans, token
+                headers, sans = {}, []
+            else:
+                token = MOVE_NUMBER.sub('', token, 1)
+                if token:
+                    sans.append(token)
+    if sans or headers:
+        yield headers, sans, headers.get('Result', '*')
+
+
+def pgn(headers: dict, sans: list, result: str) -> str:
+    lines = ['[{} "{}"]'.format(name, value) for name, value in headers.items()]
+    lines.append('')
+    tokens = []
+    for ply, text in enumerate(sans):
+        if ply % 2 == 0:
+            tokens.append('{}.'.format(ply // 2 + 1))
+        tokens.append(text)
+    tokens.append(result)
+
+    line = ''
+    for token in tokens:
+        if line and len(line) + len(token) >= 80:
+            lines.append(line)
+            line = token
+        else:
+            line = token if not line else line + ' ' + token
+    lines.append(line)
+    return '\n'.join(lines) + '\n\n'
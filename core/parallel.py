@@ -0,0 +1,194 @@
+import time
+
+from core.board import Board
+from core.engine import Engine, SearchTimeout, INFINITY, MATE, principal_variation, encode_move, score_to_table
+from core.tt import EXACT
+
+# Per-process state of the pool workers
+_engine = None
+_alpha = None
+_aborted = None
+_search = None
+_profiler = None
+
+
+class _Aborted:
+    def __init__(self, search_id: int):
+        self.search_id = search_id
+
+    def is_set(self) -> bool:
+        return _aborted.value >= self.search_id
+
+
+def _init_worker(hash_mb, alpha, aborted, bitbases=None, profile=False):
+    global _engine, _alpha, _aborted, _profiler
+    _engine = Engine(hash_mb=hash_mb, bitbases=bitbases)
+    if profile:
+        # The worker's counters go back with every task, as the self-play and AI workers send theirs
+        from core import profiler
+        profiler.enable()
+        _profiler = profiler
+    _alpha = alpha
+    _aborted = aborted
+
+
+def _ping():
+    return True
+
+
+def _score_move(packed, history, color, move, depth, deadline, search_id, first_id, max_nodes):
+    # Every root move starts from the best score any worker has proven so far in this iteration
+    global _search
+    if first_id != _search:
+        # A new move to choose ages the table, as Engine.search does, so entries from earlier moves can be replaced
+        _search = first_id
+        _engine.tt.new_search()
+    board = Board.unpack(packed, history)
+    alpha = _alpha.value
+    _engine.nodes = 0
+    try:
+        score = _engine.score_move(board, color, move, depth, alpha, INFINITY, deadline - time.time(),
+                                   _Aborted(search_id), max_nodes)
+    except SearchTimeout:
+        return move, None, _engine.nodes, None, _counters()
+    with _alpha.get_lock():
+        if score > _alpha.value:
+            _alpha.value = score
+    # The line this worker expects after the move, which only its own table knows
+    return move, score, _engine.nodes, principal_variation(_engine, board, move, depth), _counters()
+
+
+def _counters():
+    return None if _profiler is None else _profiler.collect()
+
+
+class ParallelEngine:
+    # Splits the root moves of each iteration across a process pool. The first move is searched alone to set
+    # the bound, then the rest run in parallel and tighten a shared alpha as they finish.
+    def __init__(self, workers: int = 4, time_limit: float = 1.0, max_depth: int = 64, hash_mb: float = 16,
+                 bitbases=None):
+        self.workers = workers
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.hash_mb = hash_mb
+        self.bitbases = bitbases
+        self.engine = Engine(time_limit, max_depth, hash_mb, bitbases)
+        # The workers' tables stay in their processes, so the main engine's table holds the root moves and the
+        # principal variation the workers send back, for move ordering and for reading the line out
+        self.tt = self.engine.tt
+        self.lines = {}
+        self.pool = None
+        self.alpha = None
+        self.aborted = None
+        self.search_id = 0
+        # search_id of the first iteration of the current search, which tells the workers a new search began
+        self.first_id = 1
+        self.deadline = None
+        self.nodes = 0
+        self.max_nodes = float('inf')
+
+    def start(self):
+        if self.pool is not None:
+            return
+        # The pool machinery costs more to import than the rest of core, so it waits for the first engine started
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, wait
+        from core import profiler
+        context = multiprocessing.get_context('spawn')
+        self.alpha = context.Value('q', -INFINITY)
+        self.aborted = context.Value('q', 0, lock=False)
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                        initargs=(self.hash_mb, self.alpha, self.aborted, self.bitbases,
+                                                  profiler.enabled))
+        wait([self.pool.submit(_ping) for _ in range(self.workers)])
+
+    def close(self):
+        if self.pool is not None:
+            self.aborted.value = self.search_id
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def choose_move(self, board, color: str, stop=None) -> None | tuple:
+        return self.search(board, color, stop=stop)[0]
+
+    def search(self, board, color: str, time_limit: None | float = None,
+               max_depth: None | int = None, stop=None, info=None,
+               max_nodes: None | int = None) -> tuple[None | tuple, None | int, int]:
+        # Each task may use the nodes left when it is handed out, so with several workers max_nodes is only roughly
+        # kept to
+        self.start()
+        start = time.time()
+        self.deadline = start + (self.time_limit if time_limit is None else time_limit)
+        max_depth = self.max_depth if max_depth is None else max_depth
+        self.nodes = 0
+        self.max_nodes = float('inf') if max_nodes is None else max_nodes
+        self.first_id = self.search_id + 1
+        self.tt.new_search()
+        self.lines = {}
+
+        board = board.copy()
+        moves = self.engine.root_moves(board, color)
+        if not moves:
+            return None, 0, 0
+        best_move, best_score, completed = moves[0], None, 0
+
+        for depth in range(1, max_depth + 1):
+            self.search_id += 1
+            self.alpha.value = -INFINITY
+            scores = self.run_tasks(board, color, moves[:1], depth, stop)
+            if scores is not None:
+                scores.update(self.run_tasks(board, color, moves[1:], depth, stop) or {})
+            # A partial iteration still counts when its best move beats the previous iteration's choice
+            finished = {move: score for move, score in (scores or {}).items() if score is not None}
+            if moves[0] in finished:
+                move = max(finished, key=finished.get)
+                best_move, best_score = move, finished[move]
+                self.store_line(board, self.lines[move], depth, best_score)
+            if scores is None or len(finished) < len(moves):
+                break
+            completed = depth
+            moves.sort(key=lambda m: finished[m], reverse=True)
+            if info is not None:
+                info(depth, best_score, self.nodes, time.time() - start, best_move)
+            if abs(best_score) >= MATE - 64:
+                break
+        self.aborted.value = self.search_id
+        return best_move, best_score, completed
+
+    def set_deadline(self, time_limit: float):
+        # Workers already searching keep the deadline they were given, so run_tasks aborts them once this one passes
+        self.deadline = time.time() + time_limit
+
+    def store_line(self, board, line: list, depth: int, score: int):
+        # Each position on the line gets its move, scored for the side to move there
+        for ply, move in enumerate(line):
+            self.tt.store(board.hash, max(depth - ply, 0), EXACT, score_to_table(-score if ply & 1 else score, ply),
+                          encode_move(move))
+            board.make_move(*move)
+        for _ in line:
+            board.unmake_move()
+
+    def run_tasks(self, board, color, moves, depth, stop) -> None | dict:
+        from concurrent.futures import wait, FIRST_COMPLETED
+        packed = board.pack()
+        history = tuple(board.history())
+        left = self.max_nodes - self.nodes
+        futures = [self.pool.submit(_score_move, packed, history, color, move, depth, self.deadline, self.search_id,
+                                    self.first_id, left) for move in moves]
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.01, return_when=FIRST_COMPLETED)
+            if (stop is not None and stop.is_set()) or time.time() >= self.deadline:
+                self.aborted.value = self.search_id
+        scores = {}
+        for future in futures:
+            move, score, nodes, line, counters = future.result()
+            scores[move] = score
+            self.lines[move] = line
+            if counters:
+                from core import profiler
+                profiler.merge(counters)
+            self.nodes += nodes
+        if any(score is None for score in scores.values()):
+            self.aborted.value = self.search_id
+        return scores if moves and any(score is not None for score in scores.values()) else None
@@ -0,0 +1,73 @@
+import time
+
+from core.board import Board, START_FEN
+from core.pieces import PAWN, Queen, Rook, Bishop, Knight, opposite_color
+
+PROMOTIONS = ((Queen, 'q'), (Rook, 'r'), (Bishop, 'b'), (Knight, 'n'))
+
+
+def square_name(position: tuple[int, int]) -> str:
+    return 'abcdefgh'[position[0]] + str(8 - position[1])
+
+
+def load_fen(fen: str):
+    board = Board.from_fen(fen)
+    return board, board.turn
+
+
+def is_promotion(board, original_coord, final_coord) -> bool:
+    return board.piece_at(original_coord) & 7 == PAWN and final_coord[1] in (0, 7)
+
+
+def perft(board, color: str, depth: int) -> int:
+    moves = board.legal_moves(color)
+    if depth <= 1:
+        if depth == 0:
+            return 1
+        return sum(4 if is_promotion(board, original, final) else 1 for original, final in moves)
+
+    nodes = 0
+    enemy = opposite_color(color)
+    for original, final in moves:
+        if is_promotion(board, original, final):
+            for piece, _ in PROMOTIONS:
+                board.make_move(original, final, piece)
+                nodes += perft(board, enemy, depth - 1)
+                board.unmake_move()
+        else:
+            board.make_move(original, final)
+            nodes += perft(board, enemy, depth - 1)
+            board.unmake_move()
+    return nodes
+
+
+def divide(board, color: str, depth: int) -> dict[str, int]:
+    counts = {}
+    enemy = opposite_color(color)
+    for original, final in board.legal_moves(color):
+        name = square_name(original) + square_name(final)
+        if is_promotion(board, original, final):
+            for piece, letter in PROMOTIONS:
+                board.make_move(original, final, piece)
+                counts[name + letter] = perft(board, enemy, depth - 1)
+                board.unmake_move()
+        else:
+            board.make_move(original, final)
+            counts[name] = perft(board, enemy, depth - 1)
+            board.unmake_move()
+    return counts
+
+
+def run_perft(depth: int, fen: str = START_FEN, show_divide: bool = False):
+    board, color = load_fen(fen)
+    start = time.perf_counter()
+    if show_divide:
+        counts = divide(board, color, depth)
+        for name in sorted(counts):
+            print('{}: {}'.format(name, counts[name]))
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(board, color, depth)
+    elapsed = time.perf_counter() - start
+    print('nodes {} time {:.3f}s nps {:.0f}'.format(nodes, elapsed, nodes / elapsed if elapsed else 0))
+    return nodes
@@ -0,0 +1,168 @@
+from core.tables import COORDS, STRAIGHT, DIAGONAL, KNIGHT_SQUARES, KING_SQUARES, PAWN_CAPTURE_SQUARES, RAY_SQUARES
+
+# Pieces are small ints: the kind in the low three bits, plus BLACK for black pieces, and 0 for an empty square.
+# Boards are flat 64-entry arrays of them indexed 8 * y + x, with y = 0 on black's back rank.
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+BLACK = 8
+
+# Castling right bits with the squares the king and rook start on, as (x, y)
+WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE = 1, 2, 4, 8
+CASTLING_SQUARES = ((WHITE_KING_SIDE, (4, 7), (7, 7)), (WHITE_QUEEN_SIDE, (4, 7), (0, 7)),
+                    (BLACK_KING_SIDE, (4, 0), (7, 0)), (BLACK_QUEEN_SIDE, (4, 0), (0, 0)))
+
+
+def slide(squares, position, directions, code) -> tuple:
+    # Walks the precomputed rays until the first piece, which is a capture when it belongs to the other side
+    moves = []
+    captures = []
+    sq = 8 * position[1] + position[0]
+    for d in directions:
+        for target in RAY_SQUARES[d][sq]:
+            other = squares[target]
+            if not other:
+                moves.append(COORDS[target])
+            else:
+                if (other ^ code) & BLACK:
+                    captures.append(COORDS[target])
+                break
+    return moves, captures
+
+
+def step(squares, targets, code) -> tuple:
+    moves = []
+    captures = []
+    for target in targets:
+        other = squares[target]
+        if not other:
+            moves.append(COORDS[target])
+        elif (other ^ code) & BLACK:
+            captures.append(COORDS[target])
+    return moves, captures
+
+
+def opposite_color(color):
+    if color == 'white':
+        return 'black'
+    return 'white'
+
+
+def color_bit(color: str) -> int:
+    return BLACK if color == 'black' else 0
+
+
+def piece_color(code: int) -> str:
+    return 'black' if code & BLACK else 'white'
+
+
+def pawn_direction(code: int) -> int:
+    return 1 if code & BLACK else -1
+
+
+# The classes name the kinds of piece (promotions are given as one of them) and generate their pseudo-legal moves.
+# They hold no state, and squares never contain instances of them.
+class Piece:
+    __slots__ = ()
+    kind = EMPTY
+
+    @classmethod
+    def code(cls, color: str) -> int:
+        return cls.kind | color_bit(color)
+
+    @staticmethod
+    def get_mvs_and_caps(squares, position: tuple, code: int, castling: int = 0) -> tuple:
+        raise NotImplementedError()
+
+
+class Pawn(Piece):
+    __slots__ = ()
+    kind = PAWN
+
+    @staticmethod
+    def get_mvs_and_caps(squares, position: tuple, code: int, castling: int = 0) -> tuple:
+        sq = 8 * position[1] + position[0]
+        forward = 8 if code & BLACK else -8
+        target = sq + forward
+        moves = []
+
+        if not 0 <= target < 64:
+            return [], []
+        if not squares[target]:
+            moves = [COORDS[target]]
+            # A pawn still on its starting rank has never moved
+            if position[1] == (1 if code & BLACK else 6) and not squares[target + forward]:
+                moves.append(COORDS[target + forward])
+        captures = []
+        for target in PAWN_CAPTURE_SQUARES[code >> 3][sq]:
+            other = squares[target]
+            if other and (other ^ code) & BLACK:
+                captures.append(COORDS[target])
+        return moves, captures
+
+
+class Knight(Piece):
+    __slots__ = ()
+    kind = KNIGHT
+
+    @staticmethod
+    def get_mvs_and_caps(squares, position: tuple, code: int, castling: int = 0) -> tuple:
+        return step(squares, KNIGHT_SQUARES[8 * position[1] + position[0]], code)
+
+
+class Bishop(Piece):
+    __slots__ = ()
+    kind = BISHOP
+
+    @staticmethod
+    def get_mvs_and_caps(squares, position: tuple, code: int, castling: int = 0) -> tuple:
+        return slide(squares, position, DIAGONAL, code)
+
+
+class Rook(Piece):
+    __slots__ = ()
+    kind = ROOK
+
+    @staticmethod
+    def get_mvs_and_caps(squares, position: tuple, code: int, castling: int = 0) -> tuple:
+        return slide(squares, position, STRAIGHT, code)
+
+
+class Queen(Piece):
+    __slots__ = ()
+    kind = QUEEN
+
+    @staticmethod
+    def get_mvs_and_caps(squares, position: tuple, code: int, castling: int = 0) -> tuple:
+        return slide(squares, position, STRAIGHT + DIAGONAL, code)
+
+
+class King(Piece):
+    __slots__ = ()
+    kind = KING
+
+    @staticmethod
+    def check_castle_mvs(squares, position, code, castling):
+        # The castling bits are cleared whenever the king or the rook moves or the rook is taken
+        castles = []
+        row = 8 * position[1]
+        king_side, queen_side = (BLACK_KING_SIDE, BLACK_QUEEN_SIDE) if code & BLACK else (WHITE_KING_SIDE,
+                                                                                           WHITE_QUEEN_SIDE)
+        if castling & king_side and not squares[row + 5] and not squares[row + 6]:
+            castles.append((position[0] + 2, position[1]))
+        if castling & queen_side and not squares[row + 3] and not squares[row + 2] and not squares[row + 1]:
+            castles.append((position[0] - 2, position[1]))
+        return castles
+
+    @staticmethod
+    def get_mvs_and_caps(squares, position: tuple, code: int, castling: int = 0) -> tuple:
+        moves, captures = step(squares, KING_SQUARES[8 * position[1] + position[0]], code)
+        if castling:
+            moves += King.check_castle_mvs(squares, position, code, castling)
+        return moves, captures
+
+
+KINDS = (None, Pawn, Knight, Bishop, Rook, Queen, King)
+
+
+def piece_type(code: int) -> type:
+    return KINDS[code & 7]
@@ -0,0 +1,188 @@
+import csv
+import json
+import multiprocessing
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Union
+
+from core.board import Board, START_FEN
+from core.notation import read_pgn, parse_san
+from core.uci import move_name
+
+# Records are read lazily and handed to the workers a chunk at a time, and no more than IN_FLIGHT chunks per worker
+# are ever waiting for a result, so memory stays the same however long the input is
+CHUNK_SIZE = 64
+IN_FLIGHT = 4
+# EPD operations: an opcode and its operands up to the semicolon, where a quoted operand may contain one
+OPERATION = re.compile(r'\s*([A-Za-z]\w*)((?:\s+(?:"[^"]*"|[^\s;"]+))*)\s*;')
+CSV_FIELDS = {
+    'pgn': ('game', 'white', 'black', 'result', 'plies', 'valid', 'error', 'captures', 'checks', 'castles',
+            'promotions', 'termination', 'final_fen'),
+    'epd': ('position', 'id', 'valid', 'error', 'fen', 'legal_moves', 'in_check', 'outcome', 'best_moves'),
+}
+
+
+def read_epd(lines):
+    # Yields (fen, operations) for each position in an iterable of EPD lines. The four position fields get the
+    # clocks from the hmvc and fmvn operations when there are any
+    for line in lines:
+        fields = line.split(None, 4)
+        if len(fields) < 4 or line.startswith('#'):
+            continue
+        operations = {}
+        for opcode, operands in OPERATION.findall(fields[4] if len(fields) > 4 else ''):
+            operations[opcode] = [operand.strip('"') for operand in re.findall(r'"[^"]*"|[^\s"]+', operands)]
+        clocks = [operations.get(opcode, [default])[0] for opcode, default in (('hmvc', '0'), ('fmvn', '1'))]
+        yield ' '.join(fields[:4] + clocks), operations
+
+
+def read_records(path: str):
+    # ('pgn', headers, sans, result) or ('epd', fen, operations) for everything in the file, going by its extension
+    with open(path, encoding='utf-8', errors='replace') as file:
+        if path.lower().endswith('.epd'):
+            for fen, operations in read_epd(file):
+                yield 'epd', fen, operations
+        else:
+            for headers, sans, result in read_pgn(file):
+                yield 'pgn', headers, sans, result
+
+
+def analyse_game(headers: dict, sans: list, result: str) -> dict:
+    # Replays the game, each SAN move matched against the legal moves of the position, counting what the moves did
+    row = {'white': headers.get('White', '?'), 'black': headers.get('Black', '?'), 'result': result, 'plies': 0,
+           'valid': True, 'error': '', 'captures': 0, 'checks': 0, 'castles': 0, 'promotions': 0, 'termination': '',
+           'final_fen': ''}
+    try:
+        board = Board.from_fen(headers.get('FEN', START_FEN))
+    except (ValueError, IndexError, KeyError) as error:
+        row.update(valid=False, error=str(error))
+        return row
+    for text in sans:
+        try:
+            move = parse_san(board, board.turn, text)
+        except ValueError as error:
+            row.update(valid=False, error='{} at ply {}'.format(error, row['plies'] + 1))
+            break
+        # Board.move only knows queen promotions and reports a checking capture as just a check, so the move is
+        # made directly and the check looked up after it
+        mv_type = board.make_move(*move)
+        row['plies'] += 1
+        row['captures'] += mv_type == 'capture'
+        row['castles'] += mv_type == 'castle'
+        row['promotions'] += move[2] is not None
+        row['checks'] += board.is_check(board.turn)
+    if row['valid']:
+        outcome = board.outcome()
+        row['termination'] = '' if outcome is None else outcome[1]
+    row['final_fen'] = board.fen()
+    return row
+
+
+def analyse_position(fen: str, operations: dict) -> dict:
+    row = {'id': ' '.join(operations.get('id', [])), 'valid': True, 'error': '', 'fen': fen, 'legal_moves': 0,
+           'in_check': False, 'outcome': '', 'best_moves': ''}
+    try:
+        board = Board.from_fen(fen)
+        moves = board.legal_moves(board.turn)
+        # Best and avoid moves are checked against the legal moves too, the best ones written in long algebraic form
+        row['best_moves'] = ' '.join(move_name(parse_san(board, board.turn, text, moves))
+                                     for text in operations.get('bm', []))
+        for text in operations.get('am', []):
+            parse_san(board, board.turn, text, moves)
+    except (ValueError, IndexError, KeyError) as error:
+        row.update(valid=False, error=str(error))
+        return row
+    row['legal_moves'] = len(moves)
+    row['in_check'] = board.is_check(board.turn)
+    outcome = board.outcome(bool(moves))
+    row['outcome'] = '' if outcome is None else outcome[1]
+    return row
+
+
+def analyse_chunk(records: list) -> list:
+    rows = []
+    for record in records:
+        if record[0] == 'pgn':
+            rows.append(analyse_game(*record[1:]))
+        else:
+            rows.append(analyse_position(*record[1:]))
+    return rows
+
+
+def chunks(records, size: int = CHUNK_SIZE):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyse(records, workers: int = 1, chunk_size: int = CHUNK_SIZE):
+    # Yields one row per record, in input order. Workers get whole chunks, and a new chunk is only read once the
+    # oldest one has come back
+    if workers <= 1:
+        for chunk in chunks(records, chunk_size):
+            yield from analyse_chunk(chunk)
+        return
+    pending = deque()
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for chunk in chunks(records, chunk_size):
+            if len(pending) >= workers * IN_FLIGHT:
+                yield from pending.popleft().result()
+            pending.append(pool.submit(analyse_chunk, chunk))
+        while pending:
+            yield from pending.popleft().result()
+
+
+class Sink:
+    # Writes rows as JSON lines, or as CSV when the path ends in .csv, flushing every chunk so a long run can be
+    # followed as it goes
+    def __init__(self, path: str, kind: str):
+        self.file = open(path, 'w', newline='')
+        self.writer = None
+        if path.lower().endswith('.csv'):
+            self.writer = csv.DictWriter(self.file, CSV_FIELDS[kind], extrasaction='ignore')
+            self.writer.writeheader()
+
+    def write(self, row: dict):
+        if self.writer is None:
+            self.file.write(json.dumps(row) + '\n')
+        else:
+            self.writer.writerow(row)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def run_pipeline(input_path: str, output_path: Union[None, str] = None, workers: int = 1,
+                 chunk_size: int = CHUNK_SIZE, quiet: bool = False) -> dict:
+    kind = 'epd' if input_path.lower().endswith('.epd') else 'pgn'
+    number = 'position' if kind == 'epd' else 'game'
+    sink = None if output_path is None else Sink(output_path, kind)
+    count = invalid = 0
+    start = time.perf_counter()
+    try:
+        for count, row in enumerate(analyse(read_records(input_path), workers, chunk_size), 1):
+            row = dict({number: count}, **row)
+            invalid += not row['valid']
+            if sink is not None:
+                sink.write(row)
+                if not count % chunk_size:
+                    sink.flush()
+            if not quiet and not row['valid']:
+                print('{} {}: {}'.format(number, count, row['error']))
+    finally:
+        if sink is not None:
+            sink.close()
+    elapsed = time.perf_counter() - start
+    if not quiet:
+        print('{} {}s in {:.2f}s, {:.1f} per second, {} invalid'.format(
+            count, number, elapsed, count / elapsed if elapsed else 0.0, invalid))
+    return {'records': count, 'invalid': invalid, 'seconds': elapsed}
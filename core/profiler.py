@@ -0,0 +1,150 @@
+import json
+import random
+import time
+from array import array
+from functools import wraps
+from typing import Union
+
+# Built-in instrumentation for the hot paths. Nothing is wrapped until enable() is called, so a disabled profiler
+# costs nothing on the instrumented functions; the few explicit record() sites test the enabled flag first.
+enabled = False
+timers = {}
+# Timings kept per name for the percentiles, a uniform sample once there are more calls than this
+SAMPLES = 4096
+# (class, attribute, original function) for every method wrapped by instrument, so disable() can put them back
+_patched = []
+_started = None
+
+
+class Timer:
+    __slots__ = ('count', 'total', 'units', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.units = 0
+        self.samples = array('d')
+
+    def add(self, seconds: float, units: int = 0):
+        self.count += 1
+        self.total += seconds
+        self.units += units
+        if len(self.samples) < SAMPLES:
+            self.samples.append(seconds)
+        else:
+            # Reservoir sampling keeps every call equally likely to be in the sample
+            index = random.randrange(self.count)
+            if index < SAMPLES:
+                self.samples[index] = seconds
+
+    def reset(self):
+        self.__init__()
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        result = {'calls': self.count, 'total_ms': round(self.total * 1e3, 3),
+                  'mean_us': round(self.total / self.count * 1e6, 2) if self.count else 0.0}
+        for name, fraction in (('p50_us', 0.5), ('p90_us', 0.9), ('p99_us', 0.99)):
+            result[name] = round(samples[min(int(fraction * len(samples)), len(samples) - 1)] * 1e6, 2) \
+                if samples else 0.0
+        result['max_us'] = round(samples[-1] * 1e6, 2) if samples else 0.0
+        if self.units:
+            result['nodes'] = self.units
+            result['nps'] = int(self.units / self.total) if self.total else 0
+        return result
+
+
+def timer(name: str) -> Timer:
+    if name not in timers:
+        timers[name] = Timer()
+    return timers[name]
+
+
+def record(name: str, seconds: float, units: int = 0):
+    timer(name).add(seconds, units)
+
+
+def instrument(owner, attribute: str, name: Union[None, str] = None, units: Union[None, str] = None):
+    # Replaces owner.attribute with a wrapper that times every call. With units, the attribute of that name on the
+    # instance is added up after each call, such as the node count a search leaves behind
+    if any(patched[0] is owner and patched[1] == attribute for patched in _patched):
+        return
+    original = owner.__dict__[attribute]
+    entry = timer(name or '{}.{}'.format(owner.__name__, attribute))
+    clock = time.perf_counter
+
+    if units is None:
+        @wraps(original)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                entry.add(clock() - start)
+    else:
+        @wraps(original)
+        def wrapper(self, *args, **kwargs):
+            start = clock()
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                entry.add(clock() - start, getattr(self, units))
+
+    setattr(owner, attribute, wrapper)
+    _patched.append((owner, attribute, original))
+
+
+def enable():
+    global enabled, _started
+    from core.board import Board
+    from core.engine import Engine
+    from core.parallel import ParallelEngine
+    for attribute in ('get_move_options', 'copy', 'is_check', 'move'):
+        instrument(Board, attribute)
+    instrument(Engine, 'search', units='nodes')
+    # The root moves ParallelEngine's workers search
+    instrument(Engine, 'score_move', units='nodes')
+    instrument(ParallelEngine, 'search', units='nodes')
+    enabled = True
+    if _started is None:
+        _started = time.perf_counter()
+
+
+def disable():
+    global enabled
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+    enabled = False
+
+
+def collect() -> dict:
+    # The raw counters gathered since the last collect, which start again from zero. Worker processes send these
+    # back so merge() can add them to the parent's
+    snapshot = {name: (entry.count, entry.total, entry.units, entry.samples.tolist())
+                for name, entry in timers.items() if entry.count}
+    for entry in timers.values():
+        entry.reset()
+    return snapshot
+
+
+def merge(snapshot: dict):
+    for name, (count, total, units, samples) in snapshot.items():
+        entry = timer(name)
+        entry.count += count
+        entry.total += total
+        entry.units += units
+        entry.samples.extend(samples)
+        if len(entry.samples) > SAMPLES:
+            entry.samples = array('d', random.sample(entry.samples.tolist(), SAMPLES))
+
+
+def report() -> dict:
+    return {name: entry.summary() for name, entry in sorted(timers.items()) if entry.count}
+
+
+def dump(path: str):
+    with open(path, 'w') as file:
+        json.dump({'seconds': round(time.perf_counter() - _started, 3) if _started is not None else 0.0,
+                   'timers': report()}, file, indent=2)
+        file.write('\n')
@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import random
+import time
+from typing import Union
+
+from core import profiler
+from core.bitbase import Bitbases, DRAW, WIN
+from core.board import Board
+from core.book import OpeningBook, BookChooser
+from core.engine import Engine, generate_moves, random_move
+from core.notation import san, pgn
+from core.pieces import opposite_color
+
+CHOOSERS = ('random', 'engine')
+
+# Per-process state of the self-play workers, set up once by _init_worker
+_choosers = None
+_settings = None
+
+
+def make_chooser(name: str, movetime: float = 1.0, depth: int = 64, bitbases: Union[None, Bitbases] = None):
+    if name == 'random':
+        return random_move
+    if name == 'engine':
+        return Engine(movetime, depth, bitbases=bitbases).choose_move
+    raise ValueError('Unknown move chooser: {}'.format(name))
+
+
+def _init_worker(white: str, black: str, movetime: float, depth: int, max_plies: int, seed: Union[None, int],
+                 book_path: Union[None, str] = None, bitbase_dir: Union[None, str] = None, profile: bool = False):
+    global _choosers, _settings
+    if profile and not profiler.enabled:
+        profiler.enable()
+    bitbases = None if bitbase_dir is None else Bitbases(bitbase_dir)
+    _choosers = {'white': make_chooser(white, movetime, depth, bitbases),
+                 'black': make_chooser(black, movetime, depth, bitbases)}
+    if book_path is not None:
+        # Every worker maps the same file, so the pages of the book are shared between them
+        book = OpeningBook(book_path)
+        _choosers = {color: BookChooser(book, chooser) for color, chooser in _choosers.items()}
+    _settings = {'white': white, 'black': black, 'max_plies': max_plies, 'seed': seed, 'bitbases': bitbases}
+
+
+def play_game(choosers: dict, max_plies: int, bitbases: Union[None, Bitbases] = None) -> tuple:
+    board = Board()
+    color = 'white'
+    sans = []
+    seconds = {'white': 0.0, 'black': 0.0}
+    result, termination = '*', 'ply limit'
+    while True:
+        moves = generate_moves(board, color)
+        in_check = board.is_check(color)
+        if sans and in_check:
+            sans[-1] += '+' if moves else '#'
+        outcome = board.outcome(bool(moves))
+        if outcome is not None:
+            result, termination = outcome
+            break
+        if bitbases is not None:
+            # Endings the tables know are adjudicated rather than played out
+            known = bitbases.probe(board)
+            if known is not None:
+                if known == DRAW:
+                    result = '1/2-1/2'
+                else:
+                    result = '1-0' if (known == WIN) == (color == 'white') else '0-1'
+                termination = 'bitbase'
+                break
+        if len(sans) >= max_plies:
+            break
+
+        start = time.perf_counter()
+        move = choosers[color](board, color)
+        seconds[color] += time.perf_counter() - start
+        # Check marks are added once the opponent's moves are known, so san() need not generate them itself
+        sans.append(san(board, color, move, moves, suffix=False))
+        board.make_move(*move)
+        color = opposite_color(color)
+    return sans, result, termination, seconds
+
+
+def _play(index: int) -> dict:
+    if _settings['seed'] is not None:
+        random.seed(_settings['seed'] + index)
+    start = time.perf_counter()
+    sans, result, termination, seconds = play_game(_choosers, _settings['max_plies'], _settings['bitbases'])
+    headers = {'Event': 'Self-play', 'Site': '?', 'Date': time.strftime('%Y.%m.%d'), 'Round': index + 1,
+               'White': _settings['white'], 'Black': _settings['black'], 'Result': result,
+               'Termination': termination, 'PlyCount': len(sans)}
+    return {'game': index + 1, 'white': _settings['white'], 'black': _settings['black'], 'result': result,
+            'termination': termination, 'plies': len(sans), 'seconds': round(time.perf_counter() - start, 4),
+            'white_seconds': round(seconds['white'], 4), 'black_seconds': round(seconds['black'], 4),
+            'pgn': pgn(headers, sans, result), 'profile': profiler.collect() if profiler.enabled else None}
+
+
+def run_selfplay(games: int, workers: int = 1, white: str = 'random', black: str = 'random', max_plies: int = 400,
+                 movetime: float = 1.0, depth: int = 64, pgn_path: Union[None, str] = None,
+                 jsonl_path: Union[None, str] = None, seed: Union[None, int] = None, quiet: bool = False,
+                 book_path: Union[None, str] = None, bitbase_dir: Union[None, str] = None) -> dict:
+    settings = (white, black, movetime, depth, max_plies, seed, book_path, bitbase_dir, profiler.enabled)
+    pgn_file = open(pgn_path, 'w') if pgn_path else None
+    jsonl_file = open(jsonl_path, 'w') if jsonl_path else None
+    results = {'1-0': 0, '0-1': 0, '1/2-1/2': 0, '*': 0}
+    pool = None
+    start = time.perf_counter()
+    try:
+        if workers > 1:
+            # Each finished game is written as soon as it arrives, in completion order
+            pool = multiprocessing.get_context('spawn').Pool(workers, _init_worker, settings)
+            finished = pool.imap_unordered(_play, range(games))
+        else:
+            _init_worker(*settings)
+            finished = map(_play, range(games))
+        for count, game in enumerate(finished, 1):
+            results[game['result']] += 1
+            counters = game.pop('profile')
+            if counters:
+                profiler.merge(counters)
+            if pgn_file is not None:
+                pgn_file.write(game.pop('pgn'))
+                pgn_file.flush()
+            else:
+                game.pop('pgn')
+            if jsonl_file is not None:
+                jsonl_file.write(json.dumps(game) + '\n')
+                jsonl_file.flush()
+            if not quiet:
+                print('game {} {} in {} plies ({}), {:.2f}s'.format(
+                    game['game'], game['result'], game['plies'], game['termination'], game['seconds']))
+    finally:
+        if pool is not None:
+            pool.terminate()
+        for file in (pgn_file, jsonl_file):
+            if file is not None:
+                file.close()
+    elapsed = time.perf_counter() - start
+
+    if not quiet:
+        print('{} games in {:.2f}s, {:.2f} games per second: +{} ={} -{} *{}'.format(
+            games, elapsed, games / elapsed, results['1-0'], results['1/2-1/2'], results['0-1'], results['*']))
+    return {'games': games, 'seconds': elapsed, 'results': results}
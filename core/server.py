@@ -0,0 +1,242 @@
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Union
+
+from core.board import Board, START_FEN
+from core.engine import Engine, generate_moves
+from core.profiler import Timer
+from core.uci import move_name
+
+# A headless game server. Clients send one JSON object per line and get one back per request, carrying the request's
+# id so replies to engine moves, which may take a while, can overtake the quick ones:
+#   {"id": 1, "op": "new", "fen": "..."}               -> {"id": 1, "ok": true, "game": 7, "fen": ..., "turn": ...}
+#   {"id": 2, "op": "move", "game": 7, "move": "e2e4"} -> {"id": 2, "ok": true, "type": "move", "fen": ..., ...}
+#   {"id": 3, "op": "legal", "game": 7}                -> {"id": 3, "ok": true, "moves": ["a7a6", ...]}
+#   {"id": 4, "op": "engine", "game": 7, "movetime": 0.1, "play": true} -> {"id": 4, "ok": true, "move": ..., ...}
+# as well as "state", "close" and "stats". Games belong to the server rather than to a connection, so two bots on
+# separate connections can share one.
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+# Longest line a client may send
+LINE_LIMIT = 1 << 16
+MAX_MOVETIME = 10.0
+
+# The engine of each pool process, made on its first job
+_engine = None
+
+
+def _engine_move(packed: bytes, history: tuple, movetime: float, depth: int) -> Union[None, str]:
+    global _engine
+    if _engine is None:
+        _engine = Engine()
+    # The hashes of the earlier positions come along, so the search steers clear of repetitions
+    board = Board.unpack(packed, history)
+    move, _, _ = _engine.search(board, board.turn, movetime, depth)
+    return None if move is None else move_name(move)
+
+
+class Game:
+    __slots__ = ('board', 'moves', 'busy')
+
+    def __init__(self, fen: str = START_FEN):
+        self.board = Board.from_fen(fen)
+        if len(self.board.kings) < 2:
+            raise ValueError('The position needs a king of each colour')
+        self.moves = []
+        # Set while the engine thinks about this game, when moves by hand are refused
+        self.busy = False
+
+    def state(self) -> dict:
+        outcome = self.board.outcome()
+        return {'fen': self.board.fen(), 'turn': self.board.turn, 'plies': len(self.moves),
+                'result': None if outcome is None else outcome[0],
+                'termination': None if outcome is None else outcome[1]}
+
+    def play(self, text: str) -> str:
+        board = self.board
+        moves = generate_moves(board, board.turn)
+        if board.outcome(bool(moves)) is not None:
+            raise ValueError('The game is over')
+        move = next((move for move in moves if move_name(move) == text), None)
+        if move is None:
+            raise ValueError('Illegal move: {}'.format(text))
+        mv_type = self.board.make_move(*move)
+        self.moves.append(text)
+        return 'check' if self.board.is_check(self.board.turn) else mv_type
+
+
+class GameServer:
+    def __init__(self, workers: int = 1):
+        self.games = {}
+        self.ids = itertools.count(1)
+        self.workers = workers
+        self.pool = None
+        self.connections = 0
+        self.requests = 0
+        # Time taken to check and make a move, from the line arriving to the reply being queued
+        self.validation = Timer()
+        self.engine_time = Timer()
+
+    def executor(self) -> ProcessPoolExecutor:
+        # Started on the first engine request, so a server that only checks moves never forks
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    async def serve(self, address: str = DEFAULT_ADDRESS):
+        # address is HOST:PORT, or a filesystem path for a Unix socket
+        if ':' in address and not address.startswith(('/', '.')):
+            host, _, port = address.rpartition(':')
+            server = await asyncio.start_server(self.client, host, int(port), limit=LINE_LIMIT, backlog=4096)
+        else:
+            if os.path.exists(address):
+                os.remove(address)
+            server = await asyncio.start_unix_server(self.client, address, limit=LINE_LIMIT, backlog=4096)
+        # SIGTERM ends the server like Ctrl-C does, so run_server still shuts the engine pool down rather than leaving
+        # its processes behind
+        stopped = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+        except NotImplementedError:
+            pass
+        # Printed once the socket is listening, which is what scripts starting the server wait for
+        print('serving games on {}'.format(address), flush=True)
+        async with server:
+            await stopped.wait()
+
+    async def client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                start = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('Expected a JSON object')
+                except ValueError as error:
+                    self.send(writer, {'id': None, 'ok': False, 'error': 'bad request: {}'.format(error)})
+                    continue
+                self.requests += 1
+                if request.get('op') == 'engine':
+                    # Searches run in the pool while this connection goes on reading
+                    task = asyncio.ensure_future(self.engine(writer, request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    self.send(writer, self.handle(request))
+                    if request.get('op') == 'move':
+                        self.validation.add(time.perf_counter() - start)
+                await writer.drain()
+        finally:
+            self.connections -= 1
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    @staticmethod
+    def send(writer: asyncio.StreamWriter, reply: dict):
+        if not writer.is_closing():
+            writer.write(json.dumps(reply, separators=(',', ':')).encode() + b'\n')
+
+    def game(self, request: dict) -> Game:
+        game = self.games.get(request.get('game'))
+        if game is None:
+            raise KeyError('no game {}'.format(request.get('game')))
+        return game
+
+    def handle(self, request: dict) -> dict:
+        reply = {'id': request.get('id'), 'ok': True}
+        op = request.get('op')
+        try:
+            if op == 'new':
+                # Registered only once its state is known, so a position the board cannot handle leaves nothing behind
+                game = Game(request.get('fen') or START_FEN)
+                reply.update(game.state())
+                number = next(self.ids)
+                self.games[number] = game
+                reply['game'] = number
+            elif op == 'move':
+                game = self.game(request)
+                if game.busy:
+                    raise ValueError('The engine is thinking')
+                reply.update(type=game.play(str(request.get('move'))), **game.state())
+            elif op == 'legal':
+                board = self.game(request).board
+                reply['moves'] = [move_name(move) for move in generate_moves(board, board.turn)]
+            elif op == 'state':
+                reply.update(self.game(request).state())
+            elif op == 'close':
+                self.game(request)
+                del self.games[request['game']]
+            elif op == 'stats':
+                reply.update(self.stats())
+            else:
+                raise ValueError('unknown op {}'.format(op))
+        except (ValueError, KeyError, IndexError, TypeError) as error:
+            reply = {'id': request.get('id'), 'ok': False, 'error': str(error).strip("'")}
+        return reply
+
+    async def engine(self, writer: asyncio.StreamWriter, request: dict):
+        reply = {'id': request.get('id'), 'ok': True}
+        game = None
+        try:
+            searching = self.game(request)
+            if searching.busy:
+                raise ValueError('The engine is already thinking')
+            movetime = min(float(request.get('movetime', 1.0)), MAX_MOVETIME)
+            depth = int(request.get('depth', 64))
+            game = searching
+            game.busy = True
+            start = time.perf_counter()
+            try:
+                move = await asyncio.get_running_loop().run_in_executor(
+                    self.executor(), _engine_move, game.board.pack(), tuple(game.board.history()), movetime, depth)
+            except Exception as error:
+                # A failure in the worker still gets its reply, and a pool that lost a process is started afresh
+                if isinstance(error, BrokenProcessPool) and self.pool is not None:
+                    self.pool.shutdown(wait=False)
+                    self.pool = None
+                raise ValueError('engine failed: {}'.format(str(error) or type(error).__name__))
+            self.engine_time.add(time.perf_counter() - start)
+            reply['move'] = move
+            if move is not None and request.get('play'):
+                reply['type'] = game.play(move)
+            reply.update(game.state())
+        except (ValueError, KeyError, TypeError) as error:
+            reply = {'id': request.get('id'), 'ok': False, 'error': str(error).strip("'")}
+        finally:
+            if game is not None:
+                game.busy = False
+        self.send(writer, reply)
+
+    def stats(self) -> dict:
+        return {'games': len(self.games), 'connections': self.connections, 'requests': self.requests,
+                'move_validation': self.validation.summary(), 'engine': self.engine_time.summary()}
+
+
+def run_server(address: str = DEFAULT_ADDRESS, workers: int = 1):
+    server = GameServer(workers)
+    try:
+        asyncio.run(server.serve(address))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
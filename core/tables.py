@@ -0,0 +1,136 @@
+import marshal
+import os
+import sys
+import zlib
+
+# Move tables for every square, built once and kept in a marshal file next to the bytecode so later imports only
+# read them back. Squares are 8 * y + x as in Board, and side 0 is white, whose pawns move towards lower squares.
+# The *_SQUARES tables list target squares in order and the other tables hold the same sets as 64-bit masks.
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__')
+CACHE_PREFIX = 'tables.{}-'.format(sys.implementation.cache_tag)
+
+# N, S, E, W, NE, NW, SE, SW. On positive directions the nearest blocker is the lowest set bit of the ray.
+DIRECTIONS = ((0, -1), (0, 1), (1, 0), (-1, 0), (1, -1), (-1, -1), (1, 1), (-1, 1))
+POSITIVE = tuple(dx + 8 * dy > 0 for dx, dy in DIRECTIONS)
+STRAIGHT = (0, 1, 2, 3)
+DIAGONAL = (4, 5, 6, 7)
+
+KNIGHT_OFFSETS = ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+KING_OFFSETS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+PAWN_CAPTURE_OFFSETS = (((-1, -1), (1, -1)), ((-1, 1), (1, 1)))
+
+COORDS = tuple((sq & 7, sq >> 3) for sq in range(64))
+
+
+def _steps(sq, offsets):
+    x, y = COORDS[sq]
+    return tuple(8 * (y + dy) + x + dx for dx, dy in offsets if 0 <= x + dx < 8 and 0 <= y + dy < 8)
+
+
+def _ray(sq, direction):
+    dx, dy = DIRECTIONS[direction]
+    x, y = COORDS[sq]
+    squares = []
+    x, y = x + dx, y + dy
+    while 0 <= x < 8 and 0 <= y < 8:
+        squares.append(8 * y + x)
+        x, y = x + dx, y + dy
+    return tuple(squares)
+
+
+def _mask(squares):
+    mask = 0
+    for sq in squares:
+        mask |= 1 << sq
+    return mask
+
+
+def build() -> dict:
+    tables = {
+        'KNIGHT_SQUARES': tuple(_steps(sq, KNIGHT_OFFSETS) for sq in range(64)),
+        'KING_SQUARES': tuple(_steps(sq, KING_OFFSETS) for sq in range(64)),
+        'PAWN_CAPTURE_SQUARES': tuple(tuple(_steps(sq, offsets) for sq in range(64))
+                                      for offsets in PAWN_CAPTURE_OFFSETS),
+        'RAY_SQUARES': tuple(tuple(_ray(sq, d) for sq in range(64)) for d in range(8)),
+    }
+    tables['KNIGHT_ATTACKS'] = tuple(_mask(squares) for squares in tables['KNIGHT_SQUARES'])
+    tables['KING_ATTACKS'] = tuple(_mask(squares) for squares in tables['KING_SQUARES'])
+    tables['PAWN_ATTACKS'] = tuple(tuple(_mask(squares) for squares in side)
+                                   for side in tables['PAWN_CAPTURE_SQUARES'])
+    rays = tuple(tuple(_mask(squares) for squares in direction) for direction in tables['RAY_SQUARES'])
+    tables['RAYS'] = rays
+    tables['ROOK_RAYS'] = tuple(rays[0][sq] | rays[1][sq] | rays[2][sq] | rays[3][sq] for sq in range(64))
+    tables['BISHOP_RAYS'] = tuple(rays[4][sq] | rays[5][sq] | rays[6][sq] | rays[7][sq] for sq in range(64))
+
+    # Indexed 64 * a + b: the squares strictly between a and b, and the whole line through both, when they share one
+    between = [0] * 4096
+    line = [0] * 4096
+    for a in range(64):
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            full = rays[d][a] | rays[DIRECTIONS.index((-dx, -dy))][a] | (1 << a)
+            gap = 0
+            for b in tables['RAY_SQUARES'][d][a]:
+                between[64 * a + b] = gap
+                line[64 * a + b] = full
+                gap |= 1 << b
+    tables['BETWEEN'] = tuple(between)
+    tables['LINE'] = tuple(line)
+    return tables
+
+
+def cache_file() -> None | str:
+    # Named after the interpreter and a checksum of this source, so tables built by an older version of the module or
+    # marshalled by another Python are never read back
+    try:
+        with open(__file__, 'rb') as file:
+            checksum = zlib.crc32(file.read())
+    except OSError:
+        return None
+    return os.path.join(CACHE_DIR, '{}{:08x}.marshal'.format(CACHE_PREFIX, checksum))
+
+
+def load(path: None | str = None) -> dict:
+    path = cache_file() if path is None else path
+    if path is None:
+        return build()
+    try:
+        with open(path, 'rb') as file:
+            return marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    tables = build()
+    # Written under a temporary name first so a concurrent import never reads half a file. A directory that cannot
+    # be written to just means building the tables on every import
+    temporary = '{}.{}'.format(path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, 'wb') as file:
+            marshal.dump(tables, file)
+        os.replace(temporary, path)
+        # Files left by earlier versions of this module are of no more use to this interpreter
+        directory, name = os.path.split(path)
+        for other in os.listdir(directory):
+            if other.startswith(CACHE_PREFIX) and other.endswith('.marshal') and other != name:
+                os.remove(os.path.join(directory, other))
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+    return tables
+
+
+_tables = load()
+KNIGHT_SQUARES = _tables['KNIGHT_SQUARES']
+KING_SQUARES = _tables['KING_SQUARES']
+PAWN_CAPTURE_SQUARES = _tables['PAWN_CAPTURE_SQUARES']
+RAY_SQUARES = _tables['RAY_SQUARES']
+KNIGHT_ATTACKS = _tables['KNIGHT_ATTACKS']
+KING_ATTACKS = _tables['KING_ATTACKS']
+PAWN_ATTACKS = _tables['PAWN_ATTACKS']
+RAYS = _tables['RAYS']
+ROOK_RAYS = _tables['ROOK_RAYS']
+BISHOP_RAYS = _tables['BISHOP_RAYS']
+BETWEEN = _tables['BETWEEN']
+LINE = _tables['LINE']
+del _tables
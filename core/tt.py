@@ -0,0 +1,56 @@
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Each slot is two 64-bit words: the full key and the packed entry
+#   bits 0-15 move, 16-47 score + SCORE_OFFSET, 48-55 depth, 56-57 bound, 58-63 search generation
+ENTRY_BYTES = 16
+SCORE_OFFSET = 1 << 31
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: float = 16):
+        self.size = 0
+        self.mask = 0
+        self.keys = None
+        self.entries = None
+        self.generation = 0
+        self.resize(size_mb)
+
+    def resize(self, size_mb: float):
+        # Largest power of two number of slots that fits the budget, so the index is a single mask
+        slots = max(1, int(size_mb * (1 << 20)) // ENTRY_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self.mask = self.size - 1
+        # array drags in collections.abc, which would cost every import of core.engine more than the rest of it
+        from array import array
+        self.keys = array('Q', bytes(8 * self.size))
+        self.entries = array('Q', bytes(8 * self.size))
+        self.generation = 0
+
+    def clear(self):
+        self.resize(self.size * ENTRY_BYTES / (1 << 20))
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 63
+
+    def probe(self, key: int) -> None | tuple[int, int, int, int]:
+        index = key & self.mask
+        if self.keys[index] != key:
+            return None
+        entry = self.entries[index]
+        return (entry >> 48) & 0xFF, (entry >> 56) & 3, ((entry >> 16) & 0xFFFFFFFF) - SCORE_OFFSET, entry & 0xFFFF
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: int):
+        index = key & self.mask
+        old = self.entries[index]
+        # Depth-preferred: keep a deeper result from the current search unless it is for the same position
+        if self.keys[index] != key and old and old >> 58 == self.generation and (old >> 48) & 0xFF > depth:
+            return
+        if not move and self.keys[index] == key:
+            move = old & 0xFFFF
+        self.keys[index] = key
+        self.entries[index] = move | ((score + SCORE_OFFSET) << 16) | (min(depth, 255) << 48) | (bound << 56) | \
+            (self.generation << 58)
+
+    def usage(self) -> float:
+        sample = min(self.size, 1000)
+        return sum(1 for i in range(sample) if self.entries[i] and self.entries[i] >> 58 == self.generation) / sample
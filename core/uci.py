@@ -0,0 +1,269 @@
+import asyncio
+import math
+import sys
+import threading
+
+from core.board import Board, START_FEN
+from core.engine import Engine, MATE, generate_moves, principal_variation
+from core.parallel import ParallelEngine
+from core.perft import square_name, PROMOTIONS
+
+NAME = 'Chess'
+AUTHOR = 'andresafira'
+# Settings of `go` that take a number, in milliseconds for the clock ones
+GO_NUMBERS = ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'movetime', 'depth', 'nodes', 'mate')
+# Kept back from the clock for the engine's own overhead and the pipe
+MOVE_OVERHEAD = 0.05
+
+
+def move_name(move: tuple) -> str:
+    original, final, promotion = move
+    letter = next((letter for piece, letter in PROMOTIONS if piece is promotion), '')
+    return square_name(original) + square_name(final) + letter
+
+
+def parse_move(board, text: str) -> tuple:
+    # Long algebraic notation as UCI writes it, castling included as the king's two-square move
+    for move in generate_moves(board, board.turn):
+        if move_name(move) == text:
+            return move
+    raise ValueError('Illegal move: {}'.format(text))
+
+
+def score_text(score: int) -> str:
+    if abs(score) >= MATE - 1000:
+        plies = MATE - abs(score)
+        return 'mate {}'.format((plies + 1) // 2 if score > 0 else -(plies // 2))
+    return 'cp {}'.format(score)
+
+
+def time_for_move(options: dict, color: str) -> float:
+    # Seconds to spend when the search is not told to run until stopped
+    if 'movetime' in options:
+        return max(options['movetime'] / 1000 - MOVE_OVERHEAD, 0.01)
+    clock = options.get('wtime' if color == 'white' else 'btime')
+    if clock is None:
+        return math.inf
+    remaining = clock / 1000
+    increment = options.get('winc' if color == 'white' else 'binc', 0) / 1000
+    share = remaining / options.get('movestogo', 30) + increment * 0.75
+    return max(min(share, remaining / 2 - MOVE_OVERHEAD), 0.01)
+
+
+class UCI:
+    # The engine behind the UCI protocol. Commands are read on the event loop while the search runs in an executor
+    # thread, so stop and ponderhit reach a running search at once, and info lines are handed back to the loop to be
+    # written between the replies to other commands.
+    def __init__(self, output=sys.stdout, bitbases=None):
+        self.output = output
+        self.bitbases = bitbases
+        self.hash_mb = 16
+        self.threads = 1
+        self.engine = None
+        self.board = Board()
+        self.loop = None
+        self.task = None
+        self.stop = threading.Event()
+        self.released = None
+        self.ponder_limit = None
+
+    def send(self, line: str):
+        self.output.write(line + '\n')
+        self.output.flush()
+
+    def new_engine(self):
+        self.close()
+        if self.threads > 1:
+            self.engine = ParallelEngine(self.threads, hash_mb=self.hash_mb, bitbases=self.bitbases)
+        else:
+            self.engine = Engine(hash_mb=self.hash_mb, bitbases=self.bitbases)
+
+    def close(self):
+        if isinstance(self.engine, ParallelEngine):
+            self.engine.close()
+        self.engine = None
+
+    async def run(self, reader):
+        # reader is a coroutine function returning the next line, or '' once the input is closed
+        self.loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader()
+                if not line:
+                    # Input closed after a timed go still gets its bestmove
+                    await self.finish_search(interrupt=False)
+                    break
+                if not await self.handle(line.strip()):
+                    break
+        finally:
+            await self.finish_search()
+            self.close()
+
+    async def handle(self, line: str) -> bool:
+        # False once the engine should quit
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send('id name {}'.format(NAME))
+            self.send('id author {}'.format(AUTHOR))
+            self.send('option name Hash type spin default 16 min 1 max 4096')
+            self.send('option name Threads type spin default 1 min 1 max 64')
+            self.send('option name Ponder type check default false')
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'quit':
+            return False
+        elif command == 'stop':
+            await self.finish_search()
+        elif command == 'ponderhit':
+            self.ponderhit()
+        elif command == 'ucinewgame':
+            await self.finish_search(interrupt=False)
+            self.new_engine()
+        elif command == 'setoption':
+            await self.finish_search(interrupt=False)
+            self.set_option(arguments)
+        elif command == 'position':
+            await self.finish_search(interrupt=False)
+            self.set_position(arguments)
+        elif command == 'go':
+            await self.finish_search(interrupt=False)
+            self.go(arguments)
+        elif command not in ('debug', 'register'):
+            self.send('info string unknown command {}'.format(command))
+        return True
+
+    def set_option(self, arguments: list):
+        text = ' '.join(arguments)
+        name, _, value = text.partition(' value ')
+        name = name.replace('name', '', 1).strip().lower()
+        try:
+            if name == 'hash':
+                self.hash_mb = max(1, int(value))
+            elif name == 'threads':
+                self.threads = max(1, int(value))
+            elif name != 'ponder':
+                self.send('info string unknown option {}'.format(name))
+                return
+        except ValueError:
+            self.send('info string bad value {} for {}'.format(value, name))
+            return
+        if name != 'ponder' and self.engine is not None:
+            self.new_engine()
+
+    def set_position(self, arguments: list):
+        if 'moves' in arguments:
+            index = arguments.index('moves')
+            arguments, moves = arguments[:index], arguments[index + 1:]
+        else:
+            moves = []
+        try:
+            if arguments[:1] == ['startpos']:
+                board = Board.from_fen(START_FEN)
+            elif arguments[:1] == ['fen']:
+                board = Board.from_fen(' '.join(arguments[1:]))
+            else:
+                raise ValueError('Expected startpos or fen')
+            for text in moves:
+                board.make_move(*parse_move(board, text))
+        except (ValueError, IndexError, KeyError) as error:
+            self.send('info string bad position: {}'.format(error))
+            return
+        self.board = board
+
+    def go(self, arguments: list):
+        options = {}
+        for index, token in enumerate(arguments):
+            if token in GO_NUMBERS and index + 1 < len(arguments):
+                try:
+                    options[token] = int(arguments[index + 1])
+                except ValueError:
+                    pass
+            elif token in ('infinite', 'ponder'):
+                options[token] = True
+        if self.engine is None:
+            self.new_engine()
+
+        color = self.board.turn
+        limit = time_for_move(options, color)
+        depth = options.get('depth', 64)
+        if options.get('mate', 0) > 0:
+            # A mate in N moves is 2N - 1 plies, and the search sees the mate one ply later, when the side mated has no
+            # move. It stops at the first mate score found anyway
+            depth = min(depth, 2 * options['mate'])
+        # A bare go, go infinite and go ponder search until told otherwise, the last two holding bestmove back too
+        held = 'infinite' in options or 'ponder' in options
+        self.ponder_limit = limit if 'ponder' in options else None
+        self.stop = threading.Event()
+        self.released = asyncio.Event()
+        if not held:
+            self.released.set()
+        self.task = asyncio.ensure_future(self.search(self.board.copy(), color, math.inf if held else limit, depth,
+                                                      options.get('nodes')))
+
+    def ponderhit(self):
+        # The predicted move was played, so the search goes on with the time it would have had for it
+        if self.task is None or self.ponder_limit is None:
+            return
+        if not math.isinf(self.ponder_limit):
+            self.engine.set_deadline(self.ponder_limit)
+        self.ponder_limit = None
+        self.released.set()
+
+    async def finish_search(self, interrupt: bool = True):
+        # Commands other than stop and quit let a timed search run out, but end one that would wait for stop
+        if self.task is None:
+            return
+        if interrupt or not self.released.is_set():
+            self.stop.set()
+            self.released.set()
+        await self.task
+
+    async def search(self, board, color: str, time_limit: float, depth: int, nodes: None | int = None):
+        engine = self.engine
+        stop = self.stop
+        move, _, _ = await self.loop.run_in_executor(
+            None, lambda: engine.search(board, color, time_limit, depth, stop, self.report(engine, board), nodes))
+        await self.released.wait()
+        self.task = None
+        if move is None:
+            self.send('bestmove 0000')
+            return
+        line = principal_variation(engine, board, move, 2)
+        if len(line) > 1:
+            self.send('bestmove {} ponder {}'.format(move_name(line[0]), move_name(line[1])))
+        else:
+            self.send('bestmove {}'.format(move_name(move)))
+
+    def report(self, engine, board):
+        # Runs on the search thread between iterations, so the table is read while nothing writes to it
+        def info(depth: int, score: int, nodes: int, seconds: float, move: tuple):
+            pv = ' '.join(move_name(move) for move in principal_variation(engine, board, move, depth))
+            self.loop.call_soon_threadsafe(self.send, 'info depth {} score {} nodes {} nps {} time {} pv {}'.format(
+                depth, score_text(score), nodes, int(nodes / seconds) if seconds > 0 else 0, int(seconds * 1000), pv))
+        return info
+
+
+async def stdin_reader():
+    # A reader coroutine for UCI.run on the process's standard input. Pipes are read by the event loop itself; where
+    # the loop cannot watch stdin, each line is read in an executor thread instead
+    loop = asyncio.get_running_loop()
+    try:
+        stream = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stream), sys.stdin)
+
+        async def read() -> str:
+            return (await stream.readline()).decode(errors='replace')
+    except (NotImplementedError, ValueError, OSError):
+        async def read() -> str:
+            return await loop.run_in_executor(None, sys.stdin.readline)
+    return read
+
+
+def run_uci(bitbases=None):
+    async def main():
+        await UCI(bitbases=bitbases).run(await stdin_reader())
+    asyncio.run(main())
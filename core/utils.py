@@ -0,0 +1,5 @@
+def isvalid(position: tuple[int, int]) -> bool:
+    for i in position:
+        if i < 0 or i > 7:
+            return False
+    return True
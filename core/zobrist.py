@@ -0,0 +1,51 @@
+from core.pieces import PAWN, KING, BLACK
+
+MASK = (1 << 64) - 1
+_state = 0x5EED
+
+
+def _key() -> int:
+    # SplitMix64, which gives well mixed 64-bit keys without importing random, whose import alone costs more than
+    # making all of them
+    global _state
+    _state = (_state + 0x9E3779B97F4A7C15) & MASK
+    key = ((_state ^ (_state >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & MASK
+    return key ^ (key >> 31)
+
+
+# Indexed by piece code, then square; codes that name no piece have no keys
+PIECE_KEYS = [[_key() for _ in range(64)] if PAWN <= code & 7 <= KING else None for code in range(16)]
+SIDE_KEY = _key()
+CASTLING_KEYS = [_key() for _ in range(16)]
+EN_PASSANT_KEYS = [_key() for _ in range(8)]
+
+
+def piece_key(code: int, position) -> int:
+    return PIECE_KEYS[code][8 * position[1] + position[0]]
+
+
+def en_passant_key(squares, en_passant) -> int:
+    # Only a pawn that can actually be taken makes the position different
+    if en_passant is None:
+        return 0
+    x, y = en_passant
+    pawn = squares[8 * y + x]
+    for px in (x - 1, x + 1):
+        if 0 <= px < 8:
+            other = squares[8 * y + px]
+            if other & 7 == PAWN and (other ^ pawn) & BLACK:
+                return EN_PASSANT_KEYS[x]
+    return 0
+
+
+def compute_hash(squares, castling: int, en_passant, turn: str) -> int:
+    key = 0
+    for sq, code in enumerate(squares):
+        if code:
+            key ^= PIECE_KEYS[code][sq]
+    key ^= CASTLING_KEYS[castling]
+    key ^= en_passant_key(squares, en_passant)
+    if turn == 'black':
+        key ^= SIDE_KEY
+    return key
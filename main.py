@@ -1,8 +1,95 @@
-from Board import Simulation
-import sys
+import argparse
 
-s = Simulation()
-if len(sys.argv) > 1 and sys.argv[1] == '--playAI':
-    s.run(True)
-else:
-    s.run(False)
+parser = argparse.ArgumentParser(description='A playable chess application')
+parser.add_argument('--playAI', action='store_true', help='play white against the computer')
+parser.add_argument('--ai', choices=('engine', 'random'), default='engine', help='move chooser used by --playAI')
+parser.add_argument('--movetime', type=float, default=1.0, help='seconds the engine may think per move')
+parser.add_argument('--worker', choices=('process', 'thread'), default='process',
+                    help='where the AI thinks while the window keeps running')
+parser.add_argument('--search-workers', type=int, default=1,
+                    help='split the engine search across this many processes (uses a thread as the AI worker)')
+parser.add_argument('--fps', type=int, default=60, help='frame rate cap for the window, 0 for uncapped')
+parser.add_argument('--selfplay', type=int, metavar='GAMES', help='play GAMES computer games without a window')
+parser.add_argument('--jobs', type=int, default=1,
+                    help='worker processes for --selfplay, --build-bitbases, --analyse and --serve')
+parser.add_argument('--white', choices=('random', 'engine'), default='random', help='white move chooser for --selfplay')
+parser.add_argument('--black', choices=('random', 'engine'), default='random', help='black move chooser for --selfplay')
+parser.add_argument('--max-plies', type=int, default=400, help='with --selfplay, stop a game unfinished after this')
+parser.add_argument('--depth', type=int, default=64, help='deepest iteration for engine players in --selfplay')
+parser.add_argument('--pgn', help='with --selfplay, write the games to this PGN file')
+parser.add_argument('--jsonl', help='with --selfplay, write one JSON summary line per game to this file')
+parser.add_argument('--seed', type=int, help='with --selfplay, seed the random choices of each game')
+parser.add_argument('--book', help='Polyglot opening book (.bin) for the computer players')
+parser.add_argument('--build-book', metavar='PGN', help='write the --book file from the games in PGN and exit')
+parser.add_argument('--book-plies', type=int, default=16, help='with --build-book, plies of each game to keep')
+parser.add_argument('--bitbases', metavar='DIR',
+                    help='endgame bitbases for the engine; with --selfplay, known endings are adjudicated')
+parser.add_argument('--build-bitbases', nargs='*', metavar='TABLE',
+                    help='generate endgame bitbases such as KQK or KRKP (default KQK KRK KPK) into --bitbases and exit')
+parser.add_argument('--analyse', metavar='FILE', help='replay and check every game of a PGN file or position of an EPD')
+parser.add_argument('--output', metavar='OUT', help='with --analyse, write one row per record to a .jsonl or .csv file')
+parser.add_argument('--serve', nargs='?', const='127.0.0.1:8765', metavar='HOST:PORT|SOCKET',
+                    help='host games for clients speaking JSON lines over TCP or a Unix socket')
+parser.add_argument('--uci', action='store_true', help='speak UCI on stdin/stdout instead of opening a window')
+parser.add_argument('--profile', metavar='OUT.json',
+                    help='time the hot functions, searches and frames, and write the counters to this file on exit')
+parser.add_argument('--overlay', action='store_true',
+                    help='show the profiler counters in the window (F3 toggles it while profiling)')
+parser.add_argument('--perft', type=int, metavar='DEPTH', help='count leaf nodes to DEPTH without opening a window')
+parser.add_argument('--fen', help='starting position for --perft')
+parser.add_argument('--divide', action='store_true', help='with --perft, print the node count below each root move')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.profile is not None or args.overlay:
+        import atexit
+        from core import profiler
+        profiler.enable()
+        if args.profile is not None:
+            atexit.register(profiler.dump, args.profile)
+
+    if args.build_bitbases is not None:
+        from core.bitbase import build_bitbases, DEFAULT_SIGNATURES
+        build_bitbases(args.build_bitbases or DEFAULT_SIGNATURES, args.bitbases or 'bitbases', args.jobs)
+    elif args.build_book is not None:
+        from core.book import build_book
+        if args.book is None:
+            parser.error('--build-book needs --book for the output file')
+        print('{} entries written to {}'.format(build_book(args.build_book, args.book, args.book_plies), args.book))
+    elif args.analyse is not None:
+        from core.pipeline import run_pipeline
+        run_pipeline(args.analyse, args.output, args.jobs)
+    elif args.serve is not None:
+        from core.server import run_server
+        run_server(args.serve, args.jobs)
+    elif args.uci:
+        from core.uci import run_uci
+        from core.bitbase import Bitbases
+        run_uci(None if args.bitbases is None else Bitbases(args.bitbases))
+    elif args.perft is not None:
+        from core.perft import run_perft, START_FEN
+        run_perft(args.perft, args.fen or START_FEN, args.divide)
+    elif args.selfplay is not None:
+        from core.selfplay import run_selfplay
+        run_selfplay(args.selfplay, args.jobs, args.white, args.black, args.max_plies, args.movetime, args.depth,
+                     args.pgn, args.jsonl, args.seed, book_path=args.book, bitbase_dir=args.bitbases)
+    else:
+        from Board import Simulation
+        from core.engine import Engine, random_move
+        from core.parallel import ParallelEngine
+        from core.book import OpeningBook, BookChooser
+        from core.bitbase import Bitbases
+        bitbases = None if args.bitbases is None else Bitbases(args.bitbases)
+        worker = args.worker
+        if args.ai == 'random':
+            chooser = random_move
+        elif args.search_workers > 1:
+            # The pool does the work, and a daemon worker process could not start one anyway
+            chooser = ParallelEngine(args.search_workers, args.movetime, bitbases=bitbases).choose_move
+            worker = 'thread'
+        else:
+            chooser = Engine(args.movetime, bitbases=bitbases).choose_move
+        if args.book is not None:
+            chooser = BookChooser(OpeningBook(args.book), chooser)
+        s = Simulation(chooser, worker, args.fps, args.overlay)
+        s.run(args.playAI)
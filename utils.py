@@ -1,15 +1,14 @@
 from constants import *
+from core.utils import isvalid
 from typing import Union, Tuple
 
 
-def isvalid(position: tuple[int, int]) -> bool:
-    for i in position:
-        if i < 0 or i > 7:
-            return False
-    return True
-
-
 def get_position(coordinate: tuple[int, int]) -> Union[Tuple[int, int], None]:
     if coordinate is None:
         return None
     return int((coordinate[0] - OFFSET_X) / BLOCK_W), int((coordinate[1] - OFFSET_PIXEL_Y) / BLOCK_H)
+
+
+def square_rect(coordinate: Tuple[int, int]) -> pygame.Rect:
+    x, y = OFFSET_X + coordinate[0] * BLOCK_W, OFFSET_Y + coordinate[1] * BLOCK_H
+    return pygame.Rect(int(x), int(y), int(x + BLOCK_W) - int(x) + 1, int(y + BLOCK_H) - int(y) + 1)